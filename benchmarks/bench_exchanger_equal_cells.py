@@ -0,0 +1,44 @@
+"""
+Benchmark of the construction and temperature adjustment of ExchangerEqualCells networks.
+
+Run from the project directory:
+    python -m benchmarks.bench_exchanger_equal_cells
+"""
+import timeit
+
+from exchanger.stream import Fluid, Flow
+from exchanger.exchanger_types import ExchangerEqualCells
+from exchanger import properties
+
+
+def create_exchanger(shape=(10, 10)):
+    fluid_1 = Fluid("Water", pressure=101420, temperature=373.15)
+    flow_1 = Flow(fluid_1, 3500 / fluid_1.specific_heat)
+    fluid_2 = Fluid("Water", temperature=293.15)
+    flow_2 = Flow(fluid_2, 3500 / fluid_2.specific_heat)
+    return ExchangerEqualCells(shape, 'CrossFlowOneRow', flow_1=flow_1, flow_order_1='dr2u',
+                               flow_2=flow_2, flow_order_2='ul2r', total_transferability=4000)
+
+
+def adjust_exchanger(shape=(10, 10), iterations=5):
+    ex = create_exchanger(shape)
+    ex._adjust_temperatures(iterations)
+    return ex
+
+
+def bench(function, number=3, **kwargs):
+    properties.state_cache.clear()
+    cold = timeit.timeit(lambda: function(**kwargs), number=1)
+    warm = min(timeit.repeat(lambda: function(**kwargs), number=1, repeat=number))
+    return cold, warm
+
+
+if __name__ == '__main__':
+    for shape in [(2, 2), (5, 5), (10, 10)]:
+        cold, warm = bench(create_exchanger, shape=shape)
+        print(f"ExchangerEqualCells{shape} construction: cold {cold * 1e3:.1f} ms, warm {warm * 1e3:.1f} ms")
+        cold, warm = bench(adjust_exchanger, shape=shape)
+        print(f"ExchangerEqualCells{shape} construction + 5 adjustments: "
+              f"cold {cold * 1e3:.1f} ms, warm {warm * 1e3:.1f} ms")
+    print(properties.state_cache)
+    print(properties.fluid_pool)
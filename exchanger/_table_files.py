@@ -0,0 +1,93 @@
+"""
+Files of persisted tables: the node values in '<name>.npy' and a JSON header in '<name>.json'.
+
+The header holds the size and the SHA-256 hash of the '.npy' file, so truncated files are detected on every load
+and files modified after they were written by the hash on request.
+Used by 'properties.PropertyTable' and 'kernel_tables.KernelTable'.
+"""
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+
+def file_hash(path):
+    """
+    Get the SHA-256 hash of a file.
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def save(directory: str, name: str, values, header: dict):
+    """
+    Write the node values to '<name>.npy' and the header with the size and hash of the values to '<name>.json'.
+
+    Args:
+        directory (str): The directory of the files, created if it does not exist.
+        name (str): The name of the files.
+        values (numpy.ndarray): The node values.
+        header (dict): The header, the keys 'size' and 'sha256' are added.
+
+    Returns:
+        str: The path of the '.npy' file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.npy")
+    np.save(path, values)
+    header = {**header, 'size': os.path.getsize(path), 'sha256': file_hash(path)}
+    with open(os.path.splitext(path)[0] + '.json', 'w') as file:
+        json.dump(header, file, indent=1)
+    logging.debug(f"saved {name} table to {path}")
+    return path
+
+
+def load_header(path: str):
+    """
+    Read the header of the '.npy' file of a table.
+
+    Raises:
+        FileNotFoundError: If the '.json' file does not exist.
+
+    Returns:
+        dict: The header.
+    """
+    with open(os.path.splitext(path)[0] + '.json') as file:
+        return json.load(file)
+
+
+def check_size(path: str, header: dict, kind: str):
+    """
+    Check the size of the '.npy' file of a table against its header, which is cheap compared to the hash.
+
+    Args:
+        path (str): The path of the '.npy' file.
+        header (dict): The header of the table.
+        kind (str): The kind of the table in the error message, e.g. 'property table'.
+
+    Raises:
+        ValueError: If the size does not match the header.
+    """
+    if os.path.getsize(path) != header.get('size'):
+        raise ValueError(f"stale {kind} {path}: size does not match the header")
+
+
+def check_hash(path: str, header: dict, kind: str):
+    """
+    Check the hash of the '.npy' file of a table against its header.
+
+    Args:
+        path (str): The path of the '.npy' file.
+        header (dict): The header of the table.
+        kind (str): The kind of the table in the error message, e.g. 'kernel table'.
+
+    Raises:
+        ValueError: If the hash does not match the header.
+    """
+    if file_hash(path) != header['sha256']:
+        raise ValueError(f"stale {kind} {path}: hash does not match the header")
@@ -0,0 +1,260 @@
+"""
+Optional just-in-time compiled P kernels and network solves, used if numba is importable.
+
+For many small evaluations, e.g. sweeps over millions of networks with a few cells, the call overhead of the
+vectorized NumPy kernels dominates the arithmetic. The closed-form kernels of 'exchanger.kernels' are compiled
+element-wise with the same operations in the same order and wrapped as ufuncs, so they broadcast like the NumPy
+kernels and agree with them to rounding. Kernels with parameters or series (crossflow unmixed, cross counter flow,
+multiple shells) are always evaluated with NumPy.
+Without numba all functions fall back to the NumPy implementation.
+"""
+import logging
+import math
+
+import numpy as np
+
+from . import kernels
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+logging.debug(f'{__file__} will get logged')
+
+available = numba is not None
+# the compiled kernels are used by 'evaluate' if available and enabled
+enabled = True
+
+if available:
+    jit = numba.njit(cache=True)
+else:
+    def jit(function):
+        return function
+
+
+@jit
+def _parallel_flow(ntu, r):
+    return (1 - math.exp(-ntu * (1 + r))) / (1 + r)
+
+
+@jit
+def _counter_current_flow(ntu, r):
+    if ntu == 0:
+        return 0.
+    difference = abs(1 - r)
+    x = ntu * difference
+    reciprocal = difference / -math.expm1(-x) if x > 0 else 1 / ntu
+    return 1 / (reciprocal + min(r, 1.))
+
+
+@jit
+def _cross_flow_one_row(ntu, r):
+    y = r * ntu
+    exponent = math.expm1(-y) / r if y > 0 else -ntu
+    return -math.expm1(exponent)
+
+
+@jit
+def _one_outer_three_inner_two_counter_flow(ntu, r):
+    if ntu == 0:
+        return 0.
+    n = min(ntu, 1e300)
+    w = r / 3 - 1 / 6
+    d = math.hypot(w, math.sqrt(2) / 3)
+    sigma = -r / (9 * (0.5 + d))
+    s1, s2, s3 = n * (1 - r) * sigma, -n * (0.5 + d), r * n / 3
+    s13 = n * ((2 / 9 / (d + w) if w > 0 else d - w) - 2 / 3)
+    u = max(s1, 0.)
+    scale = math.exp(-u)
+    e1, e2 = math.exp(min(s1, 0.)), math.exp(s2 - u)
+    if s1 > 0:
+        h = -math.expm1(-s1) / s1
+    elif s1 < 0:
+        h = math.expm1(s1) / s1
+    else:
+        h = 1.
+    h = h * n * sigma
+    a = math.exp(s13) + 1
+    b = math.exp(s2 - s3) + 1
+    c = e1 * math.expm1(s2 - s1)
+    g = math.exp(-s3)
+    numerator = sigma * a * math.expm1(s2) * scale + (0.5 + d) * b * h + c * (g + 1)
+    denominator = sigma * a * (r * e2 - scale) - (0.5 + d) * b * (scale - r * h) + c * (g + r)
+    return numerator / denominator
+
+
+@jit
+def _tema_e_one_two(ntu, r):
+    if ntu == 0:
+        return 0.
+    e = math.sqrt(1 + r ** 2)
+    return 2 / (1 + r + e / math.tanh(e * ntu / 2))
+
+
+@jit
+def _tema_j_one_two(ntu, r):
+    if ntu == 0:
+        return 0.
+    n = min(ntu, 1e300)
+    lam = math.hypot(1, r / 2)
+    e = math.exp(-lam * n)
+    denominator = (lam - 1) * e + 1 + lam
+    c = math.exp(n * (1 - lam) / 2) / denominator
+    singular = lam * ((lam - 1) * e ** 2 + 1 + lam) / (denominator * -math.expm1(-lam * n))
+    return 1 / (1 + r / 2 - 2 * lam * c + singular)
+
+
+@jit
+def _tema_g_one_two(ntu, r):
+    alpha = math.exp(-ntu * (2 + r) / 4)
+    a = -2 * r * (1 - alpha) ** 2 / (2 + r)
+    x = ntu * (2 - r) / 2
+    # exp(-x) overflows to inf for large NTU and R > 2, like in the NumPy kernel
+    b = -4 * math.expm1(-x) / (2 - r) + math.exp(min(-x, 710.)) if r != 2 else 1 + 2 * ntu
+    reciprocal = 1 / b
+    return (1 - alpha ** 2 * reciprocal) / ((a + 2) * reciprocal + r)
+
+
+@jit
+def _tema_h_one_two(ntu, r):
+    # '_split_flow' with two units, the temperatures are pairs of a constant and a coefficient of the turn temperature
+    units = 2
+    r_section = r / (2 * units)
+    p_parallel = _parallel_flow(ntu / 2, r_section)
+    p_counter = _counter_current_flow(ntu / 2, r_section)
+    sections = 2 * units
+    returned_0 = np.empty(sections)
+    returned_1 = np.empty(sections)
+    tube_0, tube_1 = 0., 1.
+    for k in range(sections - 1, -1, -1):
+        p = p_parallel if k % 2 == 0 else p_counter
+        difference_0, difference_1 = 1 - tube_0, -tube_1
+        returned_0[k], returned_1[k] = 1 - p * difference_0, -p * difference_1
+        tube_0, tube_1 = tube_0 + r_section * p * difference_0, tube_1 + r_section * p * difference_1
+    tube_0, tube_1 = 0., 0.
+    outlets_0 = np.empty(sections)
+    outlets_1 = np.empty(sections)
+    for k in range(sections):
+        p = p_parallel if k % 2 == 0 else p_counter
+        difference_0, difference_1 = returned_0[k] - tube_0, returned_1[k] - tube_1
+        outlets_0[k], outlets_1[k] = returned_0[k] - p * difference_0, returned_1[k] - p * difference_1
+        tube_0, tube_1 = tube_0 + r_section * p * difference_0, tube_1 + r_section * p * difference_1
+    turn = tube_0 / (1 - tube_1)
+    total = 0.
+    for k in range(sections):
+        total = total + (outlets_0[k] + outlets_1[k] * turn)
+    return 1 - total / sections
+
+
+_scalar_kernels = {
+    kernels.parallel_flow: _parallel_flow,
+    kernels.counter_current_flow: _counter_current_flow,
+    kernels.cross_flow_one_row: _cross_flow_one_row,
+    kernels.one_outer_three_inner_two_counter_flow: _one_outer_three_inner_two_counter_flow,
+    kernels.tema_e_one_two: _tema_e_one_two,
+    kernels.tema_j_one_two: _tema_j_one_two,
+    kernels.tema_g_one_two: _tema_g_one_two,
+    kernels.tema_h_one_two: _tema_h_one_two,
+}
+
+# the compiled ufuncs of the NumPy kernels
+compiled_kernels = {}
+if available:
+    for _kernel, _scalar in _scalar_kernels.items():
+        compiled_kernels[_kernel] = numba.vectorize(['float64(float64, float64)'], cache=True)(_scalar.py_func)
+
+
+def evaluate(kernel, ntu, r, /, **parameters):
+    """
+    Get P1 of a kernel, evaluated by its compiled ufunc if numba is available and enabled.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+    """
+    compiled = compiled_kernels.get(kernel) if enabled and not parameters else None
+    if compiled is None:
+        return kernel(ntu, r, **parameters)
+    # intermediate overflows are part of the limits, like in the NumPy kernels
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        return compiled(np.asarray(ntu, dtype=float), np.asarray(r, dtype=float))[()]
+
+
+@jit
+def _solve(a, b):
+    """Solve the dense system a x = b in place by Gaussian elimination with partial pivoting."""
+    size = a.shape[0]
+    for k in range(size):
+        pivot = k
+        for i in range(k + 1, size):
+            if abs(a[i, k]) > abs(a[pivot, k]):
+                pivot = i
+        if pivot != k:
+            for j in range(size):
+                a[k, j], a[pivot, j] = a[pivot, j], a[k, j]
+            b[k], b[pivot] = b[pivot], b[k]
+        for i in range(k + 1, size):
+            factor = a[i, k] / a[k, k]
+            for j in range(k + 1, size):
+                a[i, j] -= factor * a[k, j]
+            b[i] -= factor * b[k]
+    for k in range(size - 1, -1, -1):
+        total = b[k]
+        for j in range(k + 1, size):
+            total -= a[k, j] * b[j]
+        b[k] = total / a[k, k]
+    return b
+
+
+@jit
+def _network_outputs(p1, p2, structure_matrix, input_matrix, output_matrix, temperatures):
+    networks, n = p1.shape
+    size = 2 * n
+    outputs = np.empty((networks, output_matrix.shape[0]))
+    a = np.empty((size, size))
+    b = np.empty(size)
+    for m in range(networks):
+        inlet = input_matrix @ temperatures[m]
+        # rows of phi S and phi B u without forming phi, the cell i mixes the rows i and n + i
+        for i in range(n):
+            q1, q2 = p1[m, i], p2[m, i]
+            for j in range(size):
+                a[i, j] = -((1 - q1) * structure_matrix[i, j] + q1 * structure_matrix[n + i, j])
+                a[n + i, j] = -(q2 * structure_matrix[i, j] + (1 - q2) * structure_matrix[n + i, j])
+            a[i, i] += 1
+            a[n + i, n + i] += 1
+            b[i] = (1 - q1) * inlet[i] + q1 * inlet[n + i]
+            b[n + i] = q2 * inlet[i] + (1 - q2) * inlet[n + i]
+        outputs[m] = output_matrix @ _solve(a, b)
+    return outputs
+
+
+def network_outputs(p1, p2, structure_matrix, input_matrix, output_matrix, temperatures):
+    """
+    Get the output temperatures of many networks of the same structure with a fused build-phi-and-solve routine.
+
+    Args:
+        p1 (numpy.ndarray): The dimensionless temperature changes P1 with the shape (networks, cells).
+        p2 (numpy.ndarray): The dimensionless temperature changes P2 with the shape (networks, cells).
+        structure_matrix (numpy.ndarray): The structure matrix of the networks.
+        input_matrix (numpy.ndarray): The input matrix of the networks.
+        output_matrix (numpy.ndarray): The output matrix of the networks.
+        temperatures (numpy.ndarray): The input temperatures with the shape (networks, inputs).
+
+    Returns:
+        numpy.ndarray: The output temperatures with the shape (networks, outputs).
+
+    Raises:
+        NotImplementedError: If numba is not available.
+    """
+    if not available:
+        raise NotImplementedError("numba is not available")
+    arrays = (np.ascontiguousarray(value, dtype=float)
+              for value in (p1, p2, structure_matrix, input_matrix, output_matrix, temperatures))
+    return _network_outputs(*arrays)
@@ -1,10 +1,14 @@
 import warnings
+from collections import namedtuple
 
-from numpy import exp, sqrt
+import numpy as np
 
+from . import kernels, kernel_tables
 from .stream import Fluid, Flow
 from .parts import Part
 
+ConvergenceReport = namedtuple('ConvergenceReport', ['converged', 'iterations', 'residual', 'temperatures'])
+
 
 class HeatExchanger:
     """
@@ -17,8 +21,20 @@ class HeatExchanger:
 
     Attributes:
         auto_adjust (bool): If output values should be adjusted for str representation
+        p_kernel (callable or None): The vectorized kernel P1(NTU1, R1) of the exchanger type,
+            see 'exchanger.kernels', None for a heat exchanger with no specific type.
+        tolerances (tuple): The absolute temperature tolerance in K and the relative tolerance
+            of the output temperature calculation.
+        max_iterations (int): The maximal number of iterations of the output temperature calculation.
+        accelerations (list): The available accelerations of the output temperature iteration.
+        acceleration (str): The default acceleration of the output temperature iteration.
     """
     auto_adjust = True
+    p_kernel = None
+    tolerances = (1e-6, 1e-9)
+    max_iterations = 50
+    accelerations = ['none', 'aitken', 'secant']
+    acceleration = 'aitken'
 
     def __init__(self, flow_1=None, flow_2=None, part: Part = None):
         self.flow_1 = flow_1
@@ -199,26 +215,116 @@ class HeatExchanger:
         """
         return zeta * density / 2 * velocity ** 2
 
-    def _calc_output(self, n_iter: int = 5):
+    def _calc_output(self, n_iter: int = None, abs_tol: float = None, rel_tol: float = None, max_iter: int = None,
+                     acceleration: str = None):
         """
         Calculate the output temperatures of the heat exchanger.
 
         Args:
-            n_iter (int): number of iterations
+            n_iter (int, optional): A fixed number of plain iterations, the convergence mode is used if None.
+            abs_tol (float, optional): The absolute temperature tolerance in K, see 'tolerances' if None.
+            rel_tol (float, optional): The relative temperature tolerance, see 'tolerances' if None.
+            max_iter (int, optional): The maximal number of iterations, see 'max_iterations' if None.
+            acceleration (str, optional): The acceleration of the iteration, one of 'accelerations',
+                see 'acceleration' if None.
+
+        Returns:
+            ConvergenceReport: If the output temperatures converged, the number of iterations, the maximal change
+                of the output temperatures in the last iteration in K and the output temperatures.
+
+        Raises:
+            NotImplementedError: If the acceleration is not in the list of accelerations.
+
+        Warns:
+            UserWarning: If the output temperatures did not converge within max_iter iterations.
 
         Notes:
             This method calculates the output temperatures of the fluid flows in the heat exchanger based on the
             dimensionless temperature change (P) of the heat exchanger.
-            The temperature and thus the fluid properties, are iteratively adjusted n_iter times to find stable output temperatures.
+            The temperature and thus the fluid properties, are iteratively adjusted until the change of the output
+            temperatures is within abs_tol + rel_tol * |T|.
+            The fixed point iteration is accelerated component-wise, 'aitken' extrapolates every third iterate
+            (Steffensen), 'secant' uses the secant step on the change of the output temperatures.
+            Accelerated temperatures are limited to the range of the input temperatures.
+        """
+        default_abs_tol, default_rel_tol = self.tolerances
+        abs_tol = default_abs_tol if abs_tol is None else abs_tol
+        rel_tol = default_rel_tol if rel_tol is None else rel_tol
+        if n_iter is not None:
+            max_iter, acceleration = n_iter, 'none'
+        max_iter = self.max_iterations if max_iter is None else max_iter
+        acceleration = self.acceleration if acceleration is None else acceleration
+        if acceleration not in self.accelerations:
+            raise NotImplementedError
+
+        temps = np.array([self.flow_1.out_temperature, self.flow_2.out_temperature], dtype=float)
+        history = []
+        converged, residual, i = False, np.inf, 0
+        for i in range(1, max_iter + 1):
+            new_temps = self._output_step()
+            self.flow_1.out_temperature, self.flow_2.out_temperature = new_temps
+            change = np.abs(new_temps - temps)
+            residual = float(change.max())
+            converged = bool(np.all(change <= abs_tol + rel_tol * np.abs(new_temps)))
+            if converged and n_iter is None:
+                break
+
+            history.append((temps, new_temps))
+            temps = self._accelerate(history, acceleration)
+            if temps is not new_temps:
+                self.flow_1.out_temperature, self.flow_2.out_temperature = temps
+
+        if not converged and n_iter is None:
+            warnings.warn(f"output temperatures not converged within {max_iter} iterations, residual = {residual:.2e} K")
+        temperatures = self.flow_1.out_temperature, self.flow_2.out_temperature
+        return ConvergenceReport(converged, i, residual, temperatures)
+
+    def _output_step(self):
+        """
+        Calculate the output temperatures from the dimensionless temperature change at the current fluid states.
+
+        Returns:
+            numpy.ndarray: The output temperatures of flow 1 and flow 2 in Kelvin (K).
+        """
+        temp_1_in = self.flow_1.in_fluid.temperature
+        temp_2_in = self.flow_2.in_fluid.temperature
+        p1, p2 = self.p
+        temp_1_out = -p1 * (temp_1_in - temp_2_in) + temp_1_in
+        temp_2_out = p2 * (temp_1_in - temp_2_in) + temp_2_in
+        return np.array([temp_1_out, temp_2_out], dtype=float)
+
+    def _accelerate(self, history: list, acceleration: str):
         """
-        for i in range(n_iter):
-            temp_1_in = self.flow_1.in_fluid.temperature
-            temp_2_in = self.flow_2.in_fluid.temperature
-            p1, p2 = self.p
-            temp_1_out = -p1 * (temp_1_in - temp_2_in) + temp_1_in
-            temp_2_out = p2 * (temp_1_in - temp_2_in) + temp_2_in
-            self.flow_1.out_temperature = temp_1_out
-            self.flow_2.out_temperature = temp_2_out
+        Get the next iterate of the output temperatures.
+
+        Args:
+            history (list): The pairs of evaluated output temperatures x and the resulting ones g(x)
+                since the last extrapolation, updated in place.
+            acceleration (str): The acceleration, one of 'accelerations'.
+
+        Returns:
+            numpy.ndarray: The next iterate, the latest g(x) itself if no acceleration is applied.
+        """
+        x, g = history[-1]
+        if acceleration == 'aitken' and len(history) == 2:
+            # Steffensen: x0, x1 = g(x0), x2 = g(x1) are extrapolated and the iteration restarts there
+            x0 = history[0][0]
+            history.clear()
+            numerator, denominator = (g - x) ** 2, g - 2 * x + x0
+        elif acceleration == 'secant' and len(history) == 2:
+            # secant step on the root of f(x) = g(x) - x from the last two evaluated temperatures
+            x0, g0 = history.pop(0)
+            # x - (g - x) (x - x0) / ((g - x) - (g0 - x0)) written as a correction of the plain step g
+            numerator, denominator = (g - x) * (g - g0), (g - x) - (g0 - x0)
+        else:
+            return g
+
+        valid = np.abs(denominator) > 1e-12 * np.abs(g)
+        step = np.divide(numerator, denominator, out=np.zeros_like(g), where=valid)
+        accelerated = g - step
+        # accelerated temperatures outside the input temperatures are not physical
+        bounds = sorted((self.flow_1.in_fluid.temperature, self.flow_2.in_fluid.temperature))
+        return np.clip(accelerated, *bounds)
 
     @property
     def ntu(self):
@@ -300,14 +406,58 @@ class HeatExchanger:
     @property
     def p(self):
         """
-        Get the dimensionless temperature change for a heat exchanger.
+        Get the dimensionless temperature changes (P1 and P2) of the heat exchanger.
+
+        Returns:
+            tuple (float,float): A tuple containing two dimensionless temperature changes, P1 and P2.
 
         Raises:
             NotImplementedError: If the dimensionless temperature change is required
             from a heat exchanger with no specific type.
+
+        Notes:
+            - P1 is calculated by the 'p_kernel' of the exchanger type from the NTU and R values of flow 1,
+              or interpolated if the kernel is tabulated, see 'exchanger.kernel_tables'.
+            - P2 follows from the energy balance, P2 = R1 * P1.
         """
-        pass
-        raise NotImplementedError
+        if self.p_kernel is None:
+            raise NotImplementedError
+        n1, _ = self.ntu
+        r1, _ = self.r
+        p1 = kernel_tables.evaluate(self.p_kernel, n1, r1, **self.kernel_parameters)
+        return p1, r1 * p1
+
+    @property
+    def p_derivatives(self):
+        """
+        Get the partial derivatives of the dimensionless temperature change P1 of the heat exchanger.
+
+        Returns:
+            tuple (float, float): The derivatives dP1/dNTU1 and dP1/dR1.
+
+        Raises:
+            NotImplementedError: If the derivatives are required from a heat exchanger with no specific type.
+
+        Notes:
+            - The derivatives are evaluated from the exact kernel, see 'exchanger.kernels.p_derivatives',
+              also if the kernel is tabulated.
+            - The derivatives of P2 = R1 * P1 are dP2/dNTU1 = R1 dP1/dNTU1 and dP2/dR1 = P1 + R1 dP1/dR1.
+        """
+        if self.p_kernel is None:
+            raise NotImplementedError
+        n1, _ = self.ntu
+        r1, _ = self.r
+        return kernels.p_derivatives(self.p_kernel, n1, r1, **self.kernel_parameters)
+
+    @property
+    def kernel_parameters(self):
+        """
+        Get the additional keyword arguments of the P kernel, e.g. the number of passes.
+
+        Returns:
+            dict: The keyword arguments passed to 'p_kernel'.
+        """
+        return {}
 
     def p_str(self):
         """
@@ -352,112 +502,288 @@ class HeatExchanger:
 
 
 class ParallelFlow(HeatExchanger):
-    @property
-    def p(self):
-        """
-        Get the dimensionless temperature changes (P1 and P2) for a parallel flow heat exchanger.
+    """
+    A parallel flow heat exchanger.
+    """
+    p_kernel = staticmethod(kernels.parallel_flow)
 
-        Returns:
-            tuple (float,float): A tuple containing two dimensionless temperature changes, P1 and P2.
 
-        Notes:
-            - The dimensionless temperature changes are calculated based on the heat exchanger's NTU and R values.
-            - P1 represents the dimensionless temperature change on one side, and P2 on the other side.
-        """
-        n1, n2 = self.ntu
-        r1, r2 = self.r
-        p1 = (1 - exp(-n1 * (1 + r1))) / (1 + r1)
-        p2 = (1 - exp(-n2 * (1 + r2))) / (1 + r2)
-        return p1, p2
+class CounterCurrentFlow(HeatExchanger):
+    """
+    A counter current flow heat exchanger.
+    """
+    p_kernel = staticmethod(kernels.counter_current_flow)
 
 
-class CounterCurrentFlow(HeatExchanger):
+class CrossFlowOneRow(HeatExchanger):
+    """
+    A one-sided cross-mixed crossflow heat exchanger, flow 1 is ideally mixed.
+    """
+    p_kernel = staticmethod(kernels.cross_flow_one_row)
+
+
+class ShellTubeHeatExchanger(HeatExchanger):
+    pass
+
+
+class OneOuterThreeInnerTwoCounterFlow(ShellTubeHeatExchanger):
+    """
+    A shell-and-tube heat exchanger with one outer and three inner passages, two in counterflow.
+    Flow 1 is the shell side flow.
+    """
+    p_kernel = staticmethod(kernels.one_outer_three_inner_two_counter_flow)
+
+
+class CrossFlowUnmixed(HeatExchanger):
+    """
+    A crossflow heat exchanger with both flows unmixed.
+    """
+    p_kernel = staticmethod(kernels.cross_flow_unmixed)
+
+
+class CrossCounterFlow(HeatExchanger):
+    """
+    A multipass crossflow heat exchanger in overall counterflow, both flows unmixed in every pass.
+
+    Args:
+        flow_1 (Flow, optional): The first fluid flow in the heat exchanger.
+        flow_2 (Flow, optional): The second fluid flow in the heat exchanger.
+        part (Part, optional): The heat exchanger component.
+        passes (int, optional): The number of passes.
+    """
+    p_kernel = staticmethod(kernels.cross_counter_flow)
+
+    def __init__(self, flow_1=None, flow_2=None, part: Part = None, passes: int = 2):
+        super().__init__(flow_1, flow_2, part)
+        self.passes = passes
+
     @property
-    def p(self):
+    def passes(self):
         """
-        Get the dimensionless temperature changes (P1 and P2) for a counter current flow heat exchanger.
+        Get or set the number of passes.
 
-        Returns:
-            tuple (float,float): A tuple containing two dimensionless temperature changes, P1 and P2.
+        Args:
+            value (int): The number of passes.
+
+        Raises:
+            NotImplementedError: If the provided value is not a positive integer.
 
-        Notes:
-            - The dimensionless temperature changes are calculated based on the heat exchanger's NTU and R values.
-            - P1 represents the dimensionless temperature change on one side, and P2 on the other side.
         """
-        n1, n2 = self.ntu
-        r1, r2 = self.r
-        if r1 == 1:
-            p1 = n1 / (1 + n1)
-        else:
-            p1 = (1 - exp(n1 * (r1 - 1))) / (1 - r1 * exp(n1 * (r1 - 1)))
-        if r2 == 1:
-            p2 = n2 / (1 + n2)
+        return self._passes
+
+    @passes.setter
+    def passes(self, value):
+        if isinstance(value, int) and value > 0:
+            self._passes = value
         else:
-            p2 = (1 - exp(n2 * (r2 - 1))) / (1 - r2 * exp(n2 * (r2 - 1)))
-        return p1, p2
+            raise NotImplementedError
+
+    @property
+    def kernel_parameters(self):
+        return {'passes': self.passes}
 
 
-class CrossFlowOneRow(HeatExchanger):
+class TemaE12(ShellTubeHeatExchanger):
+    """
+    A TEMA E shell-and-tube heat exchanger with one shell pass and two (or 2n) tube passes.
+    Flow 1 is the shell side flow.
+    """
+    p_kernel = staticmethod(kernels.tema_e_one_two)
+
+
+class TemaJ12(ShellTubeHeatExchanger):
+    """
+    A TEMA J (divided flow) shell-and-tube heat exchanger with two tube passes.
+    Flow 1 is the shell side flow.
+    """
+    p_kernel = staticmethod(kernels.tema_j_one_two)
+
+
+class TemaG12(ShellTubeHeatExchanger):
+    """
+    A TEMA G (split flow) shell-and-tube heat exchanger with two tube passes.
+    Flow 1 is the shell side flow.
+    """
+    p_kernel = staticmethod(kernels.tema_g_one_two)
+
+
+class TemaH12(ShellTubeHeatExchanger):
+    """
+    A TEMA H (double split flow) shell-and-tube heat exchanger with two tube passes.
+    Flow 1 is the shell side flow.
+    """
+    p_kernel = staticmethod(kernels.tema_h_one_two)
+
+
+class MultiShell(HeatExchanger):
+    """
+    Equal shells of a base heat exchanger type in series or parallel arrangement.
+
+    The heat transferability of the part is shared equally by the shells, the overall dimensionless temperature
+    change follows from the one of a single shell, see 'exchanger.kernels.multi_shell'.
+
+    Args:
+        flow_1 (Flow, optional): The first fluid flow in the heat exchanger.
+        flow_2 (Flow, optional): The second fluid flow in the heat exchanger.
+        part (Part, optional): The heat exchanger component of all shells.
+        base (type or HeatExchanger, optional): The heat exchanger type of a single shell or an exchanger
+            of this type whose kernel parameters are used, e.g. the number of passes.
+        shells (int, optional): The number of shells.
+        arrangement (str, optional): The arrangement of the shells, one of 'arrangements'.
+
+    Attributes:
+        arrangements (list): The available arrangements, 'counter' and 'parallel' for shells in series,
+            'split_1' and 'split_2' for flow 1 or flow 2 split over the shells.
+    """
+    p_kernel = staticmethod(kernels.multi_shell)
+    arrangements = kernels.shell_arrangements
+
+    def __init__(self, flow_1=None, flow_2=None, part: Part = None, base=TemaE12, shells: int = 2,
+                 arrangement: str = 'counter'):
+        super().__init__(flow_1, flow_2, part)
+        self.base = base
+        self.shells = shells
+        self.arrangement = arrangement
+
     @property
-    def p(self):
+    def base(self):
         """
-        Get the dimensionless temperature changes (P1 and P2) for a One-sided cross-mixed crossflow heat exchanger.
+        Get or set the heat exchanger type of a single shell.
 
-        Returns:
-            tuple (float,float): A tuple containing two dimensionless temperature changes, P1 and P2.
+        Args:
+            value (type or HeatExchanger): A heat exchanger type or an exchanger of this type.
+
+        Raises:
+            NotImplementedError: If the provided value has no P kernel.
 
-        Notes:
-            - The dimensionless temperature changes are calculated based on the heat exchanger's NTU and R values.
-            - P1 represents the dimensionless temperature change of ideally mixed flow 1, and P2 not.
         """
-        n1, n2 = self.ntu
-        r1, r2 = self.r
-        p1 = 1 - exp((exp(-r1 * n1) - 1) / r1)
-        p2 = r1 * p1
-        return p1, p2
+        return self._base
 
+    @base.setter
+    def base(self, value):
+        if isinstance(value, type) and issubclass(value, HeatExchanger) or isinstance(value, HeatExchanger):
+            if value.p_kernel is None or value.p_kernel is kernels.multi_shell:
+                raise NotImplementedError
+            self._base = value
+        else:
+            raise NotImplementedError
 
-class ShellTubeHeatExchanger(HeatExchanger):
-    pass
+    @property
+    def shells(self):
+        """
+        Get or set the number of shells.
 
+        Args:
+            value (int): The number of shells.
+
+        Raises:
+            NotImplementedError: If the provided value is not a positive integer.
+
+        """
+        return self._shells
+
+    @shells.setter
+    def shells(self, value):
+        if isinstance(value, int) and value > 0:
+            self._shells = value
+        else:
+            raise NotImplementedError
 
-class OneOuterThreeInnerTwoCounterFlow(ShellTubeHeatExchanger):
     @property
-    def p(self):
+    def arrangement(self):
         """
-        Get the dimensionless temperature changes (P1 and P2) for a Shell-and-tube heat exchanger
-        with one outer and three inner passages, two in counterflow.
+        Get or set the arrangement of the shells.
 
-        Returns:
-            tuple (float,float): A tuple containing two dimensionless temperature changes, P1 and P2.
+        Args:
+            value (str): The arrangement, one of 'arrangements'.
 
-        Notes:
-            - The dimensionless temperature changes are calculated based on the heat exchanger's NTU and R values.
-            - P1 represents the dimensionless temperature change on the shell side, and P2 on the tube side.
-
-            Formula: VDI Waermeatlas, C1 Wärmeübertrager: Berechnungsmethoden, Tab 5
-        """
-        n1, n2 = self.ntu
-        r1, r2 = self.r
-        # formula from VDI Waermeatlas
-        epsilon = 1 / 3
-        if r1 != 1:
-            p = n1 * (1 - 1 / 2 * r1 * (1 - 3 * epsilon))
-            q = 1 / 2 * epsilon * (1 - epsilon) * n1 ** 2 * r1 * (1 - r1)
-            s1 = -p / 2 + sqrt(p ** 2 / 4 - q)
-            s2 = -p / 2 - sqrt(p ** 2 / 4 - q)
-            s3 = 1 / 2 * r1 * n1 * (1 - epsilon)
-
-            p1 = (s1 * (exp(s1) + exp(s3)) * (exp(s2) - 1) +
-                  s2 * (exp(s2) + exp(s3)) * (1 - exp(s1)) +
-                  n1 * (1 - r1) * (exp(s2) - exp(s1)) * (1 + exp(s3))) / \
-                 (s1 * (exp(s1) + exp(s3)) * (r1 * exp(s2) - 1) +
-                  s2 * (exp(s2) + exp(s3)) * (1 - r1 * exp(s1)) +
-                  n1 * (1 - r1) * (exp(s2) - exp(s1)) * (1 + r1 * exp(s3)))
+        Raises:
+            NotImplementedError: If the provided value is not in the list of arrangements.
+
+        """
+        return self._arrangement
+
+    @arrangement.setter
+    def arrangement(self, value):
+        if value in self.arrangements:
+            self._arrangement = value
         else:
-            x = n1 * (epsilon * (1 - epsilon)) / (1 + 3 * epsilon) - 2 * ((1 + epsilon) / (1 + 3 * epsilon)) ** 2 * \
-                ((exp(-0.5 * n1 * (1 + 3 * epsilon)) - 1) ** (-1) + (exp(0.5 * n1 * (1 - epsilon)) + 1) ** (-1)) ** (-1)
-            p1 = x / (x + 1)
-        p2 = r1 * p1
+            raise NotImplementedError
+
+    @property
+    def kernel_parameters(self):
+        base_parameters = self.base.kernel_parameters if isinstance(self.base, HeatExchanger) else {}
+        return {'kernel': self.base.p_kernel, 'shells': self.shells, 'arrangement': self.arrangement,
+                **base_parameters}
+
+
+def _kernel_groups(exchangers: list):
+    """
+    Group heat exchangers by their P kernel and kernel parameters.
+
+    Args:
+        exchangers (list): A list of heat exchangers.
+
+    Returns:
+        dict: The indices of the exchangers for every pair of kernel and sorted kernel parameters.
+
+    Raises:
+        NotImplementedError: If an exchanger has no specific type.
+    """
+    groups = {}
+    for i, ex in enumerate(exchangers):
+        key = ex.p_kernel, tuple(sorted(ex.kernel_parameters.items()))
+        groups.setdefault(key, []).append(i)
+    if any(kernel is None for kernel, _ in groups):
+        raise NotImplementedError
+    return groups
+
+
+def p_values(exchangers: list):
+    """
+    Get the dimensionless temperature changes of many heat exchangers.
+
+    The exchangers are grouped by their P kernel and kernel parameters and every group is evaluated
+    in a single vectorized call.
+
+    Args:
+        exchangers (list): A list of heat exchangers.
+
+    Returns:
+        numpy.ndarray: The dimensionless temperature changes P1 and P2 with the shape (2, number of exchangers).
 
-        return p1, p2
+    Raises:
+        NotImplementedError: If the dimensionless temperature change is required
+            from a heat exchanger with no specific type.
+    """
+    values = np.empty((2, len(exchangers)))
+    for (kernel, parameters), indices in _kernel_groups(exchangers).items():
+        ntu = np.array([exchangers[i].ntu[0] for i in indices], dtype=float)
+        r = np.array([exchangers[i].r[0] for i in indices], dtype=float)
+        p1 = kernel_tables.evaluate(kernel, ntu, r, **dict(parameters))
+        values[0, indices] = p1
+        values[1, indices] = r * p1
+    return values
+
+
+def p_derivative_values(exchangers: list):
+    """
+    Get the partial derivatives of the dimensionless temperature changes P1 of many heat exchangers.
+
+    The exchangers are grouped like in 'p_values' and every group is evaluated in a single vectorized call.
+
+    Args:
+        exchangers (list): A list of heat exchangers.
+
+    Returns:
+        numpy.ndarray: The derivatives dP1/dNTU1 and dP1/dR1 with the shape (2, number of exchangers).
+
+    Raises:
+        NotImplementedError: If the derivatives are required from a heat exchanger with no specific type.
+    """
+    values = np.empty((2, len(exchangers)))
+    for (kernel, parameters), indices in _kernel_groups(exchangers).items():
+        ntu = np.array([exchangers[i].ntu[0] for i in indices], dtype=float)
+        r = np.array([exchangers[i].r[0] for i in indices], dtype=float)
+        values[:, indices] = kernels.p_derivatives(kernel, ntu, r, **dict(parameters))
+    return values
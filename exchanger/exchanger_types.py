@@ -4,7 +4,6 @@ import exchanger
 import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
-from numpy.linalg import inv
 from itertools import permutations
 
 from .stream import Fluid, Flow
@@ -12,6 +11,7 @@ from .exchanger import HeatExchanger, ParallelFlow, CounterCurrentFlow, CrossFlo
 from .matrix_converter import *
 from .utils import get_available_class_names, get_def_or_calc_value
 from .network import ExchangerNetwork
+from .properties import PropertyBackend, with_backend
 from .parts import Assembly
 
 
@@ -22,6 +22,7 @@ class ExchangerTwoFlow(ExchangerNetwork):
         Attributes:
             flow_orders (list): A list of valid flow orders for the two flows.
             auto_adjust (bool): A flag indicating whether to automatically adjust temperatures and fluid properties.
+            property_workers (int): Number of threads evaluating the cell properties, serial evaluation if None.
             layout_matrix (np.ndarray): The layout matrix representing the arrangement of heat exchangers.
             in_flow_1 (Flow): The input flow for the first flow path.
             in_flow_2 (Flow): The input flow for the second flow path.
@@ -35,16 +36,19 @@ class ExchangerTwoFlow(ExchangerNetwork):
             flow_order_1 (str): The flow order for the first flow path.
             flow_2 (Flow): The input flow for the second flow path.
             flow_order_2 (str): The flow order for the second flow path.
+            backend (PropertyBackend, optional): The property backend used for the calculations of the network.
 
        """
     flow_orders = ['ul2r', 'dl2r', 'ur2l', 'dr2l', 'ul2d', 'ur2d', 'dl2u', 'dr2u']
     auto_adjust = True
+    property_workers = None
 
     def __init__(self, layout_matrix: np.ndarray = None, flow_1: Flow = None, flow_order_1: str = None,
-                 flow_2: Flow = None, flow_order_2: str = None, ):
+                 flow_2: Flow = None, flow_order_2: str = None, backend: PropertyBackend = None):
 
         self.layout_matrix = layout_matrix
-        super().__init__(input_flows=[NotImplemented, NotImplemented], output_flows=[NotImplemented, NotImplemented])
+        super().__init__(input_flows=[NotImplemented, NotImplemented], output_flows=[NotImplemented, NotImplemented],
+                         backend=backend)
         self.in_flow_1 = flow_1
         self.in_flow_2 = flow_2
         self.flow_order_1 = flow_order_1
@@ -239,6 +243,7 @@ class ExchangerTwoFlow(ExchangerNetwork):
         return output
 
     @property
+    @with_backend
     def heat_fluxes(self):
         """
         Get the total heat fluxs in the network.
@@ -484,6 +489,7 @@ class ExchangerTwoFlow(ExchangerNetwork):
         _ = self.structure_matrix
         return super().phi_matrix
 
+    @with_backend
     def _adjust_temperatures(self, iterations=1):
         """
         Adjust temperatures in the exchanger network and update fluid parameters.
@@ -510,11 +516,12 @@ class ExchangerTwoFlow(ExchangerNetwork):
             n = len(cell_out_temps) // 2
 
             exchangers_flattened_1, exchangers_flattened_2 = self._exchangers_flattened
-            for i, ex in enumerate(exchangers_flattened_1):
-                # adjust out temps
-                ex.flow_1.out_fluid.temperature = cell_out_temps[i]
-                ex.flow_2.out_fluid.temperature = cell_out_temps[n + i]
+            # adjust out temps of all cells with one batch property evaluation
+            out_fluids = [ex.flow_1.out_fluid for ex in exchangers_flattened_1] + \
+                         [ex.flow_2.out_fluid for ex in exchangers_flattened_1]
+            Fluid.set_temperatures(out_fluids, cell_out_temps, self.property_workers)
 
+            for i, ex in enumerate(exchangers_flattened_1):
                 # adjust in temp 1
                 if i > 0:
                     ex.flow_1.in_fluid.temperature = cell_out_temps[i - 1]
@@ -525,6 +532,7 @@ class ExchangerTwoFlow(ExchangerNetwork):
                     ex.flow_2.in_fluid.temperature = prev_out_temp
                 prev_out_temp = ex.flow_2.out_fluid.temperature
 
+    @with_backend
     def temperature_outputs_str(self):
         """
         Get a string representation of temperature outputs in °C.
@@ -611,6 +619,7 @@ class ExchangerTwoFlow(ExchangerNetwork):
         result = list(permutations(ExchangerTwoFlow.flow_orders, 2))
         return result
 
+    @with_backend
     def __repr__(self):
         """
         String representation of the ExchangerTwoFlow object.
@@ -642,14 +651,15 @@ class ExchangerEqualCells(ExchangerTwoFlow):
                  exchangers_type: str = 'HeatExchanger',
                  flow_1: Flow = None, flow_order_1: str = None,
                  flow_2: Flow = None, flow_order_2: str = None,
-                 assembly: Assembly = NotImplemented, total_transferability: float = NotImplemented):
+                 assembly: Assembly = NotImplemented, total_transferability: float = NotImplemented,
+                 backend: PropertyBackend = None):
         # layout matrix can be passed to super constructor because self layout_matrix setter will be used
         self.exchangers_type = exchangers_type
         self.assembly = assembly
         self.total_transferability = total_transferability
         super().__init__(layout_matrix=shape,
                          flow_1=flow_1, flow_order_1=flow_order_1,
-                         flow_2=flow_2, flow_order_2=flow_order_2)
+                         flow_2=flow_2, flow_order_2=flow_order_2, backend=backend)
 
     @property
     def exchangers_type(self):
@@ -761,7 +771,7 @@ class ExchangerEqualCells(ExchangerTwoFlow):
          Fill the layout matrix with Heat Exchanger objects of equal type.
          """
         try:
-            ex_class = globals()[self.exchangers_type]
+            ex_class = getattr(exchanger.exchanger, self.exchangers_type)
 
             for i in range(self.layout_matrix.shape[0]):
                 for j in range(self.layout_matrix.shape[1]):
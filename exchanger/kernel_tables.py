@@ -0,0 +1,380 @@
+"""
+Interpolation tables of the P kernels of expensive heat exchanger types.
+
+A table holds P1 of a kernel on a grid which is equidistant in log(NTU1) and log(R1) and answers by cubic B-spline
+interpolation. Elements outside of the tabulated region are evaluated with the exact kernel. Registered tables are
+used by 'HeatExchanger.p' and 'p_values' for all exchangers with the same kernel and kernel parameters.
+"""
+import logging
+import os
+import warnings
+
+import numpy as np
+from scipy import ndimage
+
+from . import _table_files, accelerated, kernels
+
+logging.debug(f'{__file__} will get logged')
+
+
+class KernelTable:
+    """
+    Tabulated dimensionless temperature changes P1 of a kernel on a (NTU1, R1) grid.
+
+    The grid is equidistant in log(NTU1) and log(R1) and extends 'padding' nodes beyond the tabulated ranges on every
+    side, so the boundary conditions of the cubic B-spline interpolation have no effect inside of the ranges.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        ntu_range (tuple): Minimal and maximal number of transfer units of flow 1, positive.
+        r_range (tuple): Minimal and maximal heat capacity flow ratio of flow 1, positive.
+        values (numpy.ndarray): P1 of the padded grid nodes.
+        error_bound (float, optional): The maximal absolute interpolation error of P1.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Attributes:
+        shape (tuple): Number of grid nodes inside of the ranges in NTU and R direction.
+
+    Methods:
+        from_kernel: Create a table by evaluating a kernel on a grid refined up to a tolerance.
+        save: Write the table to a '.npy' file with a '.json' header.
+        load: Read a table written by 'save'.
+        contains: Check if elements lie inside the tabulated region.
+        evaluate: Interpolate P1, elements outside the region are evaluated exactly.
+    """
+
+    file_version = 1
+    padding = 6
+
+    def __init__(self, kernel, /, ntu_range: tuple, r_range: tuple, values, error_bound: float = np.nan, **parameters):
+        self.kernel = kernel
+        self.parameters = parameters
+        self.ntu_range = tuple(float(value) for value in ntu_range)
+        self.r_range = tuple(float(value) for value in r_range)
+        self.error_bound = error_bound
+        self._values = np.asarray(values, dtype=float)
+        self.shape = tuple(size - 2 * self.padding for size in self._values.shape)
+        self._origin = np.log([self.ntu_range[0], self.r_range[0]])
+        self._step = (np.log([self.ntu_range[1], self.r_range[1]]) - self._origin) / (np.array(self.shape) - 1)
+        self._coefficients = ndimage.spline_filter(self._values, order=3, mode='mirror')
+
+    @classmethod
+    def from_kernel(cls, kernel, /, ntu_range: tuple = (1e-3, 20.), r_range: tuple = (1e-2, 1e2),
+                    tolerance: float = 1e-6, shape: tuple = (33, 33), max_nodes: int = 1025, **parameters):
+        """
+        Create a table by evaluating a kernel on a log-spaced grid, refined until the interpolation error is below
+        the tolerance.
+
+        The error is estimated at the midpoints of the grid edges and the centres of the grid cells, where the
+        bicubic interpolation is farthest from its nodes. The number of intervals is doubled separately in every
+        direction whose error exceeds half of the tolerance, e.g. in R1 direction for the steep change of the counter
+        current flow at R = 1.
+
+        Args:
+            kernel (callable): The P kernel, see 'exchanger.kernels'.
+            ntu_range (tuple, optional): Minimal and maximal number of transfer units. Defaults to (1e-3, 20).
+            r_range (tuple, optional): Minimal and maximal heat capacity flow ratio. Defaults to (1e-2, 1e2).
+            tolerance (float, optional): The maximal absolute interpolation error of P1. Defaults to 1e-6.
+            shape (tuple, optional): The initial number of grid nodes in NTU and R direction. Defaults to (33, 33).
+            max_nodes (int, optional): The maximal number of grid nodes per direction. Defaults to 1025.
+            **parameters: Additional keyword arguments of the kernel.
+
+        Raises:
+            ValueError: If a range is not positive or the grid is too small.
+
+        Warns:
+            UserWarning: If the tolerance is not reached with max_nodes nodes per direction.
+
+        Returns:
+            KernelTable: The evaluated table.
+        """
+        if min(ntu_range) <= 0 or min(r_range) <= 0:
+            raise ValueError("tabulated ranges must be positive, the grid is log-spaced")
+        if min(shape) < 4:
+            raise ValueError("bicubic interpolation needs at least 4 grid nodes per direction")
+        n_ntu, n_r = shape
+        while True:
+            log_ntu = _log_nodes(ntu_range, n_ntu, cls.padding)
+            log_r = _log_nodes(r_range, n_r, cls.padding)
+            table = cls(kernel, ntu_range, r_range, _evaluate_grid(kernel, log_ntu, log_r, parameters), **parameters)
+            inner_ntu, inner_r = log_ntu[cls.padding:-cls.padding], log_r[cls.padding:-cls.padding]
+            mid_ntu, mid_r = (inner_ntu[1:] + inner_ntu[:-1]) / 2, (inner_r[1:] + inner_r[:-1]) / 2
+            errors = []
+            for x, y in ((mid_ntu, inner_r), (inner_ntu, mid_r), (mid_ntu, mid_r)):
+                x, y = np.meshgrid(x, y, indexing='ij')
+                approx = table._interpolate(x, y)
+                errors.append(np.max(np.abs(approx - _evaluate_grid(kernel, x[:, 0], y[0], parameters))))
+            table.error_bound = float(max(errors))
+            # the error of the cell centres is about the sum of the errors in both directions
+            refine_ntu, refine_r = errors[0] > tolerance / 2, errors[1] > tolerance / 2
+            if not (refine_ntu or refine_r):
+                refine_ntu = refine_r = errors[2] > tolerance
+            refine_ntu, refine_r = refine_ntu and n_ntu < max_nodes, refine_r and n_r < max_nodes
+            if table.error_bound <= tolerance or not (refine_ntu or refine_r):
+                break
+            n_ntu = min(2 * n_ntu - 1, max_nodes) if refine_ntu else n_ntu
+            n_r = min(2 * n_r - 1, max_nodes) if refine_r else n_r
+        if table.error_bound > tolerance:
+            warnings.warn(f"error bound {table.error_bound:.2e} of the {table.name} table exceeds "
+                          f"tolerance {tolerance} with {max_nodes} nodes")
+        logging.debug(f"tabulated {table.name} with shape {table.shape}, error bound {table.error_bound}")
+        return table
+
+    @property
+    def name(self):
+        """
+        Get the name of the table from the kernel name and the kernel parameters, used as file name.
+
+        Returns:
+            str: The name of the table.
+        """
+        return table_name(self.kernel, **self.parameters)
+
+    def contains(self, ntu, r):
+        """
+        Check if elements lie inside the tabulated region.
+
+        Args:
+            ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+            r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+        Returns:
+            bool or numpy.ndarray: True for every element inside the tabulated region.
+        """
+        ntu_min, ntu_max = self.ntu_range
+        r_min, r_max = self.r_range
+        return (ntu_min <= ntu) & (ntu <= ntu_max) & (r_min <= r) & (r <= r_max)
+
+    def evaluate(self, ntu, r):
+        """
+        Interpolate P1 inside the tabulated region and evaluate the exact kernel outside of it.
+
+        Args:
+            ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+            r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+        Returns:
+            float or numpy.ndarray: The dimensionless temperature change P1 with the shape of the broadcast inputs.
+        """
+        ntu, r = np.broadcast_arrays(np.asarray(ntu, dtype=float), np.asarray(r, dtype=float))
+        inside = self.contains(ntu, r)
+        value = np.empty(ntu.shape)
+        value[inside] = self._interpolate(np.log(ntu[inside]), np.log(r[inside]))
+        if not np.all(inside):
+            outside = ~inside
+            value[outside] = self.kernel(ntu[outside], r[outside], **self.parameters)
+        return value[()] if value.ndim == 0 else value
+
+    def _interpolate(self, log_ntu, log_r):
+        """Evaluate the cubic B-spline at the logarithms of the numbers of transfer units and the ratios."""
+        coordinates = [(log_ntu - self._origin[0]) / self._step[0] + self.padding,
+                       (log_r - self._origin[1]) / self._step[1] + self.padding]
+        return ndimage.map_coordinates(self._coefficients, coordinates, order=3, prefilter=False, mode='mirror')
+
+    def save(self, directory: str):
+        """
+        Write the table to '<name>.npy' with the node values and '<name>.json' with the header.
+
+        The header holds the file version, the kernel and its parameters, the grid, the error bound and the SHA-256
+        hash of the '.npy' file, so stale files are detected by 'load'.
+
+        Args:
+            directory (str): The directory of the files, created if it does not exist.
+
+        Returns:
+            str: The path of the '.npy' file.
+        """
+        header = {'file_version': self.file_version, 'kernel': self.kernel.__name__,
+                  'parameters': {key: _serialize(value) for key, value in self.parameters.items()},
+                  'ntu_range': self.ntu_range, 'r_range': self.r_range, 'padding': self.padding,
+                  'error_bound': self.error_bound}
+        return _table_files.save(directory, self.name, self._values, header)
+
+    @classmethod
+    def load(cls, path: str, verify: bool = True):
+        """
+        Read a table written by 'save'.
+
+        Args:
+            path (str): The path of the '.npy' file.
+            verify (bool, optional): Check the SHA-256 hash of the '.npy' file against the header and the corner
+                and centre nodes against the current kernel. Defaults to True.
+
+        Raises:
+            FileNotFoundError: If the '.npy' or '.json' file does not exist.
+            ValueError: If the file is stale: written by another file version, modified after it was written
+                or the kernel changed.
+
+        Returns:
+            KernelTable: The loaded table.
+        """
+        header = _table_files.load_header(path)
+        if header.get('file_version') != cls.file_version or header.get('padding') != cls.padding:
+            raise ValueError(f"stale kernel table {path}: file version {header.get('file_version')}")
+        kernel = getattr(kernels, header['kernel'], None)
+        if not callable(kernel):
+            raise ValueError(f"stale kernel table {path}: unknown kernel {header['kernel']}")
+        if verify:
+            _table_files.check_hash(path, header, 'kernel table')
+        parameters = {key: _deserialize(value) for key, value in header['parameters'].items()}
+        table = cls(kernel, header['ntu_range'], header['r_range'], np.load(path), header['error_bound'],
+                    **parameters)
+        if verify:
+            # corner and centre nodes inside of the ranges
+            i, j = [[cls.padding, cls.padding + (size - 1) // 2, cls.padding + size - 1] for size in table.shape]
+            log_ntu = _log_nodes(table.ntu_range, table.shape[0], cls.padding)
+            log_r = _log_nodes(table.r_range, table.shape[1], cls.padding)
+            exact = _evaluate_grid(kernel, log_ntu[i], log_r[j], parameters)
+            if np.max(np.abs(exact - table._values[np.ix_(i, j)])) > max(table.error_bound, 1e-12):
+                raise ValueError(f"stale kernel table {path}: nodes do not match the kernel")
+        return table
+
+    def __repr__(self):
+        output = f"KernelTable: {self.name}\n"
+        output += f"\tNTU = {self.ntu_range[0]} ... {self.ntu_range[1]}, n = {self.shape[0]}\n"
+        output += f"\tR = {self.r_range[0]} ... {self.r_range[1]}, n = {self.shape[1]}\n"
+        output += f"\tP: absolute error <= {self.error_bound:.2e}\n"
+        return output
+
+
+def _log_nodes(value_range, nodes, padding):
+    """
+    Get the logarithms of the equidistant grid nodes of a range, extended by padding nodes on both sides.
+    """
+    low, high = np.log(value_range)
+    step = (high - low) / (nodes - 1)
+    return low + step * np.arange(-padding, nodes + padding)
+
+
+def _evaluate_grid(kernel, log_ntu, log_r, parameters):
+    """
+    Evaluate a kernel on all combinations of the log-spaced numbers of transfer units and heat capacity flow ratios.
+    """
+    return np.asarray(kernel(np.exp(log_ntu)[:, None], np.exp(log_r)[None, :], **parameters))
+
+
+def _serialize(value):
+    """
+    Convert a kernel parameter to JSON, kernels passed as parameters are stored by name.
+    """
+    return {'kernel': value.__name__} if callable(value) else value
+
+
+def _deserialize(value):
+    """
+    Convert a JSON kernel parameter written by '_serialize' back.
+    """
+    return getattr(kernels, value['kernel']) if isinstance(value, dict) else value
+
+
+def table_name(kernel, /, **parameters):
+    """
+    Get the name of the table of a kernel and its parameters, e.g. 'cross_counter_flow-passes=3'.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        str: The name of the table.
+    """
+    return '-'.join([kernel.__name__] + [f"{key}={getattr(value, '__name__', value)}"
+                                         for key, value in sorted(parameters.items())])
+
+
+def _key(kernel, parameters):
+    return kernel, tuple(sorted(parameters.items()))
+
+
+tables = {}
+
+
+def tabulate(kernel, /, ntu_range: tuple = (1e-3, 20.), r_range: tuple = (1e-2, 1e2), tolerance: float = 1e-6,
+             shape: tuple = (33, 33), directory: str = None, **parameters):
+    """
+    Create an interpolation table of a kernel and register it, so every heat exchanger with this kernel and these
+    kernel parameters is answered by interpolation inside the tabulated region.
+
+    With a directory the table is cached on disk: a table of the same kernel, ranges and a sufficient error bound
+    is loaded from it, otherwise the table is created and written to it.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        ntu_range (tuple, optional): Minimal and maximal number of transfer units. Defaults to (1e-3, 20).
+        r_range (tuple, optional): Minimal and maximal heat capacity flow ratio. Defaults to (1e-2, 1e2).
+        tolerance (float, optional): The maximal absolute interpolation error of P1. Defaults to 1e-6.
+        shape (tuple, optional): The initial number of grid nodes in NTU and R direction. Defaults to (33, 33).
+        directory (str, optional): The cache directory of the tables.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        KernelTable: The registered table.
+    """
+    table = None
+    if directory is not None:
+        path = os.path.join(directory, f"{table_name(kernel, **parameters)}.npy")
+        if os.path.exists(path):
+            try:
+                table = KernelTable.load(path)
+            except (OSError, ValueError) as e:
+                warnings.warn(f"kernel table not loaded: {e}")
+            else:
+                if not (np.allclose(table.ntu_range, ntu_range) and np.allclose(table.r_range, r_range)
+                        and table.error_bound <= tolerance):
+                    table = None
+    if table is None:
+        table = KernelTable.from_kernel(kernel, ntu_range, r_range, tolerance, shape, **parameters)
+        if directory is not None:
+            table.save(directory)
+    tables[_key(kernel, parameters)] = table
+    return table
+
+
+def get_table(kernel, /, **parameters):
+    """
+    Get the registered table of a kernel.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        KernelTable or None: The registered table or None if the kernel is not tabulated with these parameters.
+    """
+    return tables.get(_key(kernel, parameters))
+
+
+def remove_table(kernel=None, /, **parameters):
+    """
+    Remove a registered table, so the kernel is evaluated exactly again.
+
+    Args:
+        kernel (callable, optional): The P kernel. If None, all tables are removed.
+        **parameters: Additional keyword arguments of the kernel.
+    """
+    if kernel is None:
+        tables.clear()
+    else:
+        tables.pop(_key(kernel, parameters), None)
+
+
+def evaluate(kernel, ntu, r, /, **parameters):
+    """
+    Get P1 of a kernel, interpolated by its registered table or evaluated exactly if it is not tabulated.
+
+    Kernels without a table are evaluated by their compiled version if numba is available, see
+    'exchanger.accelerated'.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+    """
+    table = tables.get(_key(kernel, parameters)) if tables else None
+    if table is None:
+        return accelerated.evaluate(kernel, ntu, r, **parameters)
+    return table.evaluate(ntu, r)
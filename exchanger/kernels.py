@@ -0,0 +1,1212 @@
+"""
+Vectorized kernels of the dimensionless temperature change P(NTU, R) of the heat exchanger types.
+
+Every kernel takes the number of transfer units and the heat capacity flow ratio of flow 1 as floats or arrays
+of any broadcastable shape and returns P1 with the broadcast shape. P2 follows from P2 = R1 * P1.
+The closed forms are rearranged with expm1 and scaled exponentials, so they are accurate close to removable
+singularities like R = 1 and finite for NTU up to infinity. Remaining branches are selected element-wise with masks.
+The partial derivatives dP1/dNTU1 and dP1/dR1 of the kernels are available with 'p_derivatives'.
+"""
+import math
+import warnings
+
+import numpy as np
+from scipy import special
+
+
+def _broadcast(ntu, r):
+    """
+    Convert the inputs to broadcast float arrays.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+    Returns:
+        tuple (numpy.ndarray, numpy.ndarray): The broadcast number of transfer units and heat capacity flow ratios.
+    """
+    return np.broadcast_arrays(np.asarray(ntu, dtype=float), np.asarray(r, dtype=float))
+
+
+def _result(value):
+    """Return a numpy scalar for 0-d results and the array otherwise."""
+    return value[()] if value.ndim == 0 else value
+
+
+def parallel_flow(ntu, r):
+    """
+    Get the dimensionless temperature change of a parallel flow heat exchanger.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    return _result((1 - np.exp(-ntu * (1 + r))) / (1 + r))
+
+
+def counter_current_flow(ntu, r):
+    """
+    Get the dimensionless temperature change of a counter current flow heat exchanger.
+
+    The formula P1 = (1 - e) / (1 - R1 e) with e = exp(NTU1 (R1 - 1)) is evaluated as
+    P1 = 1 / (|1 - R1| / (1 - exp(-NTU1 |1 - R1|)) + min(R1, 1)),
+    which has no overflow for large NTU and no cancellation for R close to 1. It is continuous at R = 1.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1, NTU / (1 + NTU) for R = 1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    difference = np.abs(1 - r)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = ntu * difference
+        # 1 / NTU for R = 1 and x below the smallest float, NTU = 0 gives inf and P = 0
+        reciprocal = np.where(x > 0, difference / -np.expm1(-x), 1 / ntu)
+    return _result(1 / (reciprocal + np.minimum(r, 1)))
+
+
+def cross_flow_one_row(ntu, r):
+    """
+    Get the dimensionless temperature change of a one-sided cross-mixed crossflow heat exchanger.
+
+    Evaluated as P1 = -expm1(expm1(-R1 NTU1) / R1), which is accurate for small R1 NTU1 and has the limit
+    1 - exp(-NTU1) for R = 0.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the ideally mixed flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the ideally mixed flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = r * ntu
+        exponent = np.where(y > 0, np.expm1(-y) / r, -ntu)
+    return _result(-np.expm1(exponent))
+
+
+def one_outer_three_inner_two_counter_flow(ntu, r):
+    """
+    Get the dimensionless temperature change of a shell-and-tube heat exchanger
+    with one outer and three inner passages, two in counterflow.
+
+    The formula of the VDI Waermeatlas is 0 / 0 at R = 1 and overflows for large R1 NTU1. With epsilon = 1 / 3
+    the roots of the characteristic polynomial are s1,2 = NTU1 (-1 / 2 +- d), d = sqrt(1 / 4 - R1 (1 - R1) / 9),
+    so s1 = NTU1 (1 - R1) sigma with sigma = -R1 / (9 (1 / 2 + d)). Numerator and denominator are divided
+    by NTU1 (1 - R1) and by the largest exponentials, which gives a formula valid for all R including R = 1.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+
+    Notes:
+        Formula: VDI Waermeatlas, C1 Wärmeübertrager: Berechnungsmethoden, Tab 5
+    """
+    ntu, r = _broadcast(ntu, r)
+    # P is constant far below this limit, it avoids inf * 0 in the exponents
+    n = np.minimum(ntu, 1e300)
+    # d ** 2 = (R1 / 3 - 1 / 6) ** 2 + 2 / 9 without overflow of R1 ** 2
+    w = r / 3 - 1 / 6
+    d = np.hypot(w, math.sqrt(2) / 3)
+    sigma = -r / (9 * (0.5 + d))
+    s1, s2, s3 = n * (1 - r) * sigma, -n * (0.5 + d), r * n / 3
+    # s1 - s3 = NTU1 (d - w - 2 / 3) without cancellation of d - w for large R
+    s13 = n * (np.where(w > 0, 2 / 9 / (d + w), d - w) - 2 / 3)
+    # exponentials scaled with exp(-s3) and exp(-u), all arguments are not positive
+    u = np.maximum(s1, 0)
+    scale = np.exp(-u)
+    e1, e2 = np.exp(np.minimum(s1, 0)), np.exp(s2 - u)
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        # (exp(s1) - 1) / s1 scaled with exp(-u), 1 for s1 = 0
+        h = np.where(s1 > 0, -np.expm1(-s1) / s1, np.where(s1 < 0, np.expm1(s1) / s1, 1.)) * n * sigma
+    a = np.exp(s13) + 1  # (exp(s1) + exp(s3)) exp(-s3)
+    b = np.exp(s2 - s3) + 1  # (exp(s2) + exp(s3)) exp(-s3)
+    c = e1 * np.expm1(s2 - s1)  # (exp(s2) - exp(s1)) exp(-u)
+    g = np.exp(-s3)
+    numerator = sigma * a * np.expm1(s2) * scale + (0.5 + d) * b * h + c * (g + 1)
+    denominator = sigma * a * (r * e2 - scale) - (0.5 + d) * b * (scale - r * h) + c * (g + r)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = numerator / denominator
+    # NTU = 0 gives 0 / 0, P is 0 there
+    value = np.where(ntu == 0, 0., value)
+    return _result(value)
+
+
+def _cross_flow_limit(tolerance):
+    """
+    Get the smallest min(NTU1, R1 NTU1) of a crossflow with both flows unmixed evaluated asymptotically.
+
+    The error of '_cross_flow_asymptotic' is below 0.02 / ((2 m) ** 1.5 m) with m = min(NTU1, R1 NTU1).
+
+    Args:
+        tolerance (float): The bound of the absolute error of P1.
+
+    Returns:
+        float: The limit of m.
+    """
+    return (0.02 / (2 ** 1.5 * tolerance)) ** 0.4
+
+
+def _cross_flow_window(x, y):
+    """
+    Get the first index of the crossflow series terms which are summed up.
+
+    Both P(n + 1, NTU1) and P(n + 1, R1 NTU1) are 1 to double precision for n more than 10 standard deviations
+    below min(NTU1, R1 NTU1), these terms add 1 each.
+
+    Args:
+        x (numpy.ndarray): The number of transfer units of flow 1.
+        y (numpy.ndarray): The number of transfer units of flow 2.
+
+    Returns:
+        numpy.ndarray: The first index.
+    """
+    m = np.minimum(x, y)
+    return np.floor(np.maximum(m - 10 * np.sqrt(m) - 10, 0))
+
+
+def _cross_flow_asymptotic(x, y):
+    """
+    Get the dimensionless temperature change of a crossflow with both flows unmixed for large NTU.
+
+    The series of 'cross_flow_unmixed' is E[min(X, Y)] / y for independent Poisson variables X and Y with the means
+    x and y, so P1 = (x + y - E|D|) / (2 y) with the Skellam variable D = X - Y. With s = sqrt(x + y) and
+    t = (x - y) / s, the Edgeworth expansion of D and the Euler-Maclaurin correction of the kink of |D| give
+    E|D| - |x - y| = s h(t) - (1 + t ** 2) phi(t) / (4 s) + O(s ** -3), h(t) = 2 (phi(t) - |t| Phi(-|t|)).
+
+    Args:
+        x (numpy.ndarray): The number of transfer units of flow 1.
+        y (numpy.ndarray): The number of transfer units of flow 2.
+
+    Returns:
+        tuple: P1 and its partial derivatives dP1/dx and dP1/dy.
+    """
+    s = np.sqrt(x + y)
+    t = (x - y) / s
+    u = np.abs(t)
+    # phi(t) underflows far below |t| = 40, the clipped t keeps the products with phi(t) finite
+    t_clipped = np.clip(t, -40, 40)
+    phi = np.exp(-t_clipped ** 2 / 2) / math.sqrt(2 * math.pi)
+    tail = special.ndtr(-u)
+    h = 2 * (phi - u * tail)
+    g = s * h - (1 + t_clipped ** 2) * phi / (4 * s)
+    value = (np.minimum(x, y) - g / 2) / y
+    # derivatives of g with respect to s and t, ds/dx = ds/dy = 1 / (2 s)
+    g_s = h + (1 + t_clipped ** 2) * phi / (4 * s ** 2)
+    g_t = -2 * s * np.sign(t) * tail - t_clipped * (1 - t_clipped ** 2) * phi / (4 * s)
+    t_x, t_y = 1 / s - t / (2 * s ** 2), -1 / s - t / (2 * s ** 2)
+    # min(x, y) is not differentiable at x = y, the kink of |t| in g compensates it
+    m_x = np.where(x < y, 1., np.where(x == y, 0.5, 0.))
+    dp_dx = (m_x - (g_s / (2 * s) + g_t * t_x) / 2) / y
+    dp_dy = (1 - m_x - (g_s / (2 * s) + g_t * t_y) / 2) / y - value / y
+    return value, dp_dx, dp_dy
+
+
+def cross_flow_unmixed(ntu, r, tolerance: float = 1e-10, max_terms: int = 1000):
+    """
+    Get the dimensionless temperature change of a crossflow heat exchanger with both flows unmixed.
+
+    The exact solution is the series
+    P1 = 1 / (R1 NTU1) sum_n P(n + 1, NTU1) P(n + 1, R1 NTU1)
+    with the regularized lower incomplete gamma function P. The terms below a window around min(NTU1, R1 NTU1)
+    are 1, the series is summed from the window on and truncated as soon as the bound of the remaining terms is
+    below the tolerance for every element. Large NTU are evaluated with an asymptotic expansion, see
+    '_cross_flow_asymptotic', NTU = inf gives the limit min(1, 1 / R1).
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        tolerance (float): The bound of the absolute truncation error of P1.
+        max_terms (int): The maximal number of series terms.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+
+    Warns:
+        UserWarning: If the series did not reach the tolerance within max_terms terms.
+    """
+    ntu, r = _broadcast(ntu, r)
+    x = ntu
+    with np.errstate(invalid='ignore'):
+        y = r * ntu
+    # R = 0 or NTU = 0 give 0 / 0, a dummy value keeps the masked elements finite
+    degenerate = y == 0
+    infinite = np.isinf(x) | np.isinf(y)
+    asymptotic = ~infinite & (np.minimum(x, y) >= _cross_flow_limit(tolerance))
+    series = ~(degenerate | infinite | asymptotic)
+    x_safe, y_safe = np.where(series, x, 1.), np.where(series, y, 1.)
+
+    # P(n + 1, x) is the probability of a Poisson variable above n, it is updated with the Poisson probabilities
+    # in log space, which do not underflow for large NTU
+    log_x, log_y = np.log(x_safe), np.log(y_safe)
+    first = _cross_flow_window(x_safe, y_safe)
+    a, b = special.gammainc(first + 1, x_safe), special.gammainc(first + 1, y_safe)
+    total = first.copy()
+    for k in range(max_terms):
+        n = first + k
+        total += a * b
+        log_factorial = special.gammaln(n + 2)
+        a_next = a - np.exp((n + 1) * log_x - x_safe - log_factorial)
+        b_next = b - np.exp((n + 1) * log_y - y_safe - log_factorial)
+        # the terms decrease, the tail sum of P(k + 1, y) over k > n is y P(n + 1, y) - (n + 1) P(n + 2, y)
+        bound = a_next * (b - (n + 1) * b_next / y_safe)
+        a, b = a_next, b_next
+        if np.all((bound <= tolerance) | ~series):
+            break
+    else:
+        warnings.warn(f"crossflow series not converged within {max_terms} terms, "
+                      f"error bound {bound[series].max():.2e}")
+    value = np.where(degenerate, -np.expm1(-x), total / y_safe)
+    value = np.where(asymptotic, _cross_flow_asymptotic(np.where(asymptotic, x, 1.), np.where(asymptotic, y, 1.))[0],
+                     value)
+    # the limit NTU = inf, the truncated series may exceed the limits P1 <= 1 and R1 P1 <= 1 by rounding errors
+    value = np.where(infinite & ~degenerate, 1 / np.maximum(r, 1), value)
+    value = np.minimum(value, 1 / np.maximum(r, 1))
+    return _result(value)
+
+
+def _counter_growth(p, r, n):
+    """
+    Get the quantities of n equal units in overall counterflow arrangement without cancellation at R = 1.
+
+    X = ((1 - R p) / (1 - p)) ** n = exp(L) with L = n log1p(delta), delta = (1 - R) p / (1 - p), and
+    g = (X - 1) / (1 - R) is evaluated with the relative functions log1p(delta) / delta and expm1(L) / L.
+
+    Args:
+        p (numpy.ndarray): The dimensionless temperature change P1 of a single unit.
+        r (numpy.ndarray): The heat capacity flow ratio of flow 1.
+        n (int): The number of units.
+
+    Returns:
+        tuple: q = p / (1 - p), delta, L and g.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = p / (1 - p)
+        delta = (1 - r) * q
+        log_ratio = np.where(delta != 0, np.log1p(delta) / delta, 1.)
+        exponent = n * log_ratio * delta
+        growth = np.where(exponent != 0, np.expm1(exponent) / exponent, 1.)
+        g = growth * n * log_ratio * q
+    return q, delta, exponent, g
+
+
+def _counter_series(p, r, n):
+    """
+    Get the dimensionless temperature change of n equal units in overall counterflow arrangement.
+
+    Both flows are assumed to be mixed between the units.
+
+    Args:
+        p (numpy.ndarray): The dimensionless temperature change P1 of a single unit.
+        r (numpy.ndarray): The heat capacity flow ratio of flow 1.
+        n (int): The number of units.
+
+    Returns:
+        numpy.ndarray: The dimensionless temperature change P1 of the units in series.
+    """
+    # P = (X - 1) / (X - R) = g / (1 + g) has no cancellation and no branch at R = 1, see '_counter_growth'
+    _, delta, _, g = _counter_growth(p, r, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 1 / (1 + 1 / g)
+        # P = 1 or R P = 1 of a unit (delta = -1), all units in series reach the same limit
+        value = np.where(delta <= -1, 1 / r, value)
+    return np.where(p >= 1, 1., value)
+
+
+def cross_counter_flow(ntu, r, passes: int = 2):
+    """
+    Get the dimensionless temperature change of a multipass crossflow heat exchanger in overall counterflow.
+
+    Every pass is a crossflow with both flows unmixed and the same share of the transferability,
+    both flows are mixed between the passes.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        passes (int): The number of passes.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    p_pass = np.asarray(cross_flow_unmixed(ntu / passes, r))
+    return _result(_counter_series(p_pass, r, passes))
+
+
+def tema_e_one_two(ntu, r):
+    """
+    Get the dimensionless temperature change of a TEMA E shell with one shell pass and two tube passes.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+
+    Notes:
+        - The shell side flow is mixed over the cross-section, the result is independent of the tube pass direction.
+        - The formula is exact for two tube passes and a close approximation for 2n tube passes.
+
+        Formula: Shah, Sekulic, Fundamentals of Heat Exchanger Design, Tab. 3.6
+    """
+    ntu, r = _broadcast(ntu, r)
+    e = np.sqrt(1 + r ** 2)
+    with np.errstate(divide='ignore'):
+        # NTU = 0 gives coth = inf and P = 0
+        value = 2 / (1 + r + e / np.tanh(e * ntu / 2))
+    return _result(value)
+
+
+def tema_j_one_two(ntu, r):
+    """
+    Get the dimensionless temperature change of a TEMA J shell (divided flow) with two tube passes.
+
+    The shell side flow enters in the middle of the shell and leaves at both ends.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+
+    Notes:
+        Formula: Shah, Sekulic, Fundamentals of Heat Exchanger Design, Tab. 3.6,
+        rearranged with exp(-lambda NTU1) to avoid overflows for large NTU.
+    """
+    ntu, r = _broadcast(ntu, r)
+    # P is constant far below this limit, it avoids inf * 0 in the exponents
+    n = np.minimum(ntu, 1e300)
+    lam = np.hypot(1, r / 2)
+    e = np.exp(-lam * n)
+    denominator = (lam - 1) * e + 1 + lam
+    c = np.exp(n * (1 - lam) / 2) / denominator
+    with np.errstate(divide='ignore'):
+        # the terms with 1 / (1 - exp(-lambda NTU1)) of b and d are combined, NTU = 0 gives 1 / P = inf
+        singular = lam * ((lam - 1) * e ** 2 + 1 + lam) / (denominator * -np.expm1(-lam * n))
+        value = 1 / (1 + r / 2 - 2 * lam * c + singular)
+    return _result(value)
+
+
+def tema_g_one_two(ntu, r):
+    """
+    Get the dimensionless temperature change of a TEMA G shell (split flow) with two tube passes.
+
+    The shell side flow enters in the middle of the shell, splits over a longitudinal baffle and returns
+    to the outlet in the middle, the tube side flow enters in the outlet half of the shell.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+
+    Notes:
+        Formula: Shah, Sekulic, Fundamentals of Heat Exchanger Design, Tab. 3.6
+    """
+    ntu, r = _broadcast(ntu, r)
+    alpha = np.exp(-ntu * (2 + r) / 4)
+    a = -2 * r * (1 - alpha) ** 2 / (2 + r)
+    # b = (4 - beta (2 + R1)) / (2 - R1) with beta = exp(-NTU1 (2 - R1) / 2) is 4 (1 - beta) / (2 - R1) + beta,
+    # 1 + 2 NTU1 in the limit R = 2, it is large for R > 2 and the formula is evaluated with 1 / b
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        x = ntu * (2 - r) / 2
+        b = np.where(r != 2, -4 * np.expm1(-x) / (2 - r) + np.exp(-x), 1 + 2 * ntu)
+        reciprocal = 1 / b
+    value = (1 - alpha ** 2 * reciprocal) / ((a + 2) * reciprocal + r)
+    return _result(value)
+
+
+def _split_flow(ntu, r, units):
+    """
+    Get the dimensionless temperature change of split flow shells with two tube passes.
+
+    Every unit is a split flow shell section of the same length, the shell side flow enters it in the middle,
+    splits over a longitudinal baffle, turns at the ends of the unit and returns to the outlet in the middle.
+    The tube side flow passes the outlet halves of all units first and the inlet halves afterward.
+    The shell side flow is mixed over the cross-section of every half, so each of the 4 * units sections is a
+    parallel or counter current flow exchanger.
+    The outlet temperatures of all sections are affine in the unknown tube temperature at the pass turn,
+    which is solved for after a single sweep.
+
+    Args:
+        ntu (numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+        units (int): The number of split flow units, 1 for a TEMA G shell, 2 for a TEMA H shell.
+
+    Returns:
+        numpy.ndarray: The dimensionless temperature change P1.
+    """
+    # a section of a stream with a quarter of the shell flow per unit and a half of the tube pass transferability
+    r_section = r / (2 * units)
+    p_parallel = parallel_flow(ntu / 2, r_section)
+    p_counter = counter_current_flow(ntu / 2, r_section)
+    # sections from left to right, the shell flow in the inlet half runs towards the ends of the unit,
+    # the returning pass in the inlet half runs from right to left
+    sections = [p_parallel if k % 2 == 0 else p_counter for k in range(2 * units)]
+
+    # temperatures as (constant, coefficient of the turn temperature), dimensionless inlets 1 (shell) and 0 (tube)
+    tube = (0., 1.)
+    returned = [None] * len(sections)
+    for k in reversed(range(len(sections))):
+        difference = (1 - tube[0], -tube[1])
+        p = sections[k]
+        returned[k] = (1 - p * difference[0], -p * difference[1])
+        tube = (tube[0] + r_section * p * difference[0], tube[1] + r_section * p * difference[1])
+
+    # the returning shell flow and the first pass run in the opposite directions of the inlet half
+    tube = (0., 0.)
+    outlets = []
+    for p, shell in zip(sections, returned):
+        difference = (shell[0] - tube[0], shell[1] - tube[1])
+        outlets.append((shell[0] - p * difference[0], shell[1] - p * difference[1]))
+        tube = (tube[0] + r_section * p * difference[0], tube[1] + r_section * p * difference[1])
+    turn = tube[0] / (1 - tube[1])
+    return 1 - sum(constant + coefficient * turn for constant, coefficient in outlets) / len(outlets)
+
+
+def tema_h_one_two(ntu, r):
+    """
+    Get the dimensionless temperature change of a TEMA H shell (double split flow) with two tube passes.
+
+    The shell consists of two split flow units in a row, see 'tema_g_one_two', no mixing between the units.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    return _result(_split_flow(ntu, r, 2))
+
+
+def _parallel_series(p, r, n):
+    """
+    Get the dimensionless temperature change of n equal units in overall parallel flow arrangement.
+
+    Both flows are assumed to be mixed between the units.
+
+    Args:
+        p (numpy.ndarray): The dimensionless temperature change P1 of a single unit.
+        r (numpy.ndarray): The heat capacity flow ratio of flow 1.
+        n (int): The number of units.
+
+    Returns:
+        numpy.ndarray: The dimensionless temperature change P1 of the units in series.
+    """
+    return (1 - (1 - (1 + r) * p) ** n) / (1 + r)
+
+
+shell_arrangements = ['counter', 'parallel', 'split_1', 'split_2']
+
+
+def multi_shell(ntu, r, kernel, shells: int = 2, arrangement: str = 'counter', **parameters):
+    """
+    Get the dimensionless temperature change of equal shells from the dimensionless temperature change of one shell.
+
+    The transferability is shared equally by the shells. The arrangements are
+    - 'counter': both flows pass all shells in series, in overall counterflow,
+    - 'parallel': both flows pass all shells in series, in overall parallel flow,
+    - 'split_1': flow 1 is split equally over the shells, flow 2 passes them in series,
+    - 'split_2': flow 2 is split equally over the shells, flow 1 passes them in series.
+    Both flows are assumed to be mixed between the shells.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1 of all shells.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        kernel (callable): The P kernel of a single shell, see 'exchanger.kernels'.
+        shells (int): The number of shells.
+        arrangement (str): The arrangement of the shells, one of 'shell_arrangements'.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        float or numpy.ndarray: The dimensionless temperature change P1.
+
+    Raises:
+        NotImplementedError: If the arrangement is not in 'shell_arrangements'.
+    """
+    ntu, r = _broadcast(ntu, r)
+    if arrangement in ('counter', 'parallel'):
+        p = np.asarray(kernel(ntu / shells, r, **parameters))
+        series = _counter_series if arrangement == 'counter' else _parallel_series
+        value = series(p, r, shells)
+    elif arrangement == 'split_1':
+        # every shell sees the full NTU1 of its branch, flow 2 is cooled or heated shell by shell
+        p_2 = r / shells * np.asarray(kernel(ntu, r / shells, **parameters))
+        with np.errstate(divide='ignore'):
+            # R2 P2 = 1 of a shell gives log(0) and the limit P1 = 1 / R1
+            value = -np.expm1(shells * np.log1p(-p_2)) / r
+    elif arrangement == 'split_2':
+        p = np.asarray(kernel(ntu / shells, r * shells, **parameters))
+        value = -np.expm1(shells * np.log1p(-p))
+    else:
+        raise NotImplementedError
+    return _result(value)
+
+
+def _small_argument(x, direct, coefficients, threshold: float = 0.1):
+    """
+    Evaluate a function with a removable singularity at x = 0 by its Taylor series close to 0.
+
+    Args:
+        x (numpy.ndarray): The argument.
+        direct (callable): The closed form, which suffers from cancellation for small arguments.
+        coefficients (list): The Taylor coefficients in increasing order.
+        threshold (float): The largest absolute argument evaluated with the series.
+
+    Returns:
+        numpy.ndarray: The function values.
+    """
+    small = np.abs(x) < threshold
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        value = direct(np.where(small, threshold, x))
+    return np.where(small, np.polynomial.polynomial.polyval(np.where(small, x, 0.), coefficients), value)
+
+
+def _exponential_remainder(y):
+    """
+    Get (1 - exp(-y) (1 + y)) / y ** 2, the derivative of (exp(-y) - 1) / y, with its Taylor series for small y.
+
+    Args:
+        y (numpy.ndarray): The argument.
+
+    Returns:
+        numpy.ndarray: The function values.
+    """
+    return _small_argument(y, lambda y: (-np.expm1(-y) - y * np.exp(-y)) / y ** 2,
+                           [(-1) ** k * (k + 1) / math.factorial(k + 2) for k in range(10)])
+
+
+def parallel_flow_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a parallel flow heat exchanger.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    e = np.exp(-ntu * (1 + r))
+    p = -np.expm1(-ntu * (1 + r)) / (1 + r)
+    # NTU = inf gives inf * 0, P is constant there
+    with np.errstate(invalid='ignore'):
+        dp_dr = (np.where(e > 0, ntu * e, 0.) - p) / (1 + r)
+    return _result(e), _result(dp_dr)
+
+
+def counter_current_flow_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a counter current flow heat exchanger.
+
+    With x = NTU1 (1 - R1) the derivatives are dP1/dNTU1 = (1 - P1) (1 - R1 P1) and
+    dP1/dR1 = -NTU1 P1 (1 - P1) (1 / (1 - exp(-x)) - 1 / x), which are continuous at R = 1.
+    The smaller one of 1 - P1 and 1 - R1 P1 is evaluated with exp(-|x|) instead of a difference.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    p = np.asarray(counter_current_flow(ntu, r))
+    difference = np.abs(1 - r)
+    with np.errstate(invalid='ignore'):
+        x = np.where(difference > 0, ntu * difference, 0.)
+        # 1 - P1 for R1 <= 1 and 1 - R1 P1 for R1 > 1
+        ntu_reduced = np.where(x > 0, -np.expm1(-x) / np.where(difference > 0, difference, 1.), ntu)
+        v = np.exp(-x) / (1 + np.minimum(r, 1) * ntu_reduced)
+    complement_1 = np.where(r <= 1, v, (r - 1 + v) / np.maximum(r, 1))
+    complement_2 = np.where(r <= 1, 1 - r + r * v, v)
+    # Bernoulli series of 1 / (1 - exp(-x)) - 1 / x for the signed x
+    chi = _small_argument(np.sign(1 - r) * x, lambda x: 1 / -np.expm1(-x) - 1 / x,
+                          [1 / 2, 1 / 12, 0, -1 / 720, 0, 1 / 30240, 0, -1 / 1209600, 0, 1 / 47900160])
+    # NTU = inf gives inf * 0, P is constant there
+    with np.errstate(invalid='ignore'):
+        dp_dr = np.where(p * complement_1 > 0, -ntu * chi * p * complement_1, 0.)
+    # P1 = 1 / R1 for NTU = inf and R1 > 1
+    dp_dr = np.where(np.isinf(ntu) & (r > 1), -1 / np.maximum(r, 1) ** 2, dp_dr)
+    return _result(complement_1 * complement_2), _result(dp_dr)
+
+
+def cross_flow_one_row_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a one-sided cross-mixed
+    crossflow heat exchanger.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the ideally mixed flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the ideally mixed flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    y = r * ntu
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1 - P1 without cancellation for P1 close to 1
+        complement = np.exp(np.where(y > 0, np.expm1(-y) / r, -ntu))
+    dp_dr = np.where(complement > 0, -complement * ntu ** 2 * _exponential_remainder(y), 0.)
+    return _result(complement * np.exp(-y)), _result(dp_dr)
+
+
+def one_outer_three_inner_two_counter_flow_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a shell-and-tube heat exchanger
+    with one outer and three inner passages, two in counterflow.
+
+    The rearranged formula of 'one_outer_three_inner_two_counter_flow' is differentiated term by term.
+    Close to R = 1 the term with h = NTU1 sigma (exp(s1) - 1) / s1 is of order NTU1 in the numerator
+    and the denominator, so the derivative is formed with 1 - R1 P1 from the remaining terms.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    # P is constant far below this limit, the derivatives of the intermediate quantities are of order NTU1 ** 2
+    n = np.minimum(ntu, 1e100)
+    # the quantities of the kernel with their derivatives q_n = dq/dNTU1 and q_r = dq/dR1
+    w = r / 3 - 1 / 6
+    d = np.hypot(w, math.sqrt(2) / 3)
+    d_r = w / (3 * d)
+    sigma = -r / (9 * (0.5 + d))
+    sigma_r = -(1 - r * d_r / (0.5 + d)) / (9 * (0.5 + d))
+    s1, s2, s3 = n * (1 - r) * sigma, -n * (0.5 + d), r * n / 3
+    s1_n, s1_r = (1 - r) * sigma, n * ((1 - r) * sigma_r - sigma)
+    s2_n, s2_r = -(0.5 + d), -n * d_r
+    s3_n, s3_r = r / 3, n / 3
+    t = np.where(w > 0, 2 / 9 / (d + w), d - w)
+    t_r = np.where(w > 0, -2 / 9 * (d_r + 1 / 3) / (d + w) ** 2, d_r - 1 / 3)
+    s13 = n * (t - 2 / 3)
+    s13_n, s13_r = t - 2 / 3, n * t_r
+    positive = s1 > 0
+    u = np.maximum(s1, 0)
+    u_n, u_r = np.where(positive, s1_n, 0.), np.where(positive, s1_r, 0.)
+    scale = np.exp(-u)
+    e1, e2 = np.exp(np.minimum(s1, 0)), np.exp(s2 - u)
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        quotient = np.where(s1 > 0, -np.expm1(-s1) / s1, np.where(s1 < 0, np.expm1(s1) / s1, 1.))
+    # the derivative of the scaled (exp(s1) - 1) / s1 with respect to s1
+    quotient_s = np.where(positive, -1, 1) * _exponential_remainder(np.abs(s1))
+    h = quotient * n * sigma
+    h_n = quotient_s * s1_n * n * sigma + quotient * sigma
+    h_r = quotient_s * s1_r * n * sigma + quotient * n * sigma_r
+    exp_13, exp_23 = np.exp(s13), np.exp(s2 - s3)
+    a, b = exp_13 + 1, exp_23 + 1
+    a_n, a_r = exp_13 * s13_n, exp_13 * s13_r
+    b_n, b_r = exp_23 * (s2_n - s3_n), exp_23 * (s2_r - s3_r)
+    m = np.expm1(s2 - s1)
+    c = e1 * m
+    # e1 exp(s2 - s1) = e2
+    c_n = e1 * (s1_n - u_n) * m + e2 * (s2_n - s1_n)
+    c_r = e1 * (s1_r - u_r) * m + e2 * (s2_r - s1_r)
+    g = np.exp(-s3)
+    g_n, g_r = -g * s3_n, -g * s3_r
+    # expm1(s2) scaled with exp(-u)
+    f = np.expm1(s2) * scale
+    f_n, f_r = e2 * s2_n - f * u_n, e2 * s2_r - f * u_r
+    k = r * e2 - scale
+    k_n = r * e2 * (s2_n - u_n) + scale * u_n
+    k_r = e2 + r * e2 * (s2_r - u_r) + scale * u_r
+    # numerator = rest_1 + beta h and denominator = rest_2 + R1 beta h
+    beta = (0.5 + d) * b
+    beta_n, beta_r = (0.5 + d) * b_n, d_r * b + (0.5 + d) * b_r
+    rest_1 = sigma * a * f + c * (g + 1)
+    rest_1_n = sigma * (a_n * f + a * f_n) + c_n * (g + 1) + c * g_n
+    rest_1_r = sigma_r * a * f + sigma * (a_r * f + a * f_r) + c_r * (g + 1) + c * g_r
+    rest_2 = sigma * a * k - beta * scale + c * (g + r)
+    rest_2_n = sigma * (a_n * k + a * k_n) - beta_n * scale + beta * scale * u_n + c_n * (g + r) + c * g_n
+    rest_2_r = sigma_r * a * k + sigma * (a_r * k + a * k_r) - beta_r * scale + beta * scale * u_r \
+        + c_r * (g + r) + c * (g_r + 1)
+    beta_h = beta * h
+    beta_h_n, beta_h_r = beta_n * h + beta * h_n, beta_r * h + beta * h_r
+    denominator = rest_2 + r * beta_h
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = (rest_1 + beta_h) / denominator
+        # 1 - R1 P1 without the cancellation of the terms with h
+        complement = (rest_2 - r * rest_1) / denominator
+        dp_dntu = (rest_1_n - p * rest_2_n + complement * beta_h_n) / denominator
+        dp_dr = (rest_1_r - p * rest_2_r + complement * beta_h_r - p * beta_h) / denominator
+    return _result(np.where(ntu > n, 0., dp_dntu)), _result(dp_dr)
+
+
+def _cross_flow_partials(x, y, tolerance, max_terms):
+    """
+    Get the partial derivatives of the crossflow series with respect to x = NTU1 and y = R1 NTU1.
+
+    The derivative of P(n + 1, x) is the Poisson probability x ** n exp(-x) / n!, so the derivatives are series
+    of the same structure, summed from the window of 'cross_flow_unmixed' on. For y close to 0 the series has
+    cancellations and a Taylor polynomial in y is used, large NTU are evaluated with '_cross_flow_asymptotic'.
+    Infinite x or y give 0.
+
+    Args:
+        x (numpy.ndarray): The number of transfer units of flow 1.
+        y (numpy.ndarray): The number of transfer units of flow 2.
+        tolerance (float): The bound of the absolute truncation error.
+        max_terms (int): The maximal number of series terms.
+
+    Returns:
+        tuple: The partial derivatives dP1/dx and dP1/dy.
+
+    Warns:
+        UserWarning: If the series did not reach the tolerance within max_terms terms.
+    """
+    small = y < 5e-6
+    infinite = np.isinf(x) | np.isinf(y)
+    asymptotic = ~infinite & (np.minimum(x, y) >= _cross_flow_limit(tolerance))
+    series = ~(small | infinite | asymptotic)
+    x_safe, y_safe = np.where(series, x, 1.), np.where(series, y, 1.)
+    log_x, log_y = np.log(x_safe), np.log(y_safe)
+    first = _cross_flow_window(x_safe, y_safe)
+    a, b = special.gammainc(first + 1, x_safe), special.gammainc(first + 1, y_safe)
+    log_factorial = special.gammaln(first + 1)
+    pa, pb = np.exp(first * log_x - x_safe - log_factorial), np.exp(first * log_y - y_safe - log_factorial)
+    # the Poisson probabilities below the window vanish
+    total, sum_x, sum_y = first.copy(), np.zeros(x.shape), np.zeros(x.shape)
+    for k in range(max_terms):
+        n = first + k
+        total += a * b
+        sum_x += pa * b
+        sum_y += a * pb
+        log_factorial = special.gammaln(n + 2)
+        pa = np.exp((n + 1) * log_x - x_safe - log_factorial)
+        pb = np.exp((n + 1) * log_y - y_safe - log_factorial)
+        a_next, b_next = a - pa, b - pb
+        # the Poisson probabilities above n sum up to P(n + 1, .), the regularized gamma functions decrease
+        bound = (a * b_next + a_next * b) / y_safe
+        a, b = a_next, b_next
+        if np.all((bound <= tolerance) | ~series):
+            break
+    else:
+        warnings.warn(f"crossflow series not converged within {max_terms} terms, "
+                      f"error bound {bound[series].max():.2e}")
+    dp_dx = sum_x / y_safe
+    dp_dy = (sum_y - total / y_safe) / y_safe
+    _, asymptotic_x, asymptotic_y = _cross_flow_asymptotic(np.where(asymptotic, x, 1.), np.where(asymptotic, y, 1.))
+    dp_dx = np.where(asymptotic, asymptotic_x, dp_dx)
+    dp_dy = np.where(asymptotic, asymptotic_y, dp_dy)
+
+    # P1 = A0 + y (A1 - A0) / 2 + y ** 2 (A0 - 2 A1 + A2) / 6 with A_n = P(n + 1, x)
+    p0 = np.exp(-x)
+    with np.errstate(invalid='ignore'):
+        p1, p2 = np.where(p0 > 0, x * p0, 0.), np.where(p0 > 0, x ** 2 * p0 / 2, 0.)
+    y_small = np.where(small, y, 0.)
+    small_x = p0 + y_small * (p1 - p0) / 2 + y_small ** 2 * (p0 - 2 * p1 + p2) / 6
+    small_y = -p1 / 2 + y_small * (p1 - p2) / 3
+    dp_dx, dp_dy = np.where(small, small_x, dp_dx), np.where(small, small_y, dp_dy)
+    return np.where(infinite & ~small, 0., dp_dx), np.where(infinite & ~small, 0., dp_dy)
+
+
+def cross_flow_unmixed_derivatives(ntu, r, tolerance: float = 1e-10, max_terms: int = 1000):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a crossflow heat exchanger
+    with both flows unmixed.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        tolerance (float): The bound of the absolute truncation error of the series.
+        max_terms (int): The maximal number of series terms.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+
+    Warns:
+        UserWarning: If the series did not reach the tolerance within max_terms terms.
+    """
+    ntu, r = _broadcast(ntu, r)
+    with np.errstate(invalid='ignore'):
+        y = r * ntu
+    dp_dx, dp_dy = _cross_flow_partials(ntu, y, tolerance, max_terms)
+    # the limit NTU = inf is P1 = min(1, 1 / R1)
+    infinite = np.isinf(ntu) | np.isinf(y)
+    dp_dr = np.where(infinite, np.where(r > 1, -1 / np.maximum(r, 1) ** 2, 0.), np.where(infinite, 0., ntu) * dp_dy)
+    return _result(dp_dx + r * dp_dy), _result(dp_dr)
+
+
+def _counter_series_derivatives(p, r, n):
+    """
+    Get the partial derivatives of n equal units in overall counterflow arrangement, see '_counter_series'.
+
+    With 1 - C = 1 / (1 + g) and 1 - R C = X / (1 + g) the derivatives of C = (X - 1) / (X - R) are
+    dC/dp = n (X / (1 + delta)) / ((1 + g) (1 - p)) ** 2 and
+    dC/dR = (g - n q X / (1 + delta)) / ((1 + g) ** 2 (1 - R)). The numerator of dC/dR is of order 1 - R,
+    it is evaluated with its Taylor series in delta for small n delta.
+
+    Args:
+        p (numpy.ndarray): The dimensionless temperature change P1 of a single unit.
+        r (numpy.ndarray): The heat capacity flow ratio of flow 1.
+        n (int): The number of units.
+
+    Returns:
+        tuple: The partial derivatives dC/dp and dC/dR.
+    """
+    q, delta, exponent, g = _counter_growth(p, r, n)
+    # the coefficients of delta ** k of 1 - (1 + delta) ** -n - n delta / (1 + delta) are
+    # (-1) ** k (n - binomial(n + k - 1, k)) for k >= 2
+    coefficients, binomial = [], n
+    for k in range(2, 12):
+        binomial *= (n + k - 1) / k
+        coefficients.append((-1) ** k * (n - binomial))
+    small = np.abs(n * delta) < 0.01
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        reduced = np.exp((n - 1) * np.log1p(delta))  # X / (1 + delta)
+        dc_dp = n * reduced / ((1 + g) * (1 - p)) ** 2
+        dc_dr = (g - n * q * reduced) / ((1 + g) ** 2 * (1 - r))
+        series = np.exp(exponent) / (1 + g) ** 2 * q ** 2 * np.polynomial.polynomial.polyval(
+            np.where(small, delta, 0.), coefficients)
+        dc_dr = np.where(small, series, dc_dr)
+        # C = 1 to double precision if (1 + g) ** 2 overflows, units at their limits P = 1 or R P = 1
+        saturated = (p >= 1) | ~np.isfinite((1 + g) ** 2)
+        dc_dp = np.where(saturated | (delta <= -1), 0., dc_dp)
+        dc_dr = np.where(saturated, 0., np.where(delta <= -1, -1 / r ** 2, dc_dr))
+    return dc_dp, dc_dr
+
+
+def _parallel_series_derivatives(p, r, n):
+    """
+    Get the partial derivatives of n equal units in overall parallel flow arrangement, see '_parallel_series'.
+
+    Args:
+        p (numpy.ndarray): The dimensionless temperature change P1 of a single unit.
+        r (numpy.ndarray): The heat capacity flow ratio of flow 1.
+        n (int): The number of units.
+
+    Returns:
+        tuple: The partial derivatives dC/dp and dC/dR.
+    """
+    base = (1 - (1 + r) * p) ** (n - 1)
+    return n * base, (n * p * base - _parallel_series(p, r, n)) / (1 + r)
+
+
+def cross_counter_flow_derivatives(ntu, r, passes: int = 2):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a multipass crossflow heat exchanger
+    in overall counterflow.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        passes (int): The number of passes.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    return multi_shell_derivatives(ntu, r, cross_flow_unmixed, passes, 'counter')
+
+
+def tema_e_one_two_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a TEMA E shell with two tube passes.
+
+    With s = sqrt(1 + R1 ** 2) and u = s NTU1 / 2 the hyperbolic functions are scaled with exp(-u),
+    coth(u) - u / sinh(u) ** 2 is evaluated with its Taylor series for small u.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    s = np.sqrt(1 + r ** 2)
+    u = s * ntu / 2
+    e = np.exp(-2 * u)
+    # 2 exp(-u) ((1 + R1) sinh(u) + s cosh(u)) without overflow
+    scaled = (1 + r) * -np.expm1(-2 * u) + s * (1 + e)
+    dp_dntu = 4 * s ** 2 * e / scaled ** 2
+    # derivative of u coth(u)
+    hyperbolic = _small_argument(u, lambda u: (1 + np.exp(-2 * u)) / -np.expm1(-2 * u)
+                                 - 4 * u * np.exp(-2 * u) / np.expm1(-2 * u) ** 2,
+                                 [0, 2 / 3, 0, -4 / 45, 0, 12 / 945, 0, -8 / 4725, 0, 20 / 93555])
+    p = np.asarray(tema_e_one_two(ntu, r))
+    dp_dr = -p ** 2 / 2 * (1 + r / s * hyperbolic)
+    return _result(dp_dntu), _result(dp_dr)
+
+
+def tema_j_one_two_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a TEMA J shell with two tube passes.
+
+    The rearranged formula of 'tema_j_one_two' is differentiated term by term. The singular term is of order
+    1 / NTU1 for small NTU, it is multiplied with P1 before the derivatives of its logarithm.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    # P is constant far below this limit, it avoids inf * 0 in the exponents
+    n = np.minimum(ntu, 1e300)
+    # the quantities of the kernel with their derivatives q_n = dq/dNTU1 and q_r = dq/dR1
+    lam = np.hypot(1, r / 2)
+    lam_r = r / (4 * lam)
+    e = np.exp(-lam * n)
+    e_n, e_r = -lam * e, -n * lam_r * e
+    denominator = (lam - 1) * e + 1 + lam
+    denominator_n = (lam - 1) * e_n
+    denominator_r = lam_r * (e + 1) + (lam - 1) * e_r
+    c = np.exp(n * (1 - lam) / 2) / denominator
+    c_n = c * ((1 - lam) / 2 - denominator_n / denominator)
+    c_r = c * (-n * lam_r / 2 - denominator_r / denominator)
+    # singular = lambda v / (denominator (1 - e))
+    v = (lam - 1) * e ** 2 + 1 + lam
+    v_n = 2 * (lam - 1) * e * e_n
+    v_r = lam_r * (e ** 2 + 1) + 2 * (lam - 1) * e * e_r
+    m = -np.expm1(-lam * n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        singular = lam * v / (denominator * m)
+        reciprocal = 1 + r / 2 - 2 * lam * c + singular
+        p = 1 / reciprocal
+        p_singular = singular / reciprocal
+        dp_dntu = -p * (-2 * lam * c_n * p + p_singular * (v_n / v - denominator_n / denominator + e_n / m))
+        dp_dr = -p * ((0.5 - 2 * (lam_r * c + lam * c_r)) * p
+                      + p_singular * (lam_r / lam + v_r / v - denominator_r / denominator + e_r / m))
+    # P1 = NTU1 to first order
+    return _result(np.where(ntu == 0, 1., dp_dntu)), _result(np.where(ntu == 0, 0., dp_dr))
+
+
+def _jet_product(a, b):
+    """Multiply two jets, the values and their derivatives with respect to NTU1 and R1 along the first axis."""
+    return np.stack([a[0] * b[0], a[0] * b[1] + a[1] * b[0], a[0] * b[2] + a[2] * b[0]])
+
+
+def _split_flow_derivatives(ntu, r, units):
+    """
+    Get the partial derivatives of the dimensionless temperature change of split flow shells, see '_split_flow'.
+
+    The sweep of '_split_flow' is repeated with jets of all temperatures, which carry the derivatives with respect
+    to NTU1 and R1 by the chain rule. The derivatives of the sections follow from the parallel and counter current
+    flow derivatives at NTU1 / 2 and R1 / (2 units).
+
+    Args:
+        ntu (numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+        units (int): The number of split flow units, 1 for a TEMA G shell, 2 for a TEMA H shell.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    r_section = r / (2 * units)
+    jets = []
+    for kernel, derivatives in ((parallel_flow, parallel_flow_derivatives),
+                                (counter_current_flow, counter_current_flow_derivatives)):
+        dp_dntu, dp_dr = derivatives(ntu / 2, r_section)
+        jets.append(np.stack(np.broadcast_arrays(kernel(ntu / 2, r_section), dp_dntu / 2, dp_dr / (2 * units))))
+    p_parallel, p_counter = jets
+    zero = np.zeros_like(p_parallel)
+    one = zero.copy()
+    one[0] = 1
+    r_jet = zero.copy()
+    r_jet[0], r_jet[2] = r_section, 1 / (2 * units)
+    # the sections with their P1 and R_section P1
+    sections = [(p, _jet_product(r_jet, p)) for p in (p_parallel, p_counter)]
+    sections = [sections[k % 2] for k in range(2 * units)]
+
+    # temperatures as (constant, coefficient of the turn temperature) like in '_split_flow'
+    tube = (zero, one)
+    returned = [None] * len(sections)
+    for k in reversed(range(len(sections))):
+        difference = (one - tube[0], -tube[1])
+        p, q = sections[k]
+        returned[k] = (one - _jet_product(p, difference[0]), -_jet_product(p, difference[1]))
+        tube = (tube[0] + _jet_product(q, difference[0]), tube[1] + _jet_product(q, difference[1]))
+
+    tube = (zero, zero)
+    outlets = []
+    for (p, q), shell in zip(sections, returned):
+        difference = (shell[0] - tube[0], shell[1] - tube[1])
+        outlets.append((shell[0] - _jet_product(p, difference[0]), shell[1] - _jet_product(p, difference[1])))
+        tube = (tube[0] + _jet_product(q, difference[0]), tube[1] + _jet_product(q, difference[1]))
+    # turn = tube[0] / (1 - tube[1]) and its derivatives by the quotient rule
+    turn = np.empty_like(zero)
+    turn[0] = tube[0][0] / (1 - tube[1][0])
+    turn[1:] = (tube[0][1:] + turn[0] * tube[1][1:]) / (1 - tube[1][0])
+    total = sum(constant + _jet_product(coefficient, turn) for constant, coefficient in outlets)
+    return -total[1] / len(outlets), -total[2] / len(outlets)
+
+
+def tema_g_one_two_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a TEMA G shell with two tube passes.
+
+    The closed form of 'tema_g_one_two' equals the split flow model with one unit, which is differentiated
+    with the chain rule, see '_split_flow_derivatives'. It has no removable singularity at R = 2.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    dp_dntu, dp_dr = _split_flow_derivatives(ntu, r, 1)
+    return _result(dp_dntu), _result(dp_dr)
+
+
+def tema_h_one_two_derivatives(ntu, r):
+    """
+    Get the partial derivatives of the dimensionless temperature change of a TEMA H shell with two tube passes.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of the shell side flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of the shell side flow 1.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+    dp_dntu, dp_dr = _split_flow_derivatives(ntu, r, 2)
+    return _result(dp_dntu), _result(dp_dr)
+
+
+def multi_shell_derivatives(ntu, r, kernel, shells: int = 2, arrangement: str = 'counter', **parameters):
+    """
+    Get the partial derivatives of the dimensionless temperature change of equal shells, see 'multi_shell'.
+
+    The derivatives of a single shell are chained with the derivatives of the arrangement.
+
+    Args:
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1 of all shells.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        kernel (callable): The P kernel of a single shell, see 'exchanger.kernels'.
+        shells (int): The number of shells.
+        arrangement (str): The arrangement of the shells, one of 'shell_arrangements'.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+
+    Raises:
+        NotImplementedError: If the arrangement is not in 'shell_arrangements'.
+    """
+    ntu, r = _broadcast(ntu, r)
+    if arrangement in ('counter', 'parallel'):
+        p = np.asarray(kernel(ntu / shells, r, **parameters))
+        dk_dntu, dk_dr = p_derivatives(kernel, ntu / shells, r, **parameters)
+        series = _counter_series_derivatives if arrangement == 'counter' else _parallel_series_derivatives
+        dc_dp, dc_dr = series(p, r, shells)
+        dp_dntu, dp_dr = dc_dp * dk_dntu / shells, dc_dp * dk_dr + dc_dr
+    elif arrangement == 'split_1':
+        k = np.asarray(kernel(ntu, r / shells, **parameters))
+        dk_dntu, dk_dr = p_derivatives(kernel, ntu, r / shells, **parameters)
+        p_2 = r / shells * k
+        # P1 = F(P2) / R1 with F(P2) = 1 - (1 - P2) ** shells, the terms of order 1 / R1 cancel in
+        # dP1/dR1 = F'(P2) dk/dR / shells ** 2 + (P2 F'(P2) - F(P2)) / R1 ** 2, the last term is
+        # (k / shells) ** 2 H(P2) with the polynomial H(P2) = (P2 F'(P2) - F(P2)) / P2 ** 2
+        coefficients = [(-1) ** (j + 1) * (j - 1) * math.comb(shells, j) for j in range(2, shells + 1)]
+        h = _small_argument(p_2, lambda p: ((1 - p) ** (shells - 1) * (1 + (shells - 1) * p) - 1) / p ** 2,
+                            coefficients, 0.5)
+        base = (1 - p_2) ** (shells - 1)
+        dp_dntu = base * dk_dntu
+        dp_dr = base * dk_dr / shells + (k / shells) ** 2 * h
+    elif arrangement == 'split_2':
+        k = np.asarray(kernel(ntu / shells, r * shells, **parameters))
+        dk_dntu, dk_dr = p_derivatives(kernel, ntu / shells, r * shells, **parameters)
+        base = (1 - k) ** (shells - 1)
+        dp_dntu, dp_dr = base * dk_dntu, shells ** 2 * base * dk_dr
+    else:
+        raise NotImplementedError
+    return _result(dp_dntu), _result(dp_dr)
+
+
+def _numerical_derivatives(kernel, ntu, r, /, **parameters):
+    """
+    Get the partial derivatives of a P kernel by fourth order finite differences.
+
+    Used for user-defined kernels without an entry in 'derivative_kernels', all kernels of this module have
+    analytic derivatives. The steps are relative to the arguments, a one-sided stencil is used next to NTU = 0
+    and R = 0. The kernels need no property evaluations, so the ten evaluations are cheap compared to
+    finite differences of the heat exchanger.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1.
+    """
+    ntu, r = _broadcast(ntu, r)
+
+    def derivative(x, evaluate):
+        h = 1e-3 * np.maximum(x, 1e-2)
+        central = x >= 2 * h
+        # the points x - 2 h, x - h, x + h, x + 2 h, or x, x + h, ..., x + 4 h next to 0
+        start = np.where(central, x - 2 * h, x)
+        f = [np.asarray(evaluate(start + k * h)) for k in range(5)]
+        central_value = (f[0] - 8 * f[1] + 8 * f[3] - f[4]) / (12 * h)
+        forward_value = (-25 * f[0] + 48 * f[1] - 36 * f[2] + 16 * f[3] - 3 * f[4]) / (12 * h)
+        return np.where(central, central_value, forward_value)
+
+    dp_dntu = derivative(ntu, lambda x: kernel(x, r, **parameters))
+    dp_dr = derivative(r, lambda x: kernel(ntu, x, **parameters))
+    return _result(dp_dntu), _result(dp_dr)
+
+
+# analytic derivatives of the P kernels, user-defined kernels are differentiated numerically
+derivative_kernels = {
+    parallel_flow: parallel_flow_derivatives,
+    counter_current_flow: counter_current_flow_derivatives,
+    cross_flow_one_row: cross_flow_one_row_derivatives,
+    one_outer_three_inner_two_counter_flow: one_outer_three_inner_two_counter_flow_derivatives,
+    cross_flow_unmixed: cross_flow_unmixed_derivatives,
+    cross_counter_flow: cross_counter_flow_derivatives,
+    tema_e_one_two: tema_e_one_two_derivatives,
+    tema_j_one_two: tema_j_one_two_derivatives,
+    tema_g_one_two: tema_g_one_two_derivatives,
+    tema_h_one_two: tema_h_one_two_derivatives,
+    multi_shell: multi_shell_derivatives,
+}
+
+
+def p_derivatives(kernel, ntu, r, /, **parameters):
+    """
+    Get the partial derivatives of the dimensionless temperature change P1 of a kernel.
+
+    The analytic derivatives of 'derivative_kernels' are used, kernels without an entry, e.g. user-defined
+    kernels, are differentiated with finite differences, see '_numerical_derivatives'.
+    The derivatives of P2 = R1 P1 are dP2/dNTU1 = R1 dP1/dNTU1 and dP2/dR1 = P1 + R1 dP1/dR1.
+
+    Args:
+        kernel (callable): The P kernel, see 'exchanger.kernels'.
+        ntu (float or numpy.ndarray): The number of transfer units of flow 1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        tuple: The derivatives dP1/dNTU1 and dP1/dR1 with the broadcast shape of ntu and r.
+    """
+    function = derivative_kernels.get(kernel)
+    if function is None:
+        return _numerical_derivatives(kernel, ntu, r, **parameters)
+    return function(ntu, r, **parameters)
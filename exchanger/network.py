@@ -1,10 +1,18 @@
+import warnings
+from collections import namedtuple
+
 import matplotlib.offsetbox
 import numpy as np
-from numpy.linalg import inv
 import matplotlib.pyplot as plt
+from scipy.linalg import LinAlgWarning, lu_factor, lu_solve
 
+from . import accelerated
 from .stream import Fluid, Flow
-from .exchanger import HeatExchanger, ParallelFlow, CounterCurrentFlow
+from .properties import PropertyBackend, with_backend
+from .exchanger import HeatExchanger, ParallelFlow, CounterCurrentFlow, p_values, p_derivative_values
+
+NetworkJacobian = namedtuple('NetworkJacobian', ['p1', 'p2', 'ntu', 'r', 'heat_transferability'])
+CellsFactorization = namedtuple('CellsFactorization', ['lu', 'piv', 'phi'])
 
 
 class ExchangerNetwork:
@@ -15,16 +23,22 @@ class ExchangerNetwork:
             input_flows (list, optional): A list of input flows to the network.
             exchangers (list, optional): A list of heat exchangers in the network.
             output_flows (list, optional): A list of output flows from the network.
+            backend (PropertyBackend, optional): The property backend used for the calculations of the network.
 
         Attributes:
             input_temps (tuple): A tuple containing input temperatures and their dimensionless representation.
             structure_matrix (numpy.ndarray, optional): The structure matrix of the network.
             input_matrix (numpy.ndarray, optional): The input matrix of the network.
             output_matrix (numpy.ndarray, optional): The output matrix of the network.
+            backend (PropertyBackend or None): The property backend used for the calculations of the network,
+                the active backend if None.
 
     """
 
-    def __init__(self, input_flows: list = None, exchangers: list = None, output_flows: list = None):
+    def __init__(self, input_flows: list = None, exchangers: list = None, output_flows: list = None,
+                 backend: PropertyBackend = None):
+        self.backend = backend
+
         if input_flows is None:
             input_flows = list()
         self.input_flows = input_flows
@@ -39,6 +53,30 @@ class ExchangerNetwork:
 
         self._input_temps = [], None
 
+    @property
+    def backend(self):
+        """
+        Get or set the property backend of the network.
+
+        The fluid properties of all calculations of the network are evaluated with this backend, e.g. a cheap backend
+        for screening runs and the full equation of state for the final verification.
+
+        Args:
+            value (PropertyBackend or None): The property backend, the active backend is used if None.
+
+        Raises:
+            NotImplementedError: If the provided value is not a PropertyBackend.
+
+        """
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        if value is None or isinstance(value, PropertyBackend):
+            self._backend = value
+        else:
+            raise NotImplementedError
+
     @property
     def input_flows(self):
         """
@@ -238,6 +276,7 @@ class ExchangerNetwork:
         return self.input_temps[1]
 
     @property
+    @with_backend
     def phi_matrix(self):
         """
         Get or set the phi matrix of the network.
@@ -254,14 +293,12 @@ class ExchangerNetwork:
         except AttributeError:
             exchangers = self.exchangers
             dim = len(exchangers)
-            shape = (dim, dim)
 
-            phi_1 = np.zeros(shape)
-            phi_2 = np.zeros(shape)
             identity = np.eye(dim)
-
-            for i, ex in enumerate(exchangers):
-                phi_1[i, i], phi_2[i, i] = ex.p
+            # the P values of all cells in one vectorized call per exchanger type
+            p1, p2 = p_values(exchangers)
+            phi_1 = np.diag(p1)
+            phi_2 = np.diag(p2)
             value = np.block([[identity - phi_1, phi_1], [phi_2, identity - phi_2]])
         return value
 
@@ -272,25 +309,56 @@ class ExchangerNetwork:
         else:
             raise NotImplementedError
 
-    def _cells_characteristic(self):
+    @with_backend
+    def cells_factorization(self):
         """
-        Calculate the characteristics of the network cells.
+        Get the LU factorization of the cell equations (I - phi S) x = phi B u of the network.
+
+        The factorization costs O(n^3) once, every further solve with it, e.g. for other input temperatures, costs
+        O(n^2), see '_cells_characteristic'.
 
         Returns:
-            numpy.ndarray: The calculated characteristics of the network cells.
+            CellsFactorization: The LU factors and pivot indices of I - phi S, see 'scipy.linalg.lu_factor', and the
+                phi matrix they belong to.
+
+        Raises:
+            numpy.linalg.LinAlgError: If I - phi S is singular.
 
         """
         phi = self.phi_matrix
-        s = self.structure_matrix
-        inp = self.input_matrix
+        with warnings.catch_warnings():
+            # a singular matrix is raised below
+            warnings.simplefilter('ignore', LinAlgWarning)
+            lu, piv = lu_factor(np.eye(phi.shape[0]) - phi @ self.structure_matrix)
+        if not np.all(np.diag(lu)):
+            raise np.linalg.LinAlgError("Singular matrix")
+        return CellsFactorization(lu, piv, phi)
 
-        ps = phi @ s
-        identity = np.eye(ps.shape[0])
+    @with_backend
+    def _cells_characteristic(self, inputs=None, factorization=None):
+        """
+        Calculate the characteristics of the network cells.
 
-        value = inv((identity - ps)) @ phi @ inp
-        return value
+        The characteristic (I - phi S)^-1 phi B is solved with the LU factorization of I - phi S, the inverse is never
+        formed. If inputs are given, only the right-hand side phi B inputs is solved for, e.g. the cell temperatures
+        of the input temperatures.
+
+        Args:
+            inputs (numpy.ndarray, optional): The matrix multiplied to the characteristic from the right.
+            factorization (CellsFactorization, optional): The factorization of the cell equations for reuse,
+                see 'cells_factorization'. Computed if None.
+
+        Returns:
+            numpy.ndarray: The calculated characteristics of the network cells, multiplied by inputs if given.
+
+        """
+        if factorization is None:
+            factorization = self.cells_factorization()
+        rhs = self.input_matrix if inputs is None else self.input_matrix @ inputs
+        return lu_solve((factorization.lu, factorization.piv), factorization.phi @ rhs)
 
     @property
+    @with_backend
     def temperature_matrix(self):
         """
         Get the temperature matrix of the network.
@@ -299,10 +367,11 @@ class ExchangerNetwork:
             tuple: A tuple containing the temperature matrix and its dimensional representation.
 
         """
-        value = self._cells_characteristic() @ self.temperature_input_matrix
+        value = self._cells_characteristic(self.temperature_input_matrix)
         return value, self._dimles_2_temp(value)
 
     @property
+    @with_backend
     def network_characteristics(self):
         """
         Get the network characteristics.
@@ -313,6 +382,79 @@ class ExchangerNetwork:
         """
         return self.output_matrix @ self._cells_characteristic()
 
+    @with_backend
+    def output_jacobian(self):
+        """
+        Get the derivatives of the output temperatures with respect to the parameters of the cells.
+
+        With A = I - phi S the cell outputs are x = A^-1 phi B u and the cell inputs are z = S x + B u.
+        Implicit differentiation gives dx = A^-1 dphi z, and dphi has only two entries per P value, so all
+        derivatives follow from the rows of O A^-1, which are solved with the transposed LU factorization of A,
+        without a further factorization or property evaluation.
+        The derivatives with respect to NTU1, R1 and the heat transferability of every cell are chained with
+        the analytic derivatives of the P kernels, see 'exchanger.kernels.p_derivatives'. The heat capacity flows
+        are kept constant.
+
+        Returns:
+            tuple: The NetworkJacobian of the dimensionless output temperatures and the NetworkJacobian of the
+                output temperatures in K, with arrays of the shape (number of outputs, number of cells) for the
+                derivatives with respect to P1, P2, NTU1, R1 and the heat transferability in W/K of every cell.
+                The derivatives with respect to NTU1, R1 and the heat transferability are None if the network
+                has no exchangers, e.g. if the phi matrix is set directly.
+        """
+        factorization = self.cells_factorization()
+        phi = factorization.phi
+        s = self.structure_matrix
+        inp = self.input_matrix @ self.temperature_input_matrix
+        n = phi.shape[0] // 2
+
+        lu = factorization.lu, factorization.piv
+        z = (s @ lu_solve(lu, phi @ inp) + inp).ravel()
+        # O A^-1 with the transposed factorization
+        sensitivity = lu_solve(lu, self.output_matrix.T, trans=1).T
+        d_p1 = sensitivity[:, :n] * (z[n:] - z[:n])
+        d_p2 = sensitivity[:, n:] * (z[:n] - z[n:])
+
+        d_ntu = d_r = d_transferability = None
+        exchangers = self.exchangers
+        if isinstance(exchangers, list) and exchangers:
+            p1 = np.diag(phi[:n, n:])
+            r = np.array([ex.r[0] for ex in exchangers], dtype=float)
+            capacity = np.array([ex.flow_1.heat_capacity_flow for ex in exchangers], dtype=float)
+            dp_dntu, dp_dr = p_derivative_values(exchangers)
+            # P2 = R1 P1
+            d_ntu = d_p1 * dp_dntu + d_p2 * r * dp_dntu
+            d_r = d_p1 * dp_dr + d_p2 * (p1 + r * dp_dr)
+            d_transferability = d_ntu / capacity
+
+        dimensionless = NetworkJacobian(d_p1, d_p2, d_ntu, d_r, d_transferability)
+        temps = self.input_temps[0]
+        scale = max(temps) - min(temps) if temps else np.nan
+        dimensional = NetworkJacobian(*(None if value is None else scale * value for value in dimensionless))
+        return dimensionless, dimensional
+
+    @with_backend
+    def batch_outputs(self, p1, p2, temperatures=None):
+        """
+        Get the dimensionless output temperatures of many networks with the structure of this network.
+
+        The networks differ only in the P values of their cells, e.g. in sweeps over the heat transferabilities,
+        see 'network_outputs'.
+
+        Args:
+            p1 (numpy.ndarray): The dimensionless temperature changes P1 with the shape (networks, cells).
+            p2 (numpy.ndarray): The dimensionless temperature changes P2 with the shape (networks, cells).
+            temperatures (numpy.ndarray, optional): The dimensionless input temperatures with the shape
+                (networks, inputs) or (inputs,). Default are the input temperatures of this network.
+
+        Returns:
+            numpy.ndarray: The dimensionless output temperatures with the shape (networks, outputs).
+
+        """
+        if temperatures is None:
+            temperatures = self.temperature_input_matrix.ravel()
+        return network_outputs(p1, p2, self.structure_matrix, self.input_matrix, self.output_matrix, temperatures)
+
     def _dimles_2_temp(self, matrix):
         """
         converts the dimensionless temperatures back to temperature in K
@@ -324,6 +466,7 @@ class ExchangerNetwork:
         return (max_temp - min_temp) * matrix + min_temp
 
     @property
+    @with_backend
     def temperature_outputs(self):
         """
         Get the temperature outputs of the network.
@@ -388,6 +531,7 @@ class ExchangerNetwork:
         """
         vis_temp_progress(temp_list, 'flow temperature development', ax, label_x='cell passed by flow', **ax_parameters)
 
+    @with_backend
     def extended_info(self):
         """
             Return extended information about the network, including information about input flows, output flows, and heat exchangers.
@@ -401,6 +545,7 @@ class ExchangerNetwork:
             output += f"\ncell:{i}\n{ex}\n"
         return output
 
+    @with_backend
     def __repr__(self):
         output = "Heat Exchanger Network:\n"
         output += f"\tcell numbers: {self.cell_numbers}\n"
@@ -418,6 +563,43 @@ class ExchangerNetwork:
         return output
 
 
+def network_outputs(p1, p2, structure_matrix, input_matrix, output_matrix, temperatures):
+    """
+    Get the dimensionless output temperatures of many networks of the same structure.
+
+    The phi matrix of every network is built from its P values and solved in one step, with the compiled routine of
+    'exchanger.accelerated' if numba is available, otherwise with one batched NumPy solve.
+
+    Args:
+        p1 (numpy.ndarray): The dimensionless temperature changes P1 with the shape (networks, cells).
+        p2 (numpy.ndarray): The dimensionless temperature changes P2 with the shape (networks, cells).
+        structure_matrix (numpy.ndarray): The structure matrix of the networks.
+        input_matrix (numpy.ndarray): The input matrix of the networks.
+        output_matrix (numpy.ndarray): The output matrix of the networks.
+        temperatures (numpy.ndarray): The dimensionless input temperatures with the shape (networks, inputs) or
+            (inputs,).
+
+    Returns:
+        numpy.ndarray: The dimensionless output temperatures with the shape (networks, outputs).
+
+    """
+    p1, p2 = np.atleast_2d(np.asarray(p1, dtype=float), np.asarray(p2, dtype=float))
+    networks, n = p1.shape
+    temperatures = np.broadcast_to(np.asarray(temperatures, dtype=float), (networks, input_matrix.shape[1]))
+    if accelerated.available and accelerated.enabled:
+        return accelerated.network_outputs(p1, p2, structure_matrix, input_matrix, output_matrix, temperatures)
+
+    cells = np.arange(n)
+    phi = np.zeros((networks, 2 * n, 2 * n))
+    phi[:, cells, cells] = 1 - p1
+    phi[:, cells, n + cells] = p1
+    phi[:, n + cells, cells] = p2
+    phi[:, n + cells, n + cells] = 1 - p2
+    rhs = phi @ (temperatures @ input_matrix.T)[..., None]
+    outputs = np.linalg.solve(np.eye(2 * n) - phi @ structure_matrix, rhs)
+    return outputs[..., 0] @ output_matrix.T
+
+
 def vis_temp_progress(data_list, title: str = 'temperature development', ax=None, **ax_parameters):
     """
        Visualize temperature progression.
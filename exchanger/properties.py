@@ -0,0 +1,1869 @@
+import functools
+import logging
+import math
+import os
+import threading
+import warnings
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib.metadata import version
+
+import CoolProp
+import numpy as np
+import pyfluids as fld
+from scipy.interpolate import CubicSpline, NdBSpline, RectBivariateSpline, bisplev
+
+from . import _table_files
+
+logging.debug(f'{__file__} will get logged')
+
+FluidProperties = namedtuple('FluidProperties', ['density', 'specific_heat', 'enthalpy', 'phase'])
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+Diagnostic = namedtuple('Diagnostic', ['title', 'pressure', 'temperature', 'reason'])
+PoolInfo = namedtuple('PoolInfo', ['created', 'reused', 'released', 'dropped', 'size'])
+
+
+class PropertyTable:
+    """
+    Tabulated thermodynamic properties of a fluid on a rectangular (pressure, temperature) grid.
+
+    The properties are evaluated once with pyfluids on the grid nodes and answered afterwards by
+    bicubic spline interpolation, which is orders of magnitude cheaper than an equation of state evaluation.
+    The tabulated region has to lie completely inside one phase, otherwise the interpolation would smooth over
+    the discontinuities at the phase boundary. The spline coefficients are fitted once and persisted with the
+    node values, so loaded tables are interpolated from the memory-mapped coefficients without a fit.
+
+    Args:
+        title (str): The name of the fluid.
+        pressures (numpy.ndarray): Strictly increasing grid pressures in Pascals (Pa).
+        temperatures (numpy.ndarray): Strictly increasing grid temperatures in Kelvin (K).
+        values (dict): Mapping of property names to arrays of shape (len(pressures), len(temperatures)).
+        phase (pyfluids.Phases): The phase of the fluid inside the tabulated region.
+        error_bound (dict, optional): Mapping of property names to the maximal relative interpolation error.
+        coefficients (dict, optional): Mapping of property names to the bicubic spline coefficients of shape
+            (len(pressures), len(temperatures)), e.g. from a loaded table. Defaults to a fit of the values.
+
+    Attributes:
+        properties (tuple): Names of the tabulated properties.
+
+    Methods:
+        from_pyfluids: Create a table by evaluating pyfluids on a grid.
+        save: Write the table to a '.npy' file with a '.json' header.
+        load: Read a table written by 'save', memory-mapped by default.
+        contains: Check if a state lies inside the tabulated region.
+        evaluate: Interpolate a property at one or many states.
+    """
+
+    properties = ('density', 'specific_heat', 'enthalpy')
+    file_version = 2
+
+    def __init__(self, title: str, pressures, temperatures, values: dict, phase, error_bound: dict = None,
+                 coefficients: dict = None):
+        self.title = title
+        self.pressures = np.asarray(pressures, dtype=float)
+        self.temperatures = np.asarray(temperatures, dtype=float)
+        self.phase = phase
+        if error_bound is None:
+            error_bound = {name: np.nan for name in self.properties}
+        self.error_bound = error_bound
+        self._values = {name: np.asarray(values[name], dtype=float) for name in self.properties}
+        if coefficients is None:
+            coefficients = {name: RectBivariateSpline(self.pressures, self.temperatures, value, kx=3, ky=3)
+                            .get_coeffs().reshape(value.shape) for name, value in self._values.items()}
+        self._coefficients = {name: np.asarray(coefficients[name], dtype=float) for name in self.properties}
+        self._knots = _spline_knots(self.pressures), _spline_knots(self.temperatures)
+        self._splines = {name: NdBSpline(self._knots, value, 3) for name, value in self._coefficients.items()}
+
+    @classmethod
+    def from_pyfluids(cls, title: str, pressure_range: tuple, temperature_range: tuple, shape: tuple = (20, 40)):
+        """
+        Create a table by evaluating pyfluids on an equidistant (pressure, temperature) grid.
+
+        The interpolation error is estimated at the centres of all grid cells, where the bicubic interpolation
+        is farthest from its nodes, and stored as the relative error bound of the table.
+
+        Args:
+            title (str): The name of the fluid.
+            pressure_range (tuple): Minimal and maximal pressure in Pascals (Pa).
+            temperature_range (tuple): Minimal and maximal temperature in Kelvin (K).
+            shape (tuple, optional): Number of grid nodes in pressure and temperature direction. Defaults to (20, 40).
+
+        Raises:
+            NotImplementedError: If the fluid title is not implemented in pyfluids.
+            ValueError: If the grid is too small, contains unsupported states or crosses a phase boundary.
+
+        Returns:
+            PropertyTable: The evaluated table.
+        """
+        n_p, n_t = shape
+        if n_p < 4 or n_t < 4:
+            raise ValueError("bicubic interpolation needs at least 4 grid nodes per direction")
+        pressures = np.linspace(*pressure_range, n_p)
+        temperatures = np.linspace(*temperature_range, n_t)
+        values, phases = _evaluate_grid(title, pressures, temperatures)
+        if len(phases) != 1:
+            raise ValueError(f"tabulated region of {title} crosses a phase boundary: {sorted(map(str, phases))}")
+        table = cls(title, pressures, temperatures, values, phases.pop())
+
+        mid_pressures = (pressures[1:] + pressures[:-1]) / 2
+        mid_temperatures = (temperatures[1:] + temperatures[:-1]) / 2
+        exact, _ = _evaluate_grid(title, mid_pressures, mid_temperatures)
+        p_grid, t_grid = np.meshgrid(mid_pressures, mid_temperatures, indexing='ij')
+        error_bound = {}
+        for name in cls.properties:
+            approx = table.evaluate(name, p_grid, t_grid)
+            error_bound[name] = float(np.max(np.abs(approx - exact[name]) / np.abs(exact[name])))
+        table.error_bound = error_bound
+        logging.debug(f"tabulated {title} with shape {shape}, error bound {error_bound}")
+        return table
+
+    @property
+    def pressure_range(self):
+        """
+        Get the pressure range of the table.
+
+        Returns:
+            tuple (float, float): Minimal and maximal pressure in Pascals (Pa).
+        """
+        return self.pressures[0], self.pressures[-1]
+
+    @property
+    def temperature_range(self):
+        """
+        Get the temperature range of the table.
+
+        Returns:
+            tuple (float, float): Minimal and maximal temperature in Kelvin (K).
+        """
+        return self.temperatures[0], self.temperatures[-1]
+
+    def contains(self, pressure, temperature):
+        """
+        Check if states lie inside the tabulated region.
+
+        Args:
+            pressure (float or numpy.ndarray): The pressure in Pascals (Pa).
+            temperature (float or numpy.ndarray): The temperature in Kelvin (K).
+
+        Returns:
+            bool or numpy.ndarray: True for every state inside the tabulated region.
+        """
+        p_min, p_max = self.pressure_range
+        t_min, t_max = self.temperature_range
+        return (p_min <= pressure) & (pressure <= p_max) & (t_min <= temperature) & (temperature <= t_max)
+
+    def evaluate(self, name: str, pressure, temperature):
+        """
+        Interpolate a property at one or many states.
+
+        Args:
+            name (str): The name of the property, one of PropertyTable.properties.
+            pressure (float or numpy.ndarray): The pressure in Pascals (Pa).
+            temperature (float or numpy.ndarray): The temperature in Kelvin (K).
+
+        Raises:
+            KeyError: If the property is not tabulated.
+
+        Returns:
+            float or numpy.ndarray: The interpolated property with the shape of the broadcast inputs.
+        """
+        spline = self._splines[name]
+        if np.ndim(pressure) == 0 and np.ndim(temperature) == 0:
+            # FITPACK is faster than NdBSpline for a single state
+            return float(bisplev(pressure, temperature, (*self._knots, self._coefficients[name].ravel(), 3, 3)))
+        pressure, temperature = np.broadcast_arrays(pressure, temperature)
+        return spline(np.stack([pressure, temperature], axis=-1))
+
+    def state(self, pressure: float, temperature: float):
+        """
+        Interpolate all properties at one state.
+
+        Args:
+            pressure (float): The pressure in Pascals (Pa).
+            temperature (float): The temperature in Kelvin (K).
+
+        Returns:
+            FluidProperties: The interpolated properties of the state.
+        """
+        return FluidProperties(*(self.evaluate(name, pressure, temperature) for name in self.properties), self.phase)
+
+    def save(self, directory: str):
+        """
+        Write the table to '<title>.npy' with the node values and spline coefficients and '<title>.json' with the
+        header.
+
+        The header holds the file version, the versions of the equation of state libraries, the grid,
+        the phase, the error bound and the size and SHA-256 hash of the '.npy' file, so stale files are detected
+        by 'load'.
+
+        Args:
+            directory (str): The directory of the files, created if it does not exist.
+
+        Returns:
+            str: The path of the '.npy' file.
+        """
+        header = {'file_version': self.file_version, 'eos_versions': _eos_versions(), 'title': self.title,
+                  'properties': list(self.properties), 'pressures': self.pressures.tolist(),
+                  'temperatures': self.temperatures.tolist(), 'phase': self.phase.name,
+                  'error_bound': self.error_bound}
+        values = [[self._values[name] for name in self.properties],
+                  [self._coefficients[name] for name in self.properties]]
+        return _table_files.save(directory, self.title, np.array(values), header)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = 'r', verify: bool = False):
+        """
+        Read a table written by 'save'.
+
+        The node values and spline coefficients are memory-mapped read-only by default, so processes loading the
+        same file share one copy of it and neither an equation of state evaluation nor a spline fit is needed.
+        Stale files are detected by the header and the file size, hashing the whole file is optional.
+
+        Args:
+            path (str): The path of the '.npy' file.
+            mmap_mode (str, optional): The memory-map mode passed to 'numpy.load', None reads the values into memory.
+                Defaults to 'r'.
+            verify (bool, optional): Check the SHA-256 hash of the '.npy' file against the header. Defaults to False.
+
+        Raises:
+            FileNotFoundError: If the '.npy' or '.json' file does not exist.
+            ValueError: If the file is stale: written by another file version or other equation of state libraries,
+                truncated or, with verify, modified after it was written.
+
+        Returns:
+            PropertyTable: The loaded table.
+        """
+        header = _table_files.load_header(path)
+        if header.get('file_version') != cls.file_version or header.get('eos_versions') != _eos_versions():
+            raise ValueError(f"stale property table {path}: written by {header.get('eos_versions')}, "
+                             f"file version {header.get('file_version')}")
+        if header['properties'] != list(cls.properties):
+            raise ValueError(f"stale property table {path}: properties {header['properties']}")
+        _table_files.check_size(path, header, 'property table')
+        if verify:
+            _table_files.check_hash(path, header, 'property table')
+        data = np.load(path, mmap_mode=mmap_mode)
+        if data.shape != (2, len(cls.properties), len(header['pressures']), len(header['temperatures'])):
+            raise ValueError(f"stale property table {path}: shape {data.shape} does not match the header")
+        values = {name: data[0, i] for i, name in enumerate(cls.properties)}
+        coefficients = {name: data[1, i] for i, name in enumerate(cls.properties)}
+        return cls(header['title'], header['pressures'], header['temperatures'], values,
+                   fld.Phases[header['phase']], header['error_bound'], coefficients)
+
+    def __repr__(self):
+        output = f"PropertyTable: title = {self.title}, phase = {self.phase}\n"
+        output += f"\tp = {self.pressure_range[0]} ... {self.pressure_range[1]} Pa, n = {len(self.pressures)}\n"
+        output += f"\tT = {self.temperature_range[0]} ... {self.temperature_range[1]} K, n = {len(self.temperatures)}\n"
+        for name, error in self.error_bound.items():
+            output += f"\t{name}: relative error <= {error:.2e}\n"
+        return output
+
+
+def _spline_knots(nodes):
+    """
+    Get the knots of the interpolating cubic spline of FITPACK on the nodes: the end nodes four times and
+    the nodes without the two outer ones at each end.
+    """
+    return np.concatenate([np.repeat(nodes[0], 4), nodes[2:-2], np.repeat(nodes[-1], 4)])
+
+
+def _eos_versions():
+    """
+    Get the versions of the equation of state libraries, which are stored with persisted tables.
+    """
+    return {'pyfluids': version('pyfluids'), 'CoolProp': version('CoolProp')}
+
+
+def _evaluate_grid(title, pressures, temperatures):
+    """
+    Evaluate the tabulated properties and phases with pyfluids on all combinations of pressures and temperatures.
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+        ValueError: If a state is not supported by pyfluids.
+    """
+    values = {name: np.empty((len(pressures), len(temperatures))) for name in PropertyTable.properties}
+    phases = set()
+    for i, pressure in enumerate(pressures):
+        for j, temperature in enumerate(temperatures):
+            state = _evaluate_pyfluids(title, pressure, temperature)
+            for name in PropertyTable.properties:
+                values[name][i, j] = getattr(state, name)
+            phases.add(state.phase)
+    return values, phases
+
+
+tables = {}
+
+
+def tabulate(title: str, pressure_range: tuple, temperature_range: tuple, shape: tuple = (20, 40),
+             tolerance: float = None):
+    """
+    Create a property table for a fluid and register it, so every Fluid with this title inside the
+    tabulated region is answered by interpolation instead of pyfluids.
+
+    Args:
+        title (str): The name of the fluid.
+        pressure_range (tuple): Minimal and maximal pressure in Pascals (Pa).
+        temperature_range (tuple): Minimal and maximal temperature in Kelvin (K).
+        shape (tuple, optional): Number of grid nodes in pressure and temperature direction. Defaults to (20, 40).
+        tolerance (float, optional): Maximal accepted relative interpolation error, a warning is issued if the
+            error bound of the table exceeds it.
+
+    Returns:
+        PropertyTable: The registered table.
+    """
+    table = PropertyTable.from_pyfluids(title, pressure_range, temperature_range, shape)
+    if tolerance is not None and max(table.error_bound.values()) > tolerance:
+        warnings.warn(f"error bound of {title} table exceeds tolerance {tolerance}, refine the grid")
+    tables[title] = table
+    return table
+
+
+def get_table(title: str):
+    """
+    Get the registered property table of a fluid.
+
+    Args:
+        title (str): The name of the fluid.
+
+    Returns:
+        PropertyTable or None: The registered table or None if the fluid is not tabulated.
+    """
+    return tables.get(title)
+
+
+def remove_table(title: str = None):
+    """
+    Remove a registered property table, so the fluid is evaluated by pyfluids again.
+
+    Args:
+        title (str, optional): The name of the fluid. If None, all tables are removed.
+    """
+    if title is None:
+        tables.clear()
+    else:
+        tables.pop(title, None)
+
+
+def write_tables(directory: str, titles: list, pressure_range: tuple, temperature_range: tuple,
+                 shape: tuple = (20, 40)):
+    """
+    Create property tables for a list of fluids and write them to a directory, see 'PropertyTable.save'.
+
+    Fluids which can not be tabulated in the given region, e.g. because it crosses a phase boundary,
+    are skipped with a warning.
+
+    Args:
+        directory (str): The directory of the files, created if it does not exist.
+        titles (list): The names of the fluids.
+        pressure_range (tuple): Minimal and maximal pressure in Pascals (Pa).
+        temperature_range (tuple): Minimal and maximal temperature in Kelvin (K).
+        shape (tuple, optional): Number of grid nodes in pressure and temperature direction. Defaults to (20, 40).
+
+    Returns:
+        list: The paths of the written '.npy' files.
+    """
+    paths = []
+    for title in titles:
+        try:
+            table = PropertyTable.from_pyfluids(title, pressure_range, temperature_range, shape)
+        except ValueError as e:
+            warnings.warn(f"{title} not tabulated: {e}")
+            continue
+        paths.append(table.save(directory))
+    return paths
+
+
+def load_tables(directory: str, titles: list = None, register: bool = True, mmap_mode: str = 'r',
+                verify: bool = False):
+    """
+    Load the property tables of a directory written by 'write_tables', memory-mapped by default.
+
+    Stale or missing files are skipped with a warning, these fluids are evaluated by pyfluids.
+
+    Args:
+        directory (str): The directory of the files.
+        titles (list, optional): The names of the fluids to load. Defaults to all tables in the directory.
+        register (bool, optional): Register the loaded tables like 'tabulate'. Defaults to True.
+        mmap_mode (str, optional): The memory-map mode passed to 'numpy.load'. Defaults to 'r'.
+        verify (bool, optional): Check the hashes of the files. Defaults to False.
+
+    Returns:
+        dict: The loaded tables by fluid title.
+    """
+    if titles is None:
+        titles = sorted(os.path.splitext(name)[0] for name in os.listdir(directory) if name.endswith('.npy'))
+    loaded = {}
+    for title in titles:
+        path = os.path.join(directory, f"{title}.npy")
+        try:
+            loaded[title] = PropertyTable.load(path, mmap_mode, verify)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"{title} table not loaded: {e}")
+    if register:
+        tables.update(loaded)
+    return loaded
+
+
+class PolynomialCorrelation:
+    """
+    Polynomial property correlations of an incompressible liquid over a declared validity range.
+
+    The density, specific heat and enthalpy at a reference pressure are fitted once with pyfluids as polynomials
+    of the temperature. The pressure is only considered by a constant compressibility of the density and the
+    incompressible enthalpy term (p - p_ref) / density, so the correlations are meant for liquids far from the
+    critical point, e.g. water or brines in a narrow temperature band.
+
+    Args:
+        title (str): The name of the fluid.
+        temperature_range (tuple): Minimal and maximal temperature of the validity range in Kelvin (K).
+        pressure_range (tuple): Minimal and maximal pressure of the validity range in Pascals (Pa).
+        coefficients (dict): Mapping of property names to polynomial coefficients in the scaled temperature,
+            highest order first.
+        phase (pyfluids.Phases): The phase of the fluid inside the validity range.
+        compressibility (float, optional): The relative change of the density per pressure in 1/Pa. Defaults to 0.
+        error_bound (dict, optional): Mapping of property names to the maximal relative error.
+
+    Methods:
+        from_pyfluids: Fit the correlations with pyfluids.
+        contains: Check if a state lies inside the validity range.
+        evaluate: Evaluate a property at one or many states.
+    """
+
+    properties = PropertyTable.properties
+
+    def __init__(self, title: str, temperature_range: tuple, pressure_range: tuple, coefficients: dict, phase,
+                 compressibility: float = 0., error_bound: dict = None):
+        self.title = title
+        self.temperature_range = tuple(temperature_range)
+        self.pressure_range = tuple(pressure_range)
+        self.coefficients = {name: tuple(float(c) for c in value) for name, value in coefficients.items()}
+        self.phase = phase
+        self.compressibility = compressibility
+        if error_bound is None:
+            error_bound = {name: np.nan for name in self.properties}
+        self.error_bound = error_bound
+
+    @property
+    def reference_pressure(self):
+        """
+        Get the reference pressure of the fit, the middle of the pressure range in Pascals (Pa).
+        """
+        return sum(self.pressure_range) / 2
+
+    def _scale(self, temperature):
+        t_min, t_max = self.temperature_range
+        return (2 * temperature - t_min - t_max) / (t_max - t_min)
+
+    @classmethod
+    def from_pyfluids(cls, title: str, temperature_range: tuple, pressure_range: tuple = (1e5, 1e6), degree: int = 4,
+                      n_points: int = 50):
+        """
+        Fit the correlations by least squares to pyfluids evaluations at the reference pressure.
+
+        The error bound is determined against pyfluids on the whole validity range, including its pressure limits.
+
+        Args:
+            title (str): The name of the fluid.
+            temperature_range (tuple): Minimal and maximal temperature of the validity range in Kelvin (K).
+            pressure_range (tuple, optional): Minimal and maximal pressure of the validity range in Pascals (Pa).
+                Defaults to (1e5, 1e6).
+            degree (int, optional): The degree of the polynomials. Defaults to 4.
+            n_points (int, optional): Number of temperatures used for the fit. Defaults to 50.
+
+        Raises:
+            NotImplementedError: If the fluid title is not implemented in pyfluids.
+            ValueError: If the validity range contains unsupported states or is not completely liquid.
+
+        Returns:
+            PolynomialCorrelation: The fitted correlations.
+        """
+        p_ref = sum(pressure_range) / 2
+        temperatures = np.linspace(*temperature_range, n_points)
+        values, phases = _evaluate_grid(title, [p_ref], temperatures)
+        check_pressures = np.array([pressure_range[0], p_ref, pressure_range[1]])
+        check_temperatures = (temperatures[1:] + temperatures[:-1]) / 2
+        exact, check_phases = _evaluate_grid(title, check_pressures, check_temperatures)
+        phases |= check_phases
+        if phases != {fld.Phases.Liquid}:
+            raise ValueError(f"validity range of {title} is not completely liquid: {sorted(map(str, phases))}")
+
+        x = (2 * temperatures - temperature_range[0] - temperature_range[1]) / \
+            (temperature_range[1] - temperature_range[0])
+        coefficients = {name: np.polyfit(x, values[name][0], degree) for name in cls.properties}
+        density = exact['density']
+        compressibility = float(np.mean((density[2] - density[0]) / density[1]) /
+                                (check_pressures[2] - check_pressures[0]))
+        correlation = cls(title, temperature_range, pressure_range, coefficients, fld.Phases.Liquid, compressibility)
+
+        p_grid, t_grid = np.meshgrid(check_pressures, check_temperatures, indexing='ij')
+        correlation.error_bound = {
+            name: float(np.max(np.abs(correlation.evaluate(name, p_grid, t_grid) - exact[name]) / np.abs(exact[name])))
+            for name in cls.properties}
+        logging.debug(f"correlated {title} with degree {degree}, error bound {correlation.error_bound}")
+        return correlation
+
+    def contains(self, pressure, temperature):
+        """
+        Check if states lie inside the validity range.
+
+        Args:
+            pressure (float or numpy.ndarray): The pressure in Pascals (Pa).
+            temperature (float or numpy.ndarray): The temperature in Kelvin (K).
+
+        Returns:
+            bool or numpy.ndarray: True for every state inside the validity range.
+        """
+        p_min, p_max = self.pressure_range
+        t_min, t_max = self.temperature_range
+        return (p_min <= pressure) & (pressure <= p_max) & (t_min <= temperature) & (temperature <= t_max)
+
+    def evaluate(self, name: str, pressure, temperature):
+        """
+        Evaluate a property at one or many states.
+
+        Args:
+            name (str): The name of the property, one of PolynomialCorrelation.properties.
+            pressure (float or numpy.ndarray): The pressure in Pascals (Pa).
+            temperature (float or numpy.ndarray): The temperature in Kelvin (K).
+
+        Raises:
+            KeyError: If the property is not correlated.
+
+        Returns:
+            float or numpy.ndarray: The property with the shape of the broadcast inputs.
+        """
+        x = self._scale(temperature)
+        value = _horner(self.coefficients[name], x)
+        if name == 'density':
+            value = value * (1 + self.compressibility * (pressure - self.reference_pressure))
+        elif name == 'enthalpy':
+            value = value + (pressure - self.reference_pressure) / self.evaluate('density', pressure, temperature)
+        elif np.ndim(pressure) > np.ndim(value):
+            value = value + np.zeros_like(pressure, dtype=float)
+        return value
+
+    def state(self, pressure: float, temperature: float):
+        """
+        Evaluate all properties at one state.
+
+        Args:
+            pressure (float): The pressure in Pascals (Pa).
+            temperature (float): The temperature in Kelvin (K).
+
+        Returns:
+            FluidProperties: The properties of the state.
+        """
+        x = self._scale(temperature)
+        density = _horner(self.coefficients['density'], x) * \
+            (1 + self.compressibility * (pressure - self.reference_pressure))
+        specific_heat = _horner(self.coefficients['specific_heat'], x)
+        enthalpy = _horner(self.coefficients['enthalpy'], x) + (pressure - self.reference_pressure) / density
+        return FluidProperties(density, specific_heat, enthalpy, self.phase)
+
+    def __repr__(self):
+        output = f"PolynomialCorrelation: title = {self.title}, phase = {self.phase}\n"
+        output += f"\tp = {self.pressure_range[0]} ... {self.pressure_range[1]} Pa\n"
+        output += f"\tT = {self.temperature_range[0]} ... {self.temperature_range[1]} K\n"
+        for name, error in self.error_bound.items():
+            output += f"\t{name}: relative error <= {error:.2e}\n"
+        return output
+
+
+def _horner(coefficients, x):
+    """
+    Evaluate a polynomial with coefficients of the highest order first, for floats and numpy arrays.
+    """
+    value = 0.
+    for coefficient in coefficients:
+        value = value * x + coefficient
+    return value
+
+
+correlations = {}
+
+
+def correlate(title: str, temperature_range: tuple, pressure_range: tuple = (1e5, 1e6), degree: int = 4,
+              tolerance: float = None):
+    """
+    Fit polynomial correlations for an incompressible liquid and register them, so every Fluid with this title
+    inside the validity range is answered by the correlations instead of pyfluids.
+
+    Outside the validity range the registered property table or pyfluids is used automatically.
+
+    Args:
+        title (str): The name of the fluid.
+        temperature_range (tuple): Minimal and maximal temperature of the validity range in Kelvin (K).
+        pressure_range (tuple, optional): Minimal and maximal pressure of the validity range in Pascals (Pa).
+            Defaults to (1e5, 1e6).
+        degree (int, optional): The degree of the polynomials. Defaults to 4.
+        tolerance (float, optional): Maximal accepted relative error, a warning is issued if the
+            error bound of the correlations exceeds it.
+
+    Returns:
+        PolynomialCorrelation: The registered correlations.
+    """
+    correlation = PolynomialCorrelation.from_pyfluids(title, temperature_range, pressure_range, degree)
+    if tolerance is not None and max(correlation.error_bound.values()) > tolerance:
+        warnings.warn(f"error bound of {title} correlation exceeds tolerance {tolerance}, "
+                      f"narrow the range or increase the degree")
+    correlations[title] = correlation
+    return correlation
+
+
+def get_correlation(title: str):
+    """
+    Get the registered polynomial correlations of a fluid.
+
+    Args:
+        title (str): The name of the fluid.
+
+    Returns:
+        PolynomialCorrelation or None: The registered correlations or None if the fluid is not correlated.
+    """
+    return correlations.get(title)
+
+
+def remove_correlation(title: str = None):
+    """
+    Remove registered polynomial correlations, so the fluid is evaluated by a table or pyfluids again.
+
+    Args:
+        title (str, optional): The name of the fluid. If None, all correlations are removed.
+    """
+    if title is None:
+        correlations.clear()
+    else:
+        correlations.pop(title, None)
+
+
+class StateCache:
+    """
+    A bounded least recently used (LRU) cache of fluid states evaluated with pyfluids.
+
+    The states are keyed by the fluid title and the pressure and temperature quantized by the tolerance,
+    so states closer than the tolerance share one entry. Unsupported states are cached as well, so repeated
+    invalid states raise their ValueError again without reaching CoolProp.
+    The cache is thread-safe, the states are evaluated outside of its lock with the pyfluids objects of the thread.
+
+    Args:
+        maxsize (int, optional): The maximal number of cached states. Defaults to 65536.
+        tolerance (float, optional): The quantization tolerance in Pascals (Pa) and Kelvin (K). Defaults to 1e-6.
+
+    Attributes:
+        hits (int): Number of lookups answered by the cache.
+        misses (int): Number of lookups evaluated by pyfluids.
+        evictions (int): Number of states removed because the cache was full.
+
+    Methods:
+        lookup: Get the properties of a state, evaluating it if it is not cached.
+        info: Get the statistics of the cache.
+        clear: Remove all states and reset the statistics.
+    """
+
+    def __init__(self, maxsize: int = 65536, tolerance: float = 1e-6):
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+        self.maxsize = maxsize
+        self.tolerance = tolerance
+        self.clear()
+
+    @property
+    def maxsize(self):
+        """
+        Get or set the maximal number of cached states.
+
+        Reducing the size evicts the least recently used states.
+
+        Args:
+            value (int): The maximal number of cached states.
+
+        Raises:
+            ValueError: If the size is smaller than 1.
+        """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        if value < 1:
+            raise ValueError("cache size must be at least 1")
+        with self._lock:
+            self._maxsize = int(value)
+            self._evict()
+
+    @property
+    def tolerance(self):
+        """
+        Get or set the quantization tolerance in Pascals (Pa) and Kelvin (K).
+
+        Changing the tolerance clears the cached states, because their keys are not comparable anymore.
+
+        Args:
+            value (float): The quantization tolerance.
+
+        Raises:
+            ValueError: If the tolerance is not positive.
+        """
+        return self._tolerance
+
+    @tolerance.setter
+    def tolerance(self, value):
+        if not value > 0:
+            raise ValueError("tolerance must be positive")
+        with self._lock:
+            self._tolerance = value
+            self._states.clear()
+
+    def key(self, title: str, pressure: float, temperature: float):
+        """
+        Get the quantized key of a state.
+
+        Returns:
+            tuple: The fluid title and the quantized pressure and temperature.
+        """
+        return title, round(pressure / self._tolerance), round(temperature / self._tolerance)
+
+    def lookup(self, title: str, pressure: float, temperature: float):
+        """
+        Get the properties of a state, evaluating it with pyfluids if it is not cached.
+
+        Args:
+            title (str): The name of the fluid.
+            pressure (float): The pressure in Pascals (Pa).
+            temperature (float): The temperature in Kelvin (K).
+
+        Raises:
+            NotImplementedError: If the fluid title is not implemented in pyfluids.
+            ValueError: If the state is not supported by pyfluids.
+
+        Returns:
+            FluidProperties: The properties of the state.
+        """
+        key = self.key(title, pressure, temperature)
+        with self._lock:
+            value = self._states.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._states.move_to_end(key)
+                self.hits += 1
+        if value is None:
+            try:
+                value = _evaluate_pyfluids(title, pressure, temperature)
+            except ValueError as e:
+                # only the message is cached, a cached exception would collect the traceback of every raise
+                value = str(e)
+            with self._lock:
+                self._states[key] = value
+                self._evict()
+        if isinstance(value, str):
+            raise ValueError(value)
+        return value
+
+    def _evict(self):
+        while len(self._states) > self._maxsize:
+            self._states.popitem(last=False)
+            self.evictions += 1
+
+    def info(self):
+        """
+        Get the statistics of the cache.
+
+        Returns:
+            CacheInfo: The hits, misses, evictions, maximal and current size of the cache.
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self._maxsize, len(self._states))
+
+    def clear(self):
+        """
+        Remove all cached states and reset the statistics.
+        """
+        with self._lock:
+            self._states.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def __repr__(self):
+        hits, misses, evictions, maxsize, currsize = self.info()
+        return f"StateCache: size = {currsize}/{maxsize}, hits = {hits}, misses = {misses}, evictions = {evictions}"
+
+
+def mixture_title(fluids: list, fractions: list):
+    """
+    Get the canonical title of a mixture, e.g. 'Mixture(Nitrogen=0.6, Oxygen=0.4)'.
+
+    The components are sorted by name, so equal compositions get equal titles and share cached states and tables.
+
+    Args:
+        fluids (list): The components, names or 'pyfluids.FluidsList' members.
+        fractions (list): The mass fractions of the components, each in (0, 1).
+
+    Raises:
+        NotImplementedError: If a component is not implemented in pyfluids or a fraction is invalid.
+
+    Returns:
+        str: The title of the mixture.
+    """
+    names = [getattr(fluid, 'name', fluid) for fluid in fluids]
+    if len(names) != len(fractions) or len(set(names)) != len(names):
+        raise NotImplementedError("mixture needs one fraction per distinct component")
+    composition = ', '.join(f"{name}={float(fraction)!r}" for name, fraction in sorted(zip(names, fractions)))
+    title = f"Mixture({composition})"
+    parse_title(title)
+    return title
+
+
+def humid_air_title(humidity: float = None, relative_humidity: float = None, pressure: float = 101325,
+                    temperature: float = 293.15):
+    """
+    Get the canonical title of humid air, e.g. 'HumidAir(humidity=0.01)'.
+
+    The composition is given by the absolute humidity, which stays constant while the air is heated or cooled
+    without condensation. A relative humidity is converted at the given pressure and temperature.
+
+    Args:
+        humidity (float, optional): The absolute humidity in kg water per kg dry air.
+        relative_humidity (float, optional): The relative humidity in (0, 1), used if the humidity is not given.
+        pressure (float, optional): The pressure of the relative humidity in Pascals (Pa). Defaults to 101325.
+        temperature (float, optional): The temperature of the relative humidity in Kelvin (K). Defaults to 293.15.
+
+    Raises:
+        TypeError: If neither the humidity nor the relative humidity is given.
+        ValueError: If the relative humidity is not supported by pyfluids.
+
+    Returns:
+        str: The title of the humid air.
+    """
+    if humidity is None:
+        if relative_humidity is None:
+            raise TypeError("humid air needs the humidity or relative humidity")
+        air = fld.HumidAir()
+        air.update(fld.InputHumidAir.pressure(pressure), fld.InputHumidAir.temperature(temperature),
+                   fld.InputHumidAir.relative_humidity(relative_humidity))
+        humidity = air.humidity
+    return f"HumidAir(humidity={float(humidity)!r})"
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_title(title: str):
+    """
+    Split a fluid title into the pyfluids instance and the composition.
+
+    Pure fluids are named like 'pyfluids.FluidsList', mixtures and humid air by their canonical titles,
+    see 'mixture_title' and 'humid_air_title'.
+
+    Args:
+        title (str): The title of the fluid.
+
+    Raises:
+        NotImplementedError: If the fluid or a component is not implemented in pyfluids or the composition is invalid.
+
+    Returns:
+        tuple (str, tuple): The instance 'Fluid', 'Mixture' or 'HumidAir' and the composition as (name, value) pairs,
+            empty for pure fluids.
+    """
+    instance, _, arguments = title.partition('(')
+    if not arguments:
+        if title in fld.FluidsList.__members__:
+            return 'Fluid', ()
+        raise NotImplementedError("Fluid not implemented. Check spelling")
+    try:
+        if instance not in ('Mixture', 'HumidAir') or not arguments.endswith(')'):
+            raise ValueError(instance)
+        composition = tuple((name.strip(), float(value)) for name, _, value in
+                            (item.partition('=') for item in arguments[:-1].split(',')))
+    except ValueError:
+        raise NotImplementedError(f"Fluid title '{title}' not implemented. Check spelling")
+    if instance == 'HumidAir':
+        if len(composition) != 1 or composition[0][0] != 'humidity' or composition[0][1] < 0:
+            raise NotImplementedError(f"humid air needs a non-negative humidity: '{title}'")
+    elif any(name not in fld.FluidsList.__members__ or not 0 < value < 1 for name, value in composition):
+        raise NotImplementedError(f"mixture components or fractions not implemented: '{title}'")
+    return instance, composition
+
+
+def create_pyfluids(title: str):
+    """
+    Create the pyfluids object of a fluid title: 'pyfluids.Fluid', 'pyfluids.Mixture' or 'pyfluids.HumidAir'.
+
+    Args:
+        title (str): The title of the fluid.
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+        ValueError: If pyfluids needs further information, e.g. the fraction of an incompressible mixture.
+
+    Returns:
+        The pyfluids object.
+    """
+    instance, composition = parse_title(title)
+    if instance == 'Fluid':
+        return fld.Fluid(fld.FluidsList[title])
+    if instance == 'Mixture':
+        return fld.Mixture([fld.FluidsList[name] for name, _ in composition], [value for _, value in composition])
+    return fld.HumidAir()
+
+
+def update_pyfluids(fluid, title: str, pressure: float, temperature: float):
+    """
+    Update a pyfluids object created by 'create_pyfluids' to a pressure and temperature.
+
+    Humid air is updated with the humidity of its title.
+
+    Raises:
+        ValueError: If the state is not supported by pyfluids.
+    """
+    instance, composition = parse_title(title)
+    if instance == 'HumidAir':
+        fluid.update(fld.InputHumidAir.pressure(pressure), fld.InputHumidAir.temperature(temperature),
+                     fld.InputHumidAir.humidity(composition[0][1]))
+    else:
+        fluid.update(fld.Input.pressure(pressure), fld.Input.temperature(temperature))
+
+
+class ValidityEnvelope:
+    """
+    Region of (pressure, temperature) states a fluid can be evaluated at, precomputed once per fluid.
+
+    The envelope is a fast pre-filter for states which are certainly not supported, so they are rejected by a few
+    vectorized comparisons instead of a failing pyfluids call. All other states are left to the backend.
+    States are rejected at non-positive pressures, below the triple point in temperature and pressure, on the saturation
+    curve, where pressure and temperature do not define the state, and outside explicitly given limits.
+    For pseudo-pure fluids the whole band between dew and bubble pressure is rejected.
+    The nominal limits of the equations of state in pyfluids are no hard limits, e.g. pyfluids evaluates liquid water
+    above its maximum pressure, so they are not used by 'from_pyfluids'.
+    The saturation curve is interpolated, only states which are on the curve within 'saturation_tolerance' despite
+    the local interpolation error are rejected; states near the curve are left to the backend.
+
+    Args:
+        title (str): The name of the fluid.
+        min_temperature (float, optional): The minimal temperature in Kelvin (K).
+        max_temperature (float, optional): The maximal temperature in Kelvin (K).
+        max_pressure (float, optional): The maximal pressure in Pascals (Pa).
+        triple_point (tuple, optional): Pressure in Pascals (Pa) and temperature in Kelvin (K) of the triple point,
+            states below both are rejected.
+        critical_point (tuple, optional): Pressure in Pascals (Pa) and temperature in Kelvin (K) of the critical point.
+        saturation (tuple, optional): Saturation temperatures in Kelvin (K), bubble and dew pressures in Pascals (Pa)
+            and the relative interpolation error of every interval between the temperatures.
+        min_pressure (float, optional): The minimal pressure in Pascals (Pa).
+
+    Attributes:
+        reasons (tuple): The messages of the violation codes returned by 'violations', code 0 is a valid state.
+    """
+
+    reasons = (None, 'pressure below minimum pressure', 'pressure above maximum pressure',
+               'temperature below minimum temperature', 'temperature above maximum temperature',
+               'state on the saturation curve', 'state below the triple point')
+    saturation_tolerance = 1e-6
+    # minimal and maximal temperature, maximal pressure, triple point, critical point, saturation, minimal pressure
+    humid_air_limits = (130, 623.15, 1e7, None, None, None, 10)
+
+    def __init__(self, title: str, min_temperature: float = None, max_temperature: float = None,
+                 max_pressure: float = None, triple_point: tuple = None, critical_point: tuple = None,
+                 saturation: tuple = None, min_pressure: float = None):
+        self.title = title
+        self.min_pressure = 0 if min_pressure is None else min_pressure
+        self.min_temperature = -np.inf if min_temperature is None else min_temperature
+        self.max_temperature = np.inf if max_temperature is None else max_temperature
+        self.max_pressure = np.inf if max_pressure is None else max_pressure
+        self.triple_point = triple_point
+        self.critical_point = critical_point
+        self.saturation = saturation
+        if saturation is not None:
+            temperatures, bubble_pressures, dew_pressures, _ = saturation
+            # ln(p) is close to linear in 1/T (Clausius-Clapeyron), the splines need increasing abscissae
+            self._bubble = CubicSpline(1 / temperatures[::-1], np.log(bubble_pressures[::-1]))
+            self._dew = CubicSpline(1 / temperatures[::-1], np.log(dew_pressures[::-1]))
+            # plain lists for the scalar check in 'reason', numpy overhead dominates single states
+            self._nodes = temperatures.tolist()
+            self._knots = self._bubble.x.tolist()
+            self._coefficients = self._bubble.c.T.tolist(), self._dew.c.T.tolist()
+
+    @classmethod
+    def from_pyfluids(cls, title: str, n_points: int = 100):
+        """
+        Create the envelope of a fluid from the limits and the saturation curve of pyfluids.
+
+        The relative interpolation error of the saturation curve is measured in the middle of every interval.
+        Fluids which can not be created without further information, e.g. incompressible mixtures without a fraction,
+        and mixtures get an envelope without limits, humid air the validity range of the CoolProp humid air model.
+        Predefined mixtures evaluated as pseudo-pure fluids, e.g. 'R407C', are evaluated below their triple point by
+        pyfluids, so it is not checked for them.
+
+        Args:
+            title (str): The name of the fluid.
+            n_points (int, optional): Number of points on the saturation curve. Defaults to 100.
+
+        Raises:
+            NotImplementedError: If the fluid title is not implemented in pyfluids.
+
+        Returns:
+            ValidityEnvelope: The envelope of the fluid.
+        """
+        instance, _ = parse_title(title)
+        if instance == 'HumidAir':
+            return cls(title, *cls.humid_air_limits)
+        try:
+            fluid = create_pyfluids(title)
+        except ValueError as e:
+            logging.debug(f"no validity envelope for {title}\n {e}")
+            return cls(title)
+        if instance == 'Mixture':
+            return cls(title)
+
+        triple_point = fluid.triple_pressure, fluid.triple_temperature
+        critical_point = fluid.critical_pressure, fluid.critical_temperature
+        try:
+            # the critical point itself is excluded, the saturation curve is singular there
+            temperatures = np.linspace(triple_point[1], critical_point[1] * (1 - 1e-6), 2 * n_points - 1)
+            bubble = _saturation_pressures(fluid, temperatures, 0)
+            dew = _saturation_pressures(fluid, temperatures, 1)
+        except ValueError as e:
+            logging.debug(f"no saturation curve for {title}\n {e}")
+            saturation = None
+        else:
+            nodes, mid = slice(None, None, 2), slice(1, None, 2)
+            saturation = temperatures[nodes], bubble[nodes], dew[nodes], np.zeros(n_points - 1)
+            envelope = cls(title, saturation=saturation)
+            for spline, exact in ((envelope._bubble, bubble[mid]), (envelope._dew, dew[mid])):
+                approx = np.exp(spline(1 / temperatures[mid]))
+                saturation[3][:] = np.maximum(saturation[3], np.abs(approx / exact - 1))
+
+        if fluid.name.coolprop_name.endswith('.mix'):
+            triple_point = None
+        return cls(title, triple_point=triple_point, critical_point=critical_point, saturation=saturation)
+
+    def violations(self, pressure, temperature):
+        """
+        Check states against the envelope.
+
+        Args:
+            pressure (float or numpy.ndarray): The pressure in Pascals (Pa).
+            temperature (float or numpy.ndarray): The temperature in Kelvin (K).
+
+        Returns:
+            numpy.ndarray: The violation code of every state with the shape of the broadcast inputs,
+                0 for valid states, see 'reasons' for the messages of the other codes.
+        """
+        pressure, temperature = np.broadcast_arrays(np.asarray(pressure, dtype=float),
+                                                    np.asarray(temperature, dtype=float))
+        codes = np.zeros(pressure.shape, dtype=np.int8)
+        codes[temperature > self.max_temperature] = 4
+        codes[temperature < self.min_temperature] = 3
+        codes[pressure > self.max_pressure] = 2
+        codes[(pressure <= 0) | (pressure < self.min_pressure)] = 1
+        if self.triple_point is not None:
+            triple_pressure, triple_temperature = self.triple_point
+            codes[(codes == 0) & (pressure < triple_pressure) & (temperature < triple_temperature)] = 6
+
+        if self.saturation is not None:
+            temperatures, _, _, error = self.saturation
+            candidates = (codes == 0) & (temperatures[0] <= temperature) & (temperature <= temperatures[-1])
+            if candidates.any():
+                t, p = temperature[candidates], pressure[candidates]
+                index = np.clip(np.searchsorted(temperatures, t) - 1, 0, len(error) - 1)
+                # widen the band by the tolerance and shrink it by twice the local interpolation error,
+                # so only certainly invalid states are rejected
+                margin = self.saturation_tolerance - 2 * error[index]
+                bubble = np.exp(self._bubble(1 / t))
+                dew = np.exp(self._dew(1 / t))
+                on_curve = (dew * (1 - margin) <= p) & (p <= bubble * (1 + margin))
+                codes[candidates] = np.where(on_curve, 5, 0)
+        return codes
+
+    def contains(self, pressure, temperature):
+        """
+        Check if states lie inside the envelope.
+
+        Args:
+            pressure (float or numpy.ndarray): The pressure in Pascals (Pa).
+            temperature (float or numpy.ndarray): The temperature in Kelvin (K).
+
+        Returns:
+            bool or numpy.ndarray: True for every valid state.
+        """
+        valid = self.violations(pressure, temperature) == 0
+        return bool(valid) if valid.ndim == 0 else valid
+
+    def reason(self, pressure: float, temperature: float):
+        """
+        Get the reason a state is rejected by the envelope.
+
+        Args:
+            pressure (float): The pressure in Pascals (Pa).
+            temperature (float): The temperature in Kelvin (K).
+
+        Returns:
+            str or None: The reason or None if the state is valid.
+        """
+        p, t = float(pressure), float(temperature)
+        if p <= 0 or p < self.min_pressure:
+            code = 1
+        elif p > self.max_pressure:
+            code = 2
+        elif t < self.min_temperature:
+            code = 3
+        elif t > self.max_temperature:
+            code = 4
+        elif self.triple_point is not None and p < self.triple_point[0] and t < self.triple_point[1]:
+            code = 6
+        elif self.saturation is not None and self._nodes[0] <= t <= self._nodes[-1]:
+            code = 5 if self._on_curve(p, t) else 0
+        else:
+            code = 0
+        return self.reasons[code]
+
+    def _on_curve(self, pressure: float, temperature: float):
+        """Scalar version of the saturation band check in 'violations'."""
+        error = self.saturation[3]
+        index = min(max(bisect_left(self._nodes, temperature) - 1, 0), len(error) - 1)
+        margin = self.saturation_tolerance - 2 * float(error[index])
+        x = 1 / temperature
+        interval = min(max(bisect_right(self._knots, x) - 1, 0), len(self._knots) - 2)
+        d = x - self._knots[interval]
+        bubble, dew = (math.exp(((c[0] * d + c[1]) * d + c[2]) * d + c[3])
+                       for c in (coefficients[interval] for coefficients in self._coefficients))
+        return dew * (1 - margin) <= pressure <= bubble * (1 + margin)
+
+    def __repr__(self):
+        output = f"ValidityEnvelope: title = {self.title}\n"
+        output += f"\tT = {self.min_temperature} ... {self.max_temperature} K, p <= {self.max_pressure} Pa\n"
+        output += f"\ttriple point = {self.triple_point}, critical point = {self.critical_point}\n"
+        if self.saturation is not None:
+            output += f"\tsaturation curve: n = {len(self.saturation[0])}, error <= {self.saturation[3].max():.2e}\n"
+        return output
+
+
+def _saturation_pressures(fluid, temperatures, quality):
+    """
+    Evaluate the saturation pressures at the given temperatures and vapor quality with a pyfluids object.
+
+    Raises:
+        ValueError: If the saturation state is not supported by pyfluids.
+    """
+    pressures = np.empty(len(temperatures))
+    for i, temperature in enumerate(temperatures):
+        fluid.update(fld.Input.temperature(temperature), fld.Input.quality(quality))
+        pressures[i] = fluid.pressure
+    return pressures
+
+
+envelopes = {}
+
+
+def get_envelope(title: str):
+    """
+    Get the validity envelope of a fluid, it is created on first use.
+
+    Args:
+        title (str): The name of the fluid.
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+
+    Returns:
+        ValidityEnvelope: The envelope of the fluid.
+    """
+    try:
+        return envelopes[title]
+    except KeyError:
+        envelope = envelopes[title] = ValidityEnvelope.from_pyfluids(title)
+        return envelope
+
+
+diagnostics = deque(maxlen=10000)
+
+
+def add_diagnostic(title: str, pressure: float, temperature: float, reason: str):
+    """
+    Record a rejected state in the diagnostics, which keep the latest 10000 entries.
+
+    Args:
+        title (str): The name of the fluid.
+        pressure (float): The pressure in Pascals (Pa).
+        temperature (float): The temperature in Kelvin (K).
+        reason (str): Why the state was rejected.
+    """
+    diagnostics.append(Diagnostic(title, pressure, temperature, reason))
+    logging.debug(f"state of {title} rejected: p = {pressure} Pa, T = {temperature} K\n {reason}")
+
+
+def get_diagnostics(title: str = None):
+    """
+    Get the recorded rejected states.
+
+    Args:
+        title (str, optional): The name of the fluid. If None, the states of all fluids are returned.
+
+    Returns:
+        list: The Diagnostic entries, oldest first.
+    """
+    return [entry for entry in diagnostics if title is None or entry.title == title]
+
+
+def clear_diagnostics():
+    """
+    Remove all recorded rejected states.
+    """
+    diagnostics.clear()
+
+
+class ThreadLocalPool(threading.local):
+    """
+    Pool of stateful backend objects keyed by fluid title with separate objects for every thread.
+
+    Objects like pyfluids fluids or CoolProp states are mutated by every evaluation, so they must not be shared
+    between threads. Every thread gets its own objects from the factory on first use and reuses them afterwards.
+
+    Args:
+        factory (callable): Creates the object of a fluid title, raises NotImplementedError for unknown titles.
+    """
+
+    def __init__(self, factory):
+        # called again in every thread which accesses the pool
+        self.factory = factory
+        self.objects = {}
+
+    def get(self, title: str):
+        """
+        Get the object of a fluid for the calling thread, it is created on first use.
+
+        Args:
+            title (str): The name of the fluid.
+
+        Returns:
+            The object of the fluid.
+        """
+        try:
+            return self.objects[title]
+        except KeyError:
+            value = self.objects[title] = self.factory(title)
+            return value
+
+    def __len__(self):
+        return len(self.objects)
+
+
+_pyfluids_objects = ThreadLocalPool(create_pyfluids)
+
+
+class ObjectPool:
+    """
+    A pool of pyfluids objects keyed by fluid title, which hands out idle objects and reclaims released ones.
+
+    Creating a pyfluids object looks up the fluid and allocates a CoolProp state, so long-running processes
+    creating many Fluid objects reuse the objects of released fluids instead. A reused object is in the state of its
+    last user and has to be updated before it is read. The pool is thread-safe.
+
+    Args:
+        factory (callable, optional): Creates the object of a fluid title. Defaults to 'create_pyfluids'.
+        maxsize (int, optional): The maximal number of idle objects per fluid title, further released objects are
+            dropped. Defaults to 64.
+
+    Attributes:
+        created (int): Number of objects created because no idle object was available.
+        reused (int): Number of idle objects handed out again.
+        released (int): Number of objects taken back.
+        dropped (int): Number of released objects dropped because the pool was full.
+    """
+
+    def __init__(self, factory=create_pyfluids, maxsize: int = 64):
+        self.factory = factory
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._idle = {}
+        self.created, self.reused, self.released, self.dropped = 0, 0, 0, 0
+
+    def acquire(self, title: str):
+        """
+        Get an object of a fluid, an idle one if available or a new one.
+
+        Args:
+            title (str): The title of the fluid.
+
+        Raises:
+            NotImplementedError: If the fluid title is not implemented in pyfluids.
+
+        Returns:
+            The pyfluids object, owned by the caller until it is released.
+        """
+        with self._lock:
+            idle = self._idle.get(title)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+        value = self.factory(title)
+        with self._lock:
+            self.created += 1
+        return value
+
+    def release(self, title: str, value):
+        """
+        Take an object back, the caller must not use it anymore.
+
+        Args:
+            title (str): The title of the fluid the object was acquired for.
+            value: The pyfluids object.
+        """
+        with self._lock:
+            self.released += 1
+            idle = self._idle.setdefault(title, [])
+            if len(idle) < self.maxsize:
+                idle.append(value)
+            else:
+                self.dropped += 1
+
+    @property
+    def reuse_rate(self):
+        """
+        Get the share of acquired objects which were reused instead of created.
+
+        Returns:
+            float: The reuse rate between 0 and 1, NaN if no object was acquired.
+        """
+        acquired = self.created + self.reused
+        return self.reused / acquired if acquired else np.nan
+
+    def info(self):
+        """
+        Get the statistics of the pool.
+
+        Returns:
+            PoolInfo: The created, reused, released and dropped objects and the number of idle objects.
+        """
+        return PoolInfo(self.created, self.reused, self.released, self.dropped, len(self))
+
+    def clear(self):
+        """
+        Remove all idle objects and reset the statistics.
+        """
+        with self._lock:
+            self._idle.clear()
+            self.created, self.reused, self.released, self.dropped = 0, 0, 0, 0
+
+    def __len__(self):
+        return sum(len(idle) for idle in self._idle.values())
+
+    def __repr__(self):
+        created, reused, released, dropped, size = self.info()
+        return f"ObjectPool: size = {size}, created = {created}, reused = {reused}, released = {released}, " \
+               f"dropped = {dropped}, reuse rate = {self.reuse_rate:.2f}"
+
+
+fluid_pool = ObjectPool()
+
+
+def _evaluate_pyfluids(title, pressure, temperature):
+    """
+    Evaluate a state with one reused pyfluids object per fluid title and thread.
+
+    States outside the validity envelope of the fluid are rejected without a pyfluids call.
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+        ValueError: If the state is not supported by pyfluids.
+    """
+    fluid = _pyfluids_objects.get(title)
+    reason = get_envelope(title).reason(pressure, temperature)
+    if reason is not None:
+        raise ValueError(f"{reason}: p = {pressure} Pa, T = {temperature} K")
+    update_pyfluids(fluid, title, pressure, temperature)
+    # humid air has no phase in pyfluids, condensed water is not modelled
+    phase = fld.Phases.Gas if isinstance(fluid, fld.HumidAir) else fluid.phase
+    return FluidProperties(fluid.density, fluid.specific_heat, fluid.enthalpy, phase)
+
+
+state_cache = StateCache()
+
+
+def _empty_properties(shape):
+    """
+    Get property arrays of the given shape filled with NaN and the phase 'pyfluids.Phases.Unknown'.
+    """
+    phase = np.full(shape, fld.Phases.Unknown, dtype=object)
+    return FluidProperties(np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan), phase)
+
+
+class PropertyBackend:
+    """
+    Interface of a source of thermodynamic fluid properties.
+
+    A backend answers single states with 'evaluate' and many states of one fluid with 'evaluate_batch'.
+    User-defined backends subclass this class and implement at least 'evaluate'; the default 'evaluate_batch'
+    loops over the states.
+
+    Attributes:
+        name (str): The name of the backend.
+        supports_batch (bool): True if 'evaluate_batch' is vectorized instead of looping over the states.
+        supports_threads (bool): True if the backend can be evaluated from several threads at the same time.
+    """
+    name = 'backend'
+    supports_batch = False
+    supports_threads = False
+
+    def evaluate(self, title: str, pressure: float, temperature: float):
+        """
+        Get the properties of a fluid state.
+
+        Args:
+            title (str): The name of the fluid.
+            pressure (float): The pressure in Pascals (Pa).
+            temperature (float): The temperature in Kelvin (K).
+
+        Raises:
+            NotImplementedError: If the fluid is not supported by the backend.
+            ValueError: If the state is not supported by the backend.
+
+        Returns:
+            FluidProperties: The properties of the state.
+        """
+        raise NotImplementedError
+
+    def evaluate_batch(self, title: str, pressures, temperatures):
+        """
+        Get the properties of many states of one fluid.
+
+        Args:
+            title (str): The name of the fluid.
+            pressures (numpy.ndarray): The pressures in Pascals (Pa).
+            temperatures (numpy.ndarray): The temperatures in Kelvin (K), with the shape of the pressures.
+
+        Raises:
+            NotImplementedError: If the fluid is not supported by the backend.
+
+        Returns:
+            FluidProperties: Arrays with the shape of the inputs, the phases as object array.
+                Unsupported states are returned as NaN with the phase 'pyfluids.Phases.Unknown'.
+        """
+        states = _empty_properties(pressures.shape)
+        for index in np.ndindex(pressures.shape):
+            try:
+                state = self.evaluate(title, pressures[index], temperatures[index])
+            except ValueError:
+                continue
+            for array, value in zip(states, state):
+                array[index] = value
+        return states
+
+    def __repr__(self):
+        return f"{type(self).__name__}: {self.name}, batch: {self.supports_batch}, threads: {self.supports_threads}"
+
+
+class PyfluidsBackend(PropertyBackend):
+    """
+    Backend evaluating every state with the full pyfluids equation of state.
+
+    The states are answered by the process-wide state cache, registered tables and correlations are ignored.
+    The backend is thread-safe, every thread evaluates with its own pyfluids objects.
+    """
+    name = 'pyfluids'
+    supports_threads = True
+
+    def evaluate(self, title: str, pressure: float, temperature: float):
+        return state_cache.lookup(title, pressure, temperature)
+
+
+class SurrogateBackend(PropertyBackend):
+    """
+    Base of backends answering states by registered approximations of the fluids.
+
+    States outside the validity range of the approximations are passed to the fallback backend.
+
+    Args:
+        registry (dict): The approximations by fluid title; the dict is read on every call,
+            so approximations registered later are used as well.
+        fallback (PropertyBackend, optional): The backend for all other states, full pyfluids if None.
+    """
+    name = 'surrogate'
+
+    def __init__(self, registry: dict, fallback: PropertyBackend = None):
+        self.registry = registry
+        self.fallback = fallback
+
+    @property
+    def fallback(self):
+        """
+        Get or set the backend for states outside the approximations.
+
+        Args:
+            value (PropertyBackend or None): The backend, full pyfluids if None.
+
+        Raises:
+            NotImplementedError: If the value is not a PropertyBackend.
+        """
+        return self._fallback
+
+    @fallback.setter
+    def fallback(self, value):
+        if value is None:
+            value = PyfluidsBackend()
+        if isinstance(value, PropertyBackend):
+            self._fallback = value
+        else:
+            raise NotImplementedError
+
+    @property
+    def supports_batch(self):
+        """
+        Get if the states outside the approximations are evaluated vectorized as well.
+        """
+        return self.fallback.supports_batch
+
+    @property
+    def supports_threads(self):
+        """
+        Get if the fallback backend is thread-safe, the approximations are read-only.
+        """
+        return self.fallback.supports_threads
+
+    def evaluate(self, title: str, pressure: float, temperature: float):
+        surrogate = self.registry.get(title)
+        if surrogate is not None and surrogate.contains(pressure, temperature):
+            return surrogate.state(pressure, temperature)
+        return self.fallback.evaluate(title, pressure, temperature)
+
+    def evaluate_batch(self, title: str, pressures, temperatures):
+        surrogate = self.registry.get(title)
+        if surrogate is None:
+            return self.fallback.evaluate_batch(title, pressures, temperatures)
+
+        states = _empty_properties(pressures.shape)
+        inside = surrogate.contains(pressures, temperatures)
+        if inside.any():
+            p_in, t_in = pressures[inside], temperatures[inside]
+            for name in surrogate.properties:
+                getattr(states, name)[inside] = surrogate.evaluate(name, p_in, t_in)
+            states.phase[inside] = surrogate.phase
+        outside = ~inside
+        if outside.any():
+            rest = self.fallback.evaluate_batch(title, pressures[outside], temperatures[outside])
+            for array, values in zip(states, rest):
+                array[outside] = values
+        return states
+
+    def __repr__(self):
+        return f"{super().__repr__()}\n\tfallback: {self.fallback}"
+
+
+class TabulatedBackend(SurrogateBackend):
+    """
+    Backend answering states by property tables, see 'PropertyTable'.
+
+    Args:
+        registry (dict, optional): The tables by fluid title, the tables registered with 'tabulate' if None.
+        fallback (PropertyBackend, optional): The backend for states outside the tables, full pyfluids if None.
+    """
+    name = 'tabulated'
+
+    def __init__(self, registry: dict = None, fallback: PropertyBackend = None):
+        super().__init__(tables if registry is None else registry, fallback)
+
+
+class CorrelationBackend(SurrogateBackend):
+    """
+    Backend answering states by polynomial correlations, see 'PolynomialCorrelation'.
+
+    Args:
+        registry (dict, optional): The correlations by fluid title, the correlations registered with 'correlate'
+            if None.
+        fallback (PropertyBackend, optional): The backend for states outside the correlations, full pyfluids if None.
+    """
+    name = 'correlation'
+
+    def __init__(self, registry: dict = None, fallback: PropertyBackend = None):
+        super().__init__(correlations if registry is None else registry, fallback)
+
+
+class ConstantPropertyBackend(PropertyBackend):
+    """
+    Backend with constant density and specific heat capacity per fluid, intended for cheap screening runs.
+
+    The constants are taken from the fallback backend at the reference state once per fluid, unless given.
+    The enthalpy is linear in the temperature: h = h_ref + c_p (T - T_ref), the phase is the phase of the reference state.
+
+    Args:
+        reference_pressure (float, optional): The reference pressure in Pascals (Pa).
+        reference_temperature (float, optional): The reference temperature in Kelvin (K).
+        constants (dict, optional): FluidProperties of the reference state by fluid title, overriding the fallback.
+        fallback (PropertyBackend, optional): The backend evaluating the reference states, full pyfluids if None.
+    """
+    name = 'constant'
+    supports_batch = True
+    supports_threads = True
+
+    def __init__(self, reference_pressure: float = 101325, reference_temperature: float = 293.15,
+                 constants: dict = None, fallback: PropertyBackend = None):
+        self.reference_pressure = reference_pressure
+        self.reference_temperature = reference_temperature
+        self.constants = dict() if constants is None else dict(constants)
+        self.fallback = PyfluidsBackend() if fallback is None else fallback
+
+    def reference_state(self, title: str):
+        """
+        Get the properties of the reference state of a fluid, evaluated once.
+
+        Args:
+            title (str): The name of the fluid.
+
+        Returns:
+            FluidProperties: The properties of the reference state.
+        """
+        try:
+            return self.constants[title]
+        except KeyError:
+            state = self.fallback.evaluate(title, self.reference_pressure, self.reference_temperature)
+            self.constants[title] = state
+            return state
+
+    def evaluate(self, title: str, pressure: float, temperature: float):
+        density, specific_heat, enthalpy, phase = self.reference_state(title)
+        enthalpy = enthalpy + specific_heat * (temperature - self.reference_temperature)
+        return FluidProperties(density, specific_heat, enthalpy, phase)
+
+    def evaluate_batch(self, title: str, pressures, temperatures):
+        density, specific_heat, enthalpy, phase = self.reference_state(title)
+        shape = pressures.shape
+        enthalpy = enthalpy + specific_heat * (temperatures - self.reference_temperature)
+        return FluidProperties(np.full(shape, float(density)), np.full(shape, float(specific_heat)),
+                               np.array(enthalpy, dtype=float), np.full(shape, phase, dtype=object))
+
+
+class CoolPropBackend(PropertyBackend):
+    """
+    Backend evaluating states directly with a low-level CoolProp 'AbstractState', bypassing the pyfluids wrapper.
+
+    One state object per fluid is updated in place with 'PT_INPUTS', so there is no per-call overhead of 'Input'
+    objects and unit conversion; the batch evaluation updates it in a tight loop. With the 'HEOS' backend the
+    results are identical to pyfluids, the tabular 'BICUBIC&HEOS' backend is faster, but builds its tables on first use
+    and interpolates them. States are neither cached nor checked against the validity envelope, CoolProp rejects them.
+    Every thread updates its own state objects.
+
+    Args:
+        backend (str, optional): The CoolProp backend, e.g. 'HEOS' or 'BICUBIC&HEOS'. Defaults to 'HEOS'.
+    """
+    name = 'coolprop'
+    supports_batch = True
+    supports_threads = True
+
+    def __init__(self, backend: str = 'HEOS'):
+        self.backend = backend
+        self._states = ThreadLocalPool(self._create_state)
+
+    def state(self, title: str):
+        """
+        Get the reused CoolProp state object of a fluid for the calling thread, it is created on first use.
+
+        Args:
+            title (str): The name of the fluid.
+
+        Raises:
+            NotImplementedError: If the fluid title is not implemented in pyfluids or not a pure or pseudo-pure fluid.
+
+        Returns:
+            CoolProp.AbstractState: The state object.
+        """
+        return self._states.get(title)
+
+    def _create_state(self, title):
+        try:
+            fluid = fld.FluidsList[title]
+        except KeyError:
+            raise NotImplementedError("Fluid not implemented. Check spelling")
+        if fluid.coolprop_backend != 'HEOS':
+            raise NotImplementedError(f"{title} is not supported by {type(self).__name__}")
+        return CoolProp.AbstractState(self.backend, fluid.coolprop_name)
+
+    def evaluate(self, title: str, pressure: float, temperature: float):
+        state = self.state(title)
+        state.update(CoolProp.PT_INPUTS, pressure, temperature)
+        return FluidProperties(state.rhomass(), state.cpmass(), state.hmass(), fld.Phases(state.phase()))
+
+    def evaluate_batch(self, title: str, pressures, temperatures):
+        state = self.state(title)
+        update, inputs = state.update, CoolProp.PT_INPUTS
+        nan, unknown = np.nan, CoolProp.iphase_unknown
+        rows = []
+        for pressure, temperature in zip(pressures.ravel().tolist(), temperatures.ravel().tolist()):
+            try:
+                update(inputs, pressure, temperature)
+            except ValueError:
+                rows.append((nan, nan, nan, unknown))
+                continue
+            rows.append((state.rhomass(), state.cpmass(), state.hmass(), state.phase()))
+        values = np.array(rows, dtype=float).reshape(pressures.shape + (4,))
+        codes = values[..., 3].astype(int)
+        phase = np.full(pressures.shape, fld.Phases.Unknown, dtype=object)
+        for code in np.unique(codes):
+            phase[codes == code] = fld.Phases(code)
+        return FluidProperties(values[..., 0], values[..., 1], values[..., 2], phase)
+
+    def __repr__(self):
+        return f"{super().__repr__()}, CoolProp backend: {self.backend}"
+
+
+default_backend = CorrelationBackend(fallback=TabulatedBackend())
+
+
+class _BackendStack(threading.local):
+    """
+    The backends activated by 'use_backend', separately for every thread.
+    """
+
+    def __init__(self):
+        self.backends = [default_backend]
+
+
+_backend_stack = _BackendStack()
+
+
+def get_backend():
+    """
+    Get the active property backend of the calling thread, used by 'evaluate', 'evaluate_batch' and all Fluid objects.
+
+    Returns:
+        PropertyBackend: The active backend.
+    """
+    return _backend_stack.backends[-1]
+
+
+@contextmanager
+def use_backend(backend: PropertyBackend = None):
+    """
+    Context manager activating a property backend, e.g. a cheap backend for screening runs.
+
+    Properties of fluid states are evaluated again, if they are read with another backend active.
+    The backend is only activated in the calling thread.
+
+    Args:
+        backend (PropertyBackend, optional): The backend to activate, the active backend is kept if None.
+
+    Raises:
+        NotImplementedError: If the backend is not a PropertyBackend.
+
+    Examples:
+        >>> with use_backend(ConstantPropertyBackend()):
+        ...     network.temperature_outputs
+    """
+    if backend is None:
+        backend = get_backend()
+    if not isinstance(backend, PropertyBackend):
+        raise NotImplementedError
+    backends = _backend_stack.backends
+    backends.append(backend)
+    try:
+        yield backend
+    finally:
+        backends.pop()
+
+
+def with_backend(method):
+    """
+    Decorator evaluating a method with the backend stored in the 'backend' attribute of the instance active.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with use_backend(getattr(self, 'backend', None)):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def evaluate(title: str, pressure: float, temperature: float):
+    """
+    Get the properties of a fluid state from the active backend.
+
+    With the default backend, states inside the validity range of registered correlations or a registered property
+    table are answered by them, all other states are answered by the process-wide state cache, which evaluates
+    every state with pyfluids only once.
+
+    Args:
+        title (str): The name of the fluid.
+        pressure (float): The pressure in Pascals (Pa).
+        temperature (float): The temperature in Kelvin (K).
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+        ValueError: If the state is not supported by pyfluids.
+
+    Returns:
+        FluidProperties: The properties of the state.
+    """
+    return get_backend().evaluate(title, pressure, temperature)
+
+
+def evaluate_batch(title: str, pressures, temperatures):
+    """
+    Get the properties of many states of one fluid from the active backend in one call.
+
+    With the default backend, states inside registered correlations or a registered property table are evaluated
+    in one vectorized call, the remaining states are answered by the state cache. No Fluid object is created per state.
+    States outside the validity envelope of the fluid are rejected in one vectorized check before the backend is called.
+
+    Args:
+        title (str): The name of the fluid.
+        pressures (float or numpy.ndarray): The pressures in Pascals (Pa).
+        temperatures (float or numpy.ndarray): The temperatures in Kelvin (K).
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+
+    Returns:
+        FluidProperties: Arrays with the shape of the broadcast inputs, the phases as object array.
+            Unsupported states are returned as NaN with the phase 'pyfluids.Phases.Unknown'.
+    """
+    pressures, temperatures = np.broadcast_arrays(np.asarray(pressures, dtype=float),
+                                                  np.asarray(temperatures, dtype=float))
+    valid = get_envelope(title).contains(pressures, temperatures)
+    if np.all(valid):
+        return get_backend().evaluate_batch(title, pressures, temperatures)
+    states = _empty_properties(pressures.shape)
+    if np.any(valid):
+        subset = get_backend().evaluate_batch(title, pressures[valid], temperatures[valid])
+        for array, values in zip(states, subset):
+            array[valid] = values
+    return states
+
+
+def evaluate_parallel(title: str, pressures, temperatures, workers: int = None, chunk_size: int = 1024):
+    """
+    Get the properties of many states of one fluid, evaluated in chunks by a thread pool.
+
+    The chunks are evaluated by 'evaluate_batch' with the active backend of the calling thread. Backends which do not
+    support threads and batches smaller than two chunks are evaluated in the calling thread.
+    The evaluation only runs in parallel as far as the backend releases the GIL, CoolProp holds it during updates,
+    so the speedup of pyfluids and CoolProp backends is limited.
+
+    Args:
+        title (str): The name of the fluid.
+        pressures (float or numpy.ndarray): The pressures in Pascals (Pa).
+        temperatures (float or numpy.ndarray): The temperatures in Kelvin (K).
+        workers (int, optional): The maximal number of threads, see 'concurrent.futures.ThreadPoolExecutor'.
+        chunk_size (int, optional): The number of states evaluated by one task. Defaults to 1024.
+
+    Raises:
+        NotImplementedError: If the fluid title is not implemented in pyfluids.
+
+    Returns:
+        FluidProperties: Arrays with the shape of the broadcast inputs, see 'evaluate_batch'.
+    """
+    pressures, temperatures = np.broadcast_arrays(np.asarray(pressures, dtype=float),
+                                                  np.asarray(temperatures, dtype=float))
+    backend = get_backend()
+    if not backend.supports_threads or pressures.size < 2 * chunk_size or workers == 1:
+        return evaluate_batch(title, pressures, temperatures)
+
+    def evaluate_chunk(chunk):
+        with use_backend(backend):
+            return evaluate_batch(title, p_flat[chunk], t_flat[chunk])
+
+    p_flat, t_flat = pressures.ravel(), temperatures.ravel()
+    chunks = [slice(start, start + chunk_size) for start in range(0, p_flat.size, chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(evaluate_chunk, chunks))
+    return FluidProperties(*(np.concatenate(values).reshape(pressures.shape) for values in zip(*results)))
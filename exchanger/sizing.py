@@ -0,0 +1,247 @@
+"""
+Inverse sizing of heat exchangers: the heat transferability (kA) required for a target output temperature.
+
+A target output temperature fixes the heat flow and with the energy balance the other output temperature, so the
+fluid properties only depend on the target and not on the size of the exchanger. The heat capacity flows are
+iterated with the energy balance first, afterward the number of transfer units is found with a bracketing
+root finder on the vectorized P-NTU kernels of 'exchanger.kernels', which needs no property evaluations.
+"""
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+from .exchanger import HeatExchanger
+from .stream import FlowBatch
+
+SizingResult = namedtuple('SizingResult', ['heat_transferability', 'ntu', 'p', 'r', 'iterations'])
+
+
+def required_ntu(kernel, p, r, max_ntu: float = 100., tolerance: float = 1e-12, max_iter: int = 100, **parameters):
+    """
+    Get the number of transfer units of flow 1 which results in the dimensionless temperature change P1.
+
+    The root of kernel(NTU, R) - P is found for all elements at once with the Illinois variant of the regula falsi,
+    a bracketing method with superlinear convergence. The bracket starts at NTU = 0 and is doubled up to max_ntu.
+
+    Args:
+        kernel (callable): The P kernel of the exchanger type, see 'exchanger.kernels'.
+        p (float or numpy.ndarray): The target dimensionless temperature change P1.
+        r (float or numpy.ndarray): The heat capacity flow ratio of flow 1.
+        max_ntu (float): The largest number of transfer units searched.
+        tolerance (float): The absolute tolerance of P1.
+        max_iter (int): The maximal number of iterations.
+        **parameters: Additional keyword arguments of the kernel.
+
+    Returns:
+        float or numpy.ndarray: The number of transfer units of flow 1, NaN if the target can not be reached.
+
+    Warns:
+        UserWarning: If a target can not be reached with NTU <= max_ntu or the iteration did not converge.
+    """
+    p, r = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(r, dtype=float))
+
+    def residual(ntu):
+        return np.asarray(kernel(ntu, r, **parameters)) - p
+
+    # the bracket [0, x1] is grown until the residual changes its sign
+    x1 = np.ones(p.shape)
+    f1 = residual(x1)
+    while np.any((f1 < 0) & (x1 < max_ntu)):
+        grow = f1 < 0
+        x1 = np.where(grow, np.minimum(2 * x1, max_ntu), x1)
+        f1 = np.where(grow, residual(x1), f1)
+    unreachable = (f1 < 0) | (p < 0) | ~np.isfinite(p)
+    if np.any(unreachable):
+        warnings.warn(f"{np.count_nonzero(unreachable)} target(s) not reachable with NTU <= {max_ntu}")
+
+    # x1 is the latest iterate, x0 the other end of the bracket
+    x0, f0 = np.zeros(p.shape), -p
+    ntu = np.where(p == 0, 0., x1)
+    active = ~unreachable & (p != 0) & (np.abs(f1) > tolerance)
+    for _ in range(max_iter):
+        if not np.any(active):
+            break
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = x1 - f1 * (x1 - x0) / (f1 - f0)
+        # fall back to bisection where the secant leaves the bracket
+        inside = (x > np.minimum(x0, x1)) & (x < np.maximum(x0, x1))
+        x = np.where(inside, x, (x0 + x1) / 2)
+        f = residual(x)
+        ntu = np.where(active, x, ntu)
+        # Illinois: the retained end point gets half its residual to avoid one-sided convergence
+        swap = active & (np.sign(f) != np.sign(f1))
+        x0, f0 = np.where(swap, x1, x0), np.where(swap, f1, np.where(active, f0 / 2, f0))
+        x1, f1 = np.where(active, x, x1), np.where(active, f, f1)
+        active &= (np.abs(f) > tolerance) & (np.abs(x1 - x0) > tolerance * (1 + x1))
+    else:
+        if np.any(active):
+            warnings.warn(f"NTU iteration not converged within {max_iter} iterations")
+
+    ntu = np.where(unreachable, np.nan, ntu)
+    return ntu[()] if ntu.ndim == 0 else ntu
+
+
+def _energy_balance(heat_capacity_flows, in_temperature_1, in_temperature_2, out_temperature_1, out_temperature_2,
+                    tolerance, max_iter):
+    """
+    Iterate the output temperature without a target and the heat capacity flows with the energy balance.
+
+    Args:
+        heat_capacity_flows (callable): The heat capacity flows of flow 1 and flow 2 for given output temperatures.
+        in_temperature_1, in_temperature_2 (float or numpy.ndarray): The input temperatures in Kelvin (K).
+        out_temperature_1, out_temperature_2 (float or numpy.ndarray): The target output temperature of one flow,
+            the other one is None.
+        tolerance (float): The absolute tolerance of the output temperature in K.
+        max_iter (int): The maximal number of iterations.
+
+    Returns:
+        tuple: The output temperatures, the heat capacity flows and the number of iterations.
+    """
+    target_1 = out_temperature_2 is None
+    out_1 = out_temperature_1 if target_1 else in_temperature_1
+    out_2 = in_temperature_2 if target_1 else out_temperature_2
+    for i in range(1, max_iter + 1):
+        capacity_1, capacity_2 = heat_capacity_flows(out_1, out_2)
+        if target_1:
+            new = in_temperature_2 + capacity_1 / capacity_2 * (in_temperature_1 - out_1)
+            change, out_2 = np.abs(new - out_2), new
+        else:
+            new = in_temperature_1 - capacity_2 / capacity_1 * (out_2 - in_temperature_2)
+            change, out_1 = np.abs(new - out_1), new
+        if np.all(change <= tolerance):
+            break
+    else:
+        warnings.warn(f"energy balance not converged within {max_iter} iterations")
+    capacity_1, capacity_2 = heat_capacity_flows(out_1, out_2)
+    return out_1, out_2, capacity_1, capacity_2, i
+
+
+def _check_target(out_temperature_1, out_temperature_2):
+    if (out_temperature_1 is None) == (out_temperature_2 is None):
+        raise NotImplementedError("Only implement one target output temperature")
+
+
+def _kernel(exchanger_type):
+    """Get the P kernel and its parameters of a heat exchanger type or an exchanger."""
+    if isinstance(exchanger_type, HeatExchanger) and exchanger_type.p_kernel is not None:
+        return exchanger_type.p_kernel, exchanger_type.kernel_parameters
+    if isinstance(exchanger_type, type) and issubclass(exchanger_type, HeatExchanger) \
+            and exchanger_type.p_kernel is not None:
+        return exchanger_type.p_kernel, {}
+    raise NotImplementedError(f"no P kernel defined for {exchanger_type}")
+
+
+def size_exchanger(exchanger: HeatExchanger, out_temperature_1: float = None, out_temperature_2: float = None,
+                   heat_transfer_coefficient: float = None, tolerance: float = 1e-6, max_iter: int = 20, **options):
+    """
+    Size a heat exchanger for a target output temperature of one of its flows.
+
+    The output temperatures of both flows and the heat transferability of the part are set. If a heat transfer
+    coefficient is given or defined by the part, the heat transfer area is set instead.
+
+    Args:
+        exchanger (HeatExchanger): The heat exchanger with defined input flows.
+        out_temperature_1 (float, optional): The target output temperature of flow 1 in Kelvin (K).
+        out_temperature_2 (float, optional): The target output temperature of flow 2 in Kelvin (K).
+        heat_transfer_coefficient (float, optional): The heat transfer coefficient in W/(m^2 K).
+        tolerance (float): The absolute tolerance of the output temperature in K.
+        max_iter (int): The maximal number of iterations of the energy balance.
+        **options: Additional keyword arguments of 'required_ntu', e.g. max_ntu.
+
+    Returns:
+        SizingResult: The heat transferability in W/K, NTU1, P1, R1 and the iterations of the energy balance.
+
+    Raises:
+        NotImplementedError: If not exactly one target is given or the exchanger has no specific type.
+        ValueError: If the input temperatures are equal or the target can not be reached, the exchanger is left
+            unchanged.
+    """
+    _check_target(out_temperature_1, out_temperature_2)
+    kernel, parameters = _kernel(exchanger)
+    flow_1, flow_2 = exchanger.flow_1, exchanger.flow_2
+    in_1, in_2 = flow_1.in_fluid.temperature, flow_2.in_fluid.temperature
+    if in_1 == in_2:
+        raise ValueError(f"no heat is transferred between flows with equal input temperatures of {in_1} K")
+    previous = flow_1.out_temperature, flow_2.out_temperature
+
+    def heat_capacity_flows(out_1, out_2):
+        flow_1.out_temperature, flow_2.out_temperature = out_1, out_2
+        return flow_1.heat_capacity_flow, flow_2.heat_capacity_flow
+
+    out_1, out_2, capacity_1, capacity_2, iterations = _energy_balance(
+        heat_capacity_flows, in_1, in_2, out_temperature_1, out_temperature_2, tolerance, max_iter)
+
+    p, r = (in_1 - out_1) / (in_1 - in_2), capacity_1 / capacity_2
+    ntu = required_ntu(kernel, p, r, **options, **parameters)
+    if np.isnan(ntu):
+        flow_1.out_temperature, flow_2.out_temperature = previous
+        raise ValueError(f"the target output temperature is not reachable with {type(exchanger).__name__}, P1={p:.4f}")
+    flow_1.out_temperature, flow_2.out_temperature = out_1, out_2
+    transferability = ntu * capacity_1
+
+    part = exchanger.part
+    if heat_transfer_coefficient is None and part.heat_transfer_coefficient is not NotImplemented:
+        heat_transfer_coefficient = part.heat_transfer_coefficient
+    if heat_transfer_coefficient is None:
+        exchanger.heat_transferability = transferability
+    else:
+        part.heat_transferability = NotImplemented
+        part.heat_transfer_coefficient = heat_transfer_coefficient
+        part.heat_transfer_area = transferability / heat_transfer_coefficient
+    return SizingResult(transferability, ntu, p, r, iterations)
+
+
+def size_batch(exchanger_type, flows_1: FlowBatch, flows_2: FlowBatch, out_temperatures_1=None,
+               out_temperatures_2=None, tolerance: float = 1e-6, max_iter: int = 20, **options):
+    """
+    Size many heat exchangers of one type for target output temperatures in one call.
+
+    The properties are evaluated with one batch evaluation per fluid title and iteration, the numbers of transfer
+    units of all exchangers are found in one vectorized root finding. The output temperatures of the batches are set,
+    except for unreachable targets and equal input temperatures, whose results are NaN and whose flows are left
+    unchanged.
+
+    Args:
+        exchanger_type (type or HeatExchanger): The heat exchanger type or an exchanger of this type whose kernel
+            parameters are used, e.g. the number of passes.
+        flows_1 (FlowBatch): The flows 1 of the exchangers.
+        flows_2 (FlowBatch): The flows 2 of the exchangers.
+        out_temperatures_1 (float or numpy.ndarray, optional): The target output temperatures of flows 1 in K.
+        out_temperatures_2 (float or numpy.ndarray, optional): The target output temperatures of flows 2 in K.
+        tolerance (float): The absolute tolerance of the output temperatures in K.
+        max_iter (int): The maximal number of iterations of the energy balance.
+        **options: Additional keyword arguments of 'required_ntu', e.g. max_ntu.
+
+    Returns:
+        SizingResult: Arrays of the heat transferabilities in W/K, NTU1, P1, R1 and the iterations of the
+            energy balance.
+
+    Raises:
+        NotImplementedError: If not exactly one target is given or the exchanger type has no P kernel.
+    """
+    _check_target(out_temperatures_1, out_temperatures_2)
+    kernel, parameters = _kernel(exchanger_type)
+    n = len(flows_1)
+    if out_temperatures_1 is not None:
+        out_temperatures_1 = np.array(np.broadcast_to(out_temperatures_1, n), dtype=float)
+    if out_temperatures_2 is not None:
+        out_temperatures_2 = np.array(np.broadcast_to(out_temperatures_2, n), dtype=float)
+
+    def heat_capacity_flows(out_1, out_2):
+        flows_1.out_temperatures, flows_2.out_temperatures = out_1, out_2
+        return flows_1.heat_capacity_flow, flows_2.heat_capacity_flow
+
+    in_1, in_2 = flows_1.in_temperatures, flows_2.in_temperatures
+    previous_1, previous_2 = flows_1.out_temperatures.copy(), flows_2.out_temperatures.copy()
+    out_1, out_2, capacity_1, capacity_2, iterations = _energy_balance(
+        heat_capacity_flows, in_1, in_2, out_temperatures_1, out_temperatures_2, tolerance, max_iter)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(in_1 != in_2, (in_1 - out_1) / (in_1 - in_2), np.nan)
+    r = capacity_1 / capacity_2
+    ntu = required_ntu(kernel, p, r, **options, **parameters)
+    unreachable = np.isnan(ntu)
+    flows_1.out_temperatures = np.where(unreachable, previous_1, out_1)
+    flows_2.out_temperatures = np.where(unreachable, previous_2, out_2)
+    return SizingResult(ntu * capacity_1, ntu, p, r, iterations)
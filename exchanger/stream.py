@@ -1,12 +1,75 @@
 import warnings
+import numpy as np
 import pyfluids as fld
 import logging
 
+from . import properties
+
 # Set up logging level
 logging.basicConfig(level=logging.CRITICAL)
 logging.debug(f'{__file__} will get logged')
 
 
+class FluidState:
+    """
+    Represents an immutable state of a fluid, given by its title, pressure and temperature.
+
+    The properties of the state are evaluated once by 'properties.evaluate' and kept with the state, together with
+    the property backend that evaluated them. If they are read with another backend active, they are evaluated again.
+    Because a state can not be modified, it can be shared by any number of Fluid objects, a Fluid that changes its
+    pressure or temperature gets a new state (copy-on-write).
+
+    Args:
+        title (str): The name of the fluid.
+        pressure (float): The pressure in Pascals (Pa).
+        temperature (float): The temperature in Kelvin (K).
+        state (properties.FluidProperties, optional): Already evaluated properties of the state.
+
+    Raises:
+        AttributeError: If an attribute of the state is set.
+    """
+
+    __slots__ = ('title', 'pressure', 'temperature', '_properties', '_backend')
+
+    def __init__(self, title: str, pressure: float, temperature: float, state=None):
+        object.__setattr__(self, 'title', title)
+        object.__setattr__(self, 'pressure', pressure)
+        object.__setattr__(self, 'temperature', temperature)
+        object.__setattr__(self, '_properties', state)
+        object.__setattr__(self, '_backend', None if state is None else properties.get_backend())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FluidState is immutable")
+
+    @property
+    def properties(self):
+        """
+        Get the properties of the state, evaluated on first access and whenever the active backend changed.
+
+        Raises:
+            ValueError: If the state is not supported by the active property backend.
+
+        Returns:
+            properties.FluidProperties: The density, specific heat, enthalpy and phase of the state.
+        """
+        backend = properties.get_backend()
+        if self._properties is None or self._backend is not backend:
+            object.__setattr__(self, '_properties', backend.evaluate(self.title, self.pressure, self.temperature))
+            object.__setattr__(self, '_backend', backend)
+        return self._properties
+
+    def __eq__(self, other):
+        if not isinstance(other, FluidState):
+            return NotImplemented
+        return (self.title, self.pressure, self.temperature) == (other.title, other.pressure, other.temperature)
+
+    def __hash__(self):
+        return hash((self.title, self.pressure, self.temperature))
+
+    def __repr__(self):
+        return f"FluidState(title={self.title}, p={self.pressure} Pa, t={self.temperature} K)"
+
+
 class Fluid:
     """
     Represents a fluid with its thermodynamic properties like pressure and temperature.
@@ -14,12 +77,18 @@ class Fluid:
     This class serves as an interface to the 'pyfluids' library, allowing to model and manage fluid properties.
 
     Args:
-        title (str): The name of the fluid.
+        title (str): The name of the fluid, or the canonical title of a mixture or humid air,
+            see 'properties.mixture_title' and 'properties.humid_air_title'.
         pressure (float, optional): The pressure in Pascals (Pa). Defaults to 101325 Pa.
         temperature (float, optional): The temperature in Kelvin (K). Defaults to 293.15 K.
-        instance (str, optional): The type of fluid instance to create. Defaults to 'Fluid'.
+        instance (str, optional): The type of fluid instance to create: 'Fluid', 'Mixture' or 'HumidAir'.
+            Defaults to 'Fluid', the instance of a mixture or humid air title is used then.
 
         fluid (Fluid): the fluid to be make a deepcopy of
+        fluids (list): the components of a 'Mixture' without title
+        fractions (list): the mass fractions of the components of a 'Mixture' without title
+        humidity (float): the absolute humidity of 'HumidAir' without title in kg water per kg dry air
+        relative_humidity (float): the relative humidity of 'HumidAir' without title at the given state
 
     Attributes:
         fluid_instances (dict): A dictionary mapping instance names to fluid types from pyfluids.
@@ -31,13 +100,21 @@ class Fluid:
     Note:
         - The 'pyfluids' library must be installed to use this class.
         - The 'pyfluids' unit system is initialized in 'pyfluids.json' to the International System of Units (SI).
+        - The properties are evaluated by the active property backend, see 'properties.use_backend'. With the default
+          backend repeated states are answered by the state cache and states inside a registered property table
+          by interpolation. The pyfluids object always holds the full equation of state.
+        - The state is kept as an immutable FluidState, clones share it until one of them is modified.
+          The pyfluids object is only created when it is accessed and is kept in the state of the fluid afterward,
+          see 'fluid'. It is taken from 'properties.fluid_pool' and handed back when the fluid is deleted or the
+          object is replaced, unless it was handed out by the 'fluid' getter.
+        - A new fluid is evaluated once at the given pressure and temperature. Only if this state is not supported,
+          the fluid starts at NTP and the pressure and temperature setters are applied one after another.
     """
 
     fluid_instances = {
         'Fluid': fld.Fluid,
-        # @TODO implement Mixture and Humid Air
-        # 'Mixture': fld.Mixture,
-        # 'HumidAir': fld.HumidAir
+        'Mixture': fld.Mixture,
+        'HumidAir': fld.HumidAir
     }
 
     def __init__(self, title: str = None, pressure: float = 101325, temperature: float = 293.15,
@@ -46,21 +123,41 @@ class Fluid:
         if "fluid" in kwargs:
             fluid = kwargs["fluid"]
             if isinstance(fluid, Fluid):
+                self.__instance = fluid.__instance
                 self.title = fluid.title
-                self.fluid = fluid.fluid.clone()
+                self._state = fluid.state
+                self._fluid = None
+                self._pooled = False
+                self._handed_out = False
             else:
                 raise ValueError("fluid is not a Fluid object")
         else:
 
             self.instance = instance
             if title is None:
-                raise TypeError
+                if instance == 'Mixture' and 'fluids' in kwargs and 'fractions' in kwargs:
+                    title = properties.mixture_title(kwargs['fluids'], kwargs['fractions'])
+                elif instance == 'HumidAir':
+                    title = properties.humid_air_title(kwargs.get('humidity'), kwargs.get('relative_humidity'),
+                                                       pressure, temperature)
+                else:
+                    raise TypeError
+            title_instance, _ = properties.parse_title(title)
+            if instance not in ('Fluid', title_instance):
+                raise NotImplementedError(f"'{title}' is not a {instance} title")
+            self.instance = title_instance
             self.title = title
-            self.fluid = None
+            self._fluid = None
+            self._pooled = False
+            self._handed_out = False
 
-            self.ntp_state()
-            self.pressure = pressure
-            self.temperature = temperature
+            try:
+                # the target state is evaluated once, the pyfluids object is created on first access
+                self._set_state(pressure, temperature)
+            except ValueError:
+                self.ntp_state()
+                self.pressure = pressure
+                self.temperature = temperature
 
     @property
     def instance(self):
@@ -106,9 +203,13 @@ class Fluid:
         This property represents the fluid's properties and behavior and allows for retrieval and modification of the fluid.
 
         Setting the fluid can be done in two ways:
-        1. By providing an existing 'pyfluids.Fluid' object.
+        1. By providing an existing 'pyfluids.Fluid', 'pyfluids.Mixture' or 'pyfluids.HumidAir' object.
         2. By specifying the fluid's title (name), in which case a new fluid object is created based on the title.
 
+        The object is created on first access and kept in the state of the fluid afterward: setting the pressure
+        or temperature updates it, and changes made to it directly, e.g. with 'update', become the new state of
+        the fluid when it is read next.
+
         Args:
             value (pyfluids.Fluid or None, optional): The fluid object to set or None to clear the fluid.
 
@@ -119,81 +220,163 @@ class Fluid:
         Returns:
             pyfluids instance: The current fluid object associated with this instance.
         """
+        if self._fluid is None:
+            self.fluid = None
+        else:
+            self._follow_fluid()
+        # the caller may keep the object, it is never handed back to the pool
+        self._handed_out = True
         return self._fluid
 
     @fluid.setter
     def fluid(self, value=None):
-        if isinstance(value, fld.Fluid):
+        if isinstance(value, tuple(self.fluid_instances.values())):
+            self._release_fluid()
             self._fluid = value
-            logging.debug(f'Creating Fluid by fld object\n id = {id(self)}\n Unit system = {self.fluid.units_system}')
+            self._state = FluidState(self.title, value.pressure, value.temperature)
+            self._synced_state = value.pressure, value.temperature
+            logging.debug(f'Creating Fluid by fld object\n id = {id(self)}\n Unit system = {value.units_system}')
         elif value is not None:
             raise NotImplementedError
         else:
-            try:
-                self._fluid = self.instance(fld.FluidsList[self._title])
-                logging.debug(f'Creating Fluid by title\n id = {id(self)}\n Unit system = {self.fluid.units_system}')
-            except KeyError:
-                raise NotImplementedError("Fluid not implemented. Check spelling")
+            self._release_fluid()
+            self._fluid = properties.fluid_pool.acquire(self._title)
+            self._pooled = True
+            self._handed_out = False
+            self._sync_fluid()
+            logging.debug(f'Creating Fluid by title\n id = {id(self)}\n Unit system = {self._fluid.units_system}')
+
+    def _sync_fluid(self):
+        """
+        Update the pyfluids object to the state of the fluid.
+        """
+        state = self._state
+        properties.update_pyfluids(self._fluid, self.title, state.pressure, state.temperature)
+        self._synced_state = self._fluid.pressure, self._fluid.temperature
+
+    def _follow_fluid(self):
+        """
+        Take over changes made directly to the pyfluids object as the new state of the fluid.
+        """
+        value = self._fluid
+        current = value.pressure, value.temperature
+        if current != self._synced_state:
+            self._state = FluidState(self.title, *current)
+            self._synced_state = current
 
     @property
     def pressure(self):
         """
         Get or set the pressure of the fluid in Pascals (Pa).
 
+        Unsupported pressures keep the previous state and are recorded in 'properties.diagnostics'.
+
         Args:
             value (float): The new pressure to set in Pascals (Pa).
 
-        Raises:
-            ValueError: If the provided pressure value is not valid.
-
         Returns:
             float: The pressure of the fluid in Pascals (Pa).
         """
-        return self.fluid.pressure
+        return self.state.pressure
 
     @pressure.setter
     def pressure(self, value):
-        prev_pressure = self.fluid.pressure
-        temp = self.fluid.temperature
         try:
-            self.fluid.update(fld.Input.pressure(value), fld.Input.temperature(temp))
+            self._set_state(value, self.temperature)
             logging.debug("setting pressure")
-        except AttributeError:
-            logging.debug("pressure not yet defined")
         except ValueError as e:
-            logging.debug(f"resetting pressure to {prev_pressure}\n {e}")
-            self.fluid.update(fld.Input.pressure(prev_pressure), fld.Input.temperature(temp))
-            print(f"pressure not supported, please change pressure\n {e}")
+            logging.debug(f"resetting pressure to {self.pressure}")
+            properties.add_diagnostic(self.title, value, self.temperature, f"pressure not supported: {e}")
 
     @property
     def temperature(self):
         """
         Get or set the temperature of the fluid in Kelvin (K).
 
+        Unsupported temperatures keep the previous state and are recorded in 'properties.diagnostics'.
+
         Args:
             value (float): The new temperature to set in Kelvin (K).
 
-        Raises:
-            ValueError: If the provided temperature value is not valid.
-
         Returns:
             float: The temperature of the fluid in Kelvin.
         """
-        return self.fluid.temperature
+        return self.state.temperature
 
     @temperature.setter
     def temperature(self, value):
-        pressure = self.fluid.pressure
-        prev_temp = self.fluid.temperature
         try:
-            self.fluid.update(fld.Input.pressure(pressure), fld.Input.temperature(value))
+            self._set_state(self.pressure, value)
             logging.debug("setting temperature")
-        except AttributeError:
-            logging.debug("temperature not yet defined")
         except ValueError as e:
-            logging.debug(f"resetting temperature to {prev_temp}\n {e}")
-            self.fluid.update(fld.Input.pressure(pressure), fld.Input.temperature(prev_temp))
-            print(f"Temperature not supported, please change temperature\n {e}")
+            logging.debug(f"resetting temperature to {self.temperature}")
+            properties.add_diagnostic(self.title, self.pressure, value, f"temperature not supported: {e}")
+
+    def _set_state(self, pressure, temperature, state=None):
+        """
+        Set the state of the fluid by pressure and temperature.
+
+        The properties of the state are taken from 'properties.evaluate', so repeated states are answered by the
+        state cache or a registered property table. The pyfluids object is updated if it was created.
+
+        Args:
+            state (properties.FluidProperties, optional): Already evaluated properties of the state.
+
+        Raises:
+            ValueError: If the state is not supported by pyfluids, the previous state is kept.
+        """
+        if state is None:
+            state = properties.evaluate(self.title, pressure, temperature)
+        self._state = FluidState(self.title, pressure, temperature, state)
+        if self._fluid is not None:
+            self._sync_fluid()
+
+    def properties_batch(self, temperatures, pressures=None):
+        """
+        Get the properties of many states of this fluid in one call, without creating a Fluid per state.
+
+        Args:
+            temperatures (float or numpy.ndarray): The temperatures in Kelvin (K).
+            pressures (float or numpy.ndarray, optional): The pressures in Pascals (Pa).
+                Defaults to the pressure of the fluid.
+
+        Returns:
+            properties.FluidProperties: Arrays of density, specific heat, enthalpy and phase
+            with the shape of the broadcast inputs. Unsupported states are NaN.
+        """
+        if pressures is None:
+            pressures = self.pressure
+        return properties.evaluate_batch(self.title, pressures, temperatures)
+
+    @staticmethod
+    def set_temperatures(fluids: list, temperatures, workers: int = None):
+        """
+        Set the temperatures of many fluids with one batch evaluation per fluid title.
+
+        Unsupported temperatures are handled like by the temperature setter, the previous state is kept.
+
+        Args:
+            fluids (list): The fluids to update.
+            temperatures (numpy.ndarray): The new temperatures in Kelvin (K), one per fluid.
+            workers (int, optional): If given, large batches are evaluated by up to this number of threads,
+                see 'properties.evaluate_parallel'.
+        """
+        groups = {}
+        for fluid, temperature in zip(fluids, temperatures):
+            groups.setdefault(fluid.title, []).append((fluid, temperature))
+        for title, group in groups.items():
+            pressures = [fluid.pressure for fluid, _ in group]
+            temps = [temperature for _, temperature in group]
+            if workers is None:
+                states = properties.evaluate_batch(title, pressures, temps)
+            else:
+                states = properties.evaluate_parallel(title, pressures, temps, workers)
+            for i, (fluid, temperature) in enumerate(group):
+                if np.isnan(states.density[i]):
+                    fluid.temperature = temperature
+                else:
+                    fluid._set_state(fluid.pressure, temperature,
+                                     properties.FluidProperties(*(value[i] for value in states)))
 
     def ntp_state(self):
         """
@@ -202,7 +385,35 @@ class Fluid:
         This method updates the fluid's pressure to 101325 Pascals (Pa) and temperature to 293.15 Kelvin (K),
         which are the standard conditions for many fluid properties.
         """
-        self.fluid.update(fld.Input.pressure(101325), fld.Input.temperature(293.15))
+        self._set_state(101325, 293.15)
+
+    @property
+    def state(self):
+        """
+        Get the immutable state of the fluid.
+
+        Returns:
+            FluidState: The current state, shared with clones until one of them is modified.
+        """
+        if self._fluid is not None:
+            self._follow_fluid()
+        return self._state
+
+    @property
+    def envelope(self):
+        """
+        Get the validity envelope of the fluid, states outside are rejected without evaluation.
+
+        Returns:
+            properties.ValidityEnvelope: The precomputed envelope, shared by all fluids with this title.
+        """
+        return properties.get_envelope(self.title)
+
+    def _property(self, name: str):
+        """
+        Get a property of the current state from the property layer.
+        """
+        return getattr(self.state.properties, name)
 
     @property
     def specific_heat(self):
@@ -212,7 +423,7 @@ class Fluid:
         Returns:
             float: The mass specific heat of the fluid in J/kg/K.
         """
-        return self.fluid.specific_heat
+        return self._property('specific_heat')
 
     @property
     def density(self):
@@ -222,18 +433,60 @@ class Fluid:
         Returns:
             float: The mass density of the fluid in kg/m3.
         """
-        return self.fluid.density
+        return self._property('density')
+
+    @property
+    def enthalpy(self):
+        """
+        Mass specific enthalpy [J/kg].
+
+        Returns:
+            float: The mass specific enthalpy of the fluid in J/kg.
+        """
+        return self._property('enthalpy')
+
+    @property
+    def phase(self):
+        """
+        Phase state.
+
+        Returns:
+            pyfluids.Phases: The phase of the fluid.
+        """
+        return self._property('phase')
 
     def clone(self):
         """
         Create a new fluid object with the same properties as the current fluid instance.
 
+        The state is shared with the new fluid until one of them is modified, no pyfluids object is copied.
+
         Returns:
             Fluid: A new fluid object with identical properties.
         """
         new_fluid = Fluid(fluid=self)
         return new_fluid
 
+    def _release_fluid(self):
+        """
+        Hand a pyfluids object acquired from 'properties.fluid_pool' back to the pool.
+
+        An object handed out by the 'fluid' getter is not released, the caller may still keep it and the pool
+        would hand it out to another fluid.
+        """
+        if getattr(self, '_pooled', False):
+            self._pooled = False
+            if not self._handed_out:
+                properties.fluid_pool.release(self._title, self._fluid)
+            self._fluid = None
+
+    def __del__(self):
+        try:
+            self._release_fluid()
+        except (AttributeError, TypeError):
+            # the modules may already be torn down at interpreter shutdown
+            pass
+
     def __repr__(self):
         output = f"Fluid: title = {self.title}, id = {id(self)}\n"
         output += f"\tp = {self.pressure} Pa\n" \
@@ -290,6 +543,7 @@ class Flow:
             NotImplementedError: If both mass_flow and volume_flow are provided.
 
         """
+        self._mean_state = None, None
         if "flow" in kwargs:
             flow = kwargs["flow"]
             if isinstance(flow, Flow):
@@ -354,15 +608,48 @@ class Flow:
         """
         Calculate and return the mean fluid based on the average temperature and pressure between input and output fluids.
 
+        The mean fluid is cached and only recalculated if the title, temperature or pressure of the input or output
+        fluid changes, so it must not be modified.
+
         Returns:
             Fluid: The mean fluid with averaged temperature and pressure.
 
         """
-        mean_temp = sum([self.in_fluid.temperature, self.out_fluid.temperature]) / 2
-        mean_pressure = sum([self.in_fluid.pressure, self.out_fluid.pressure]) / 2
-        fluid = Fluid(str(self.in_fluid.title), pressure=mean_pressure, temperature=mean_temp)
+        in_fluid, out_fluid = self.in_fluid, self.out_fluid
+        key = in_fluid.title, in_fluid.pressure, in_fluid.temperature, out_fluid.pressure, out_fluid.temperature
+        cached_key, fluid = self._mean_state
+        if key != cached_key:
+            if in_fluid.state == out_fluid.state:
+                fluid = in_fluid.clone()
+            else:
+                mean_temp = sum([in_fluid.temperature, out_fluid.temperature]) / 2
+                mean_pressure = sum([in_fluid.pressure, out_fluid.pressure]) / 2
+                fluid = Fluid(str(in_fluid.title), pressure=mean_pressure, temperature=mean_temp)
+            self._mean_state = key, fluid
         return fluid
 
+    @property
+    def mean_density(self):
+        """
+        Get the mass density of the mean fluid [kg/m3].
+
+        Returns:
+            float: The mass density of the mean fluid in kg/m3.
+
+        """
+        return self.mean_fluid.density
+
+    @property
+    def mean_specific_heat(self):
+        """
+        Get the mass specific heat of the mean fluid [J/kg/K].
+
+        Returns:
+            float: The mass specific heat of the mean fluid in J/kg/K.
+
+        """
+        return self.mean_fluid.specific_heat
+
     @property
     def volume_flow(self):
         """
@@ -432,7 +719,7 @@ class Flow:
             bool: True if a phase change occurs, False otherwise.
 
         """
-        return self.in_fluid.fluid.phase != self.out_fluid.fluid.phase
+        return self.in_fluid.phase != self.out_fluid.phase
 
     @property
     def mass_flow(self):
@@ -446,12 +733,12 @@ class Flow:
             float: The mass flow rate in kg/s.
 
         """
-        value = self.volume_flow * self.mean_fluid.density
+        value = self.volume_flow * self.mean_density
         return value
 
     @mass_flow.setter
     def mass_flow(self, value):
-        self._volume_flow = value / self.mean_fluid.density
+        self._volume_flow = value / self.mean_density
 
     def mass_flow_str(self):
         """
@@ -465,7 +752,7 @@ class Flow:
 
     @property
     def heat_capacity_flow(self):
-        return self.mass_flow * self.mean_fluid.specific_heat
+        return self.mass_flow * self.mean_specific_heat
 
     def heat_capacity_flow_str(self):
         """
@@ -481,7 +768,7 @@ class Flow:
     def heat_flux(self):
         if self.phase_change:
             warnings.warn("the phase changes, this could lead to some problems")
-        heat_flux_enthalpy = self.mass_flow * (self.in_fluid.fluid.enthalpy - self.out_fluid.fluid.enthalpy)
+        heat_flux_enthalpy = self.mass_flow * (self.in_fluid.enthalpy - self.out_fluid.enthalpy)
         # heat_flux_temps = self.heat_capacity_flow * (self.in_fluid.temperature - self.out_fluid.temperature)
         return heat_flux_enthalpy
 
@@ -540,3 +827,189 @@ class Flow:
         output += f"Input Fluid:\n\t{self.in_fluid}\n"
         output += f"Output Fluid:\n\t{self.out_fluid}\n"
         return output
+
+
+class FlowBatch:
+    """
+    Represents many fluid flows as a struct of arrays.
+
+    Instead of one Flow object with two Fluid objects per flow, the titles are stored once and referenced by integer
+    ids, and the states and volume flows are stored in contiguous numpy arrays. The properties of all flows are
+    evaluated with one batch evaluation per fluid title, so network code can work on whole columns.
+
+    Args:
+        titles (list): The fluid title of every flow.
+        in_temperatures (numpy.ndarray): The input temperatures in Kelvin (K).
+        in_pressures (float or numpy.ndarray, optional): The input pressures in Pascals (Pa). Defaults to 101325 Pa.
+        out_temperatures (numpy.ndarray, optional): The output temperatures in Kelvin (K). Defaults to the input ones.
+        out_pressures (numpy.ndarray, optional): The output pressures in Pascals (Pa). Defaults to the input ones.
+        mass_flows (numpy.ndarray, optional): The mass flow rates in kg/s.
+        volume_flows (numpy.ndarray, optional): The volume flow rates in m^3/s.
+
+    Attributes:
+        titles (list): The distinct fluid titles.
+        title_ids (numpy.ndarray): The index into titles of every flow.
+        in_temperatures, in_pressures, out_temperatures, out_pressures (numpy.ndarray): The states of the flows.
+        volume_flows (numpy.ndarray): The volume flow rates in m^3/s.
+        mass_flow (numpy.ndarray): The mass flow rates in kg/s.
+        heat_capacity_flow (numpy.ndarray): The heat capacity flow rates in W/K.
+        heat_flux (numpy.ndarray): The heat flow rates in W.
+
+    Methods:
+        from_flows: Create a batch from a list of Flow objects.
+        to_flows: Create a list of Flow objects from the batch.
+
+    Raises:
+        NotImplementedError: If both or none of mass_flows and volume_flows are provided.
+    """
+
+    def __init__(self, titles: list, in_temperatures, in_pressures=101325, out_temperatures=None,
+                 out_pressures=None, mass_flows=None, volume_flows=None):
+        self.titles = list(dict.fromkeys(titles))
+        self.title_ids = np.array([self.titles.index(title) for title in titles], dtype=np.intp)
+        n = len(self.title_ids)
+        self.in_temperatures = np.array(np.broadcast_to(in_temperatures, n), dtype=float)
+        self.in_pressures = np.array(np.broadcast_to(in_pressures, n), dtype=float)
+        if out_temperatures is None:
+            out_temperatures = self.in_temperatures
+        self.out_temperatures = np.array(np.broadcast_to(out_temperatures, n), dtype=float)
+        if out_pressures is None:
+            out_pressures = self.in_pressures
+        self.out_pressures = np.array(np.broadcast_to(out_pressures, n), dtype=float)
+
+        if (mass_flows is None) == (volume_flows is None):
+            raise NotImplementedError("Only implement one flow rate")
+        elif volume_flows is not None:
+            self.volume_flows = np.array(np.broadcast_to(volume_flows, n), dtype=float)
+        else:
+            self.volume_flows = np.broadcast_to(mass_flows, n) / self.mean_state.density
+
+    @classmethod
+    def from_flows(cls, flows: list):
+        """
+        Create a batch from a list of Flow objects.
+
+        Args:
+            flows (list): The flows to store.
+
+        Returns:
+            FlowBatch: The batch with the states and volume flows of the flows.
+        """
+        return cls([flow.in_fluid.title for flow in flows],
+                   [flow.in_fluid.temperature for flow in flows],
+                   [flow.in_fluid.pressure for flow in flows],
+                   [flow.out_fluid.temperature for flow in flows],
+                   [flow.out_fluid.pressure for flow in flows],
+                   volume_flows=[flow.volume_flow for flow in flows])
+
+    def to_flows(self):
+        """
+        Create a list of Flow objects from the batch.
+
+        Returns:
+            list: A Flow object per stored flow.
+        """
+        flows = []
+        for i, title_id in enumerate(self.title_ids):
+            title = self.titles[title_id]
+            in_fluid = Fluid(title, float(self.in_pressures[i]), float(self.in_temperatures[i]))
+            flow = Flow(in_fluid, volume_flow=float(self.volume_flows[i]))
+            flow.out_fluid = Fluid(title, float(self.out_pressures[i]), float(self.out_temperatures[i]))
+            flows.append(flow)
+        return flows
+
+    def __len__(self):
+        return len(self.title_ids)
+
+    def _evaluate(self, pressures, temperatures):
+        """
+        Evaluate the properties of one state per flow with one batch evaluation per fluid title.
+        """
+        n = len(self)
+        values = [np.empty(n), np.empty(n), np.empty(n), np.empty(n, dtype=object)]
+        for title_id, title in enumerate(self.titles):
+            mask = self.title_ids == title_id
+            states = properties.evaluate_batch(title, pressures[mask], temperatures[mask])
+            for value, state in zip(values, states):
+                value[mask] = state
+        return properties.FluidProperties(*values)
+
+    @property
+    def in_state(self):
+        """
+        Get the properties of the input states.
+
+        Returns:
+            properties.FluidProperties: Arrays of density, specific heat, enthalpy and phase.
+        """
+        return self._evaluate(self.in_pressures, self.in_temperatures)
+
+    @property
+    def out_state(self):
+        """
+        Get the properties of the output states.
+
+        Returns:
+            properties.FluidProperties: Arrays of density, specific heat, enthalpy and phase.
+        """
+        return self._evaluate(self.out_pressures, self.out_temperatures)
+
+    @property
+    def mean_state(self):
+        """
+        Get the properties of the mean states with averaged temperature and pressure between input and output.
+
+        Returns:
+            properties.FluidProperties: Arrays of density, specific heat, enthalpy and phase.
+        """
+        return self._evaluate((self.in_pressures + self.out_pressures) / 2,
+                              (self.in_temperatures + self.out_temperatures) / 2)
+
+    @property
+    def mass_flow(self):
+        """
+        Calculate the mass flow rates based on the volume flow rates and the mean densities.
+
+        Returns:
+            numpy.ndarray: The mass flow rates in kg/s.
+        """
+        return self.volume_flows * self.mean_state.density
+
+    @property
+    def heat_capacity_flow(self):
+        """
+        Calculate the heat capacity flow rates based on the mean states.
+
+        Returns:
+            numpy.ndarray: The heat capacity flow rates in W/K.
+        """
+        mean_state = self.mean_state
+        return self.volume_flows * mean_state.density * mean_state.specific_heat
+
+    @property
+    def phase_change(self):
+        """
+        Check if a phase change occurs between input and output state.
+
+        Returns:
+            numpy.ndarray: True for every flow with a phase change.
+        """
+        return self.in_state.phase != self.out_state.phase
+
+    @property
+    def heat_flux(self):
+        """
+        Calculate the heat flow rates based on the enthalpy difference between input and output states.
+
+        Returns:
+            numpy.ndarray: The heat flow rates in W.
+        """
+        in_state, out_state = self.in_state, self.out_state
+        if np.any(in_state.phase != out_state.phase):
+            warnings.warn("the phase changes, this could lead to some problems")
+        return self.mass_flow * (in_state.enthalpy - out_state.enthalpy)
+
+    def __repr__(self):
+        output = f"FlowBatch: id = {id(self)}\n"
+        output += f"\tflows: n={len(self)}, titles: {', '.join(self.titles)}\n"
+        return output
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+
+from exchanger import accelerated, kernels
+from exchanger.network import ExchangerNetwork, network_outputs
+
+
+def random_networks(rng, networks, cells, inputs=3, outputs=2):
+    # rows of the structure matrix sum up to 0.9 at most, so every network is solvable
+    structure = rng.uniform(size=(2 * cells, 2 * cells)) * (rng.uniform(size=(2 * cells, 2 * cells)) < 0.3)
+    structure *= 0.9 / np.maximum(structure.sum(axis=1, keepdims=True), 1)
+    inp = np.eye(2 * cells, inputs)[rng.permutation(2 * cells)]
+    out = np.eye(outputs, 2 * cells)[:, rng.permutation(2 * cells)]
+    p1 = rng.uniform(size=(networks, cells))
+    p2 = rng.uniform(size=(networks, cells))
+    temperatures = rng.uniform(size=(networks, inputs))
+    return p1, p2, structure, inp, out, temperatures
+
+
+class TestKernels(unittest.TestCase):
+    def tearDown(self):
+        accelerated.enabled = True
+
+    @unittest.skipUnless(accelerated.available, "numba is not available")
+    def test_equivalence(self):
+        rng = np.random.default_rng(2)
+        ntu = np.concatenate([np.exp(rng.uniform(np.log(1e-8), np.log(500), 5000)), [0, 1e-300, 1e3, 1e10, 1, 1]])
+        r = np.concatenate([np.exp(rng.uniform(np.log(1e-8), np.log(500), 5000)), [0.5, 1, 2, 0, 1, 2]])
+        for kernel in accelerated.compiled_kernels:
+            with self.subTest(kernel=kernel.__name__):
+                # the compiled kernels execute the same operations, exp and log of libm differ only in rounding
+                np.testing.assert_allclose(accelerated.evaluate(kernel, ntu, r), kernel(ntu, r),
+                                           rtol=1e-13, atol=1e-15)
+                value = accelerated.evaluate(kernel, 1.5, 0.7)
+                self.assertEqual(np.ndim(value), 0)
+                self.assertAlmostEqual(value, kernel(1.5, 0.7), 15)
+                self.assertEqual(accelerated.evaluate(kernel, ntu[:, None], r[:5]).shape, (ntu.size, 5))
+
+    def test_fallback(self):
+        ntu, r = np.array([0.1, 1, 10]), np.array([0.5, 1, 2])
+        self.assertEqual(list(accelerated.evaluate(kernels.cross_flow_unmixed, ntu, r, tolerance=1e-8)),
+                         list(kernels.cross_flow_unmixed(ntu, r, tolerance=1e-8)))
+        accelerated.enabled = False
+        self.assertEqual(list(accelerated.evaluate(kernels.tema_h_one_two, ntu, r)),
+                         list(kernels.tema_h_one_two(ntu, r)))
+
+
+class TestNetworkOutputs(unittest.TestCase):
+    def tearDown(self):
+        accelerated.enabled = True
+
+    def test_networks(self):
+        rng = np.random.default_rng(3)
+        for cells in (2, 5, 10):
+            p1, p2, structure, inp, out, temperatures = random_networks(rng, 50, cells)
+            accelerated.enabled = False
+            values = network_outputs(p1, p2, structure, inp, out, temperatures)
+            self.assertEqual(values.shape, (50, 2))
+
+            network = ExchangerNetwork()
+            network.structure_matrix, network.input_matrix, network.output_matrix = structure, inp, out
+            for m in (0, 49):
+                network.phi_matrix = np.block([[np.diag(1 - p1[m]), np.diag(p1[m])],
+                                               [np.diag(p2[m]), np.diag(1 - p2[m])]])
+                np.testing.assert_allclose(values[m], network.network_characteristics @ temperatures[m], rtol=1e-12)
+            # the input temperatures of the network are used for all P values by default
+            network.input_temps = temperatures[49][:, None]
+            np.testing.assert_allclose(network.batch_outputs(p1, p2)[49], values[49], rtol=1e-12)
+
+    @unittest.skipUnless(accelerated.available, "numba is not available")
+    def test_equivalence(self):
+        rng = np.random.default_rng(4)
+        for cells in (2, 5, 10):
+            p1, p2, structure, inp, out, temperatures = random_networks(rng, 200, cells)
+            accelerated.enabled = False
+            values = network_outputs(p1, p2, structure, inp, out, temperatures)
+            accelerated.enabled = True
+            np.testing.assert_allclose(network_outputs(p1, p2, structure, inp, out, temperatures), values,
+                                       rtol=1e-12, atol=1e-14)
+            # integer matrices, transposed P values and shared input temperatures are converted
+            accelerated.enabled = False
+            values = network_outputs(p1, p2, structure, inp.astype(int), out, temperatures[0])
+            accelerated.enabled = True
+            np.testing.assert_allclose(network_outputs(p1.T.copy().T, p2, structure, inp.astype(int), out,
+                                                       temperatures[0]), values, rtol=1e-12, atol=1e-14)
+
+
+if __name__ == '__main__':
+    unittest.main()
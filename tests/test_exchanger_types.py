@@ -9,6 +9,7 @@ from exchanger.exchanger_types import *
 from exchanger.stream import Fluid, Flow
 from exchanger.parts import *
 import exchanger.network as exnet
+from exchanger.properties import ConstantPropertyBackend, PyfluidsBackend, get_backend, default_backend
 
 
 def init_extype():
@@ -218,6 +219,24 @@ class ExchangerTypesTest(unittest.TestCase):
         phi = ex.phi_matrix
         np.testing.assert_array_almost_equal(phi, phi_check, decimal=2)
 
+    def test_output_jacobian(self):
+        ex = init_extype()
+        _, jacobian = ex.output_jacobian()
+        self.assertEqual(jacobian.heat_transferability.shape, (2, 4))
+        capacity = np.array([cell.flow_1.heat_capacity_flow for cell in ex.exchangers])
+        np.testing.assert_allclose(jacobian.ntu, jacobian.heat_transferability * capacity)
+        # central differences of the output temperatures, the fluid properties are not adjusted
+        for i, cell in enumerate(ex.exchangers):
+            transferability = cell.heat_transferability
+            h = 1e-3 * transferability
+            outputs = []
+            for step in (h, -h):
+                cell.heat_transferability = transferability + step
+                outputs.append(ex.temperature_outputs[1].ravel())
+            cell.heat_transferability = transferability
+            np.testing.assert_allclose(jacobian.heat_transferability[:, i], (outputs[0] - outputs[1]) / (2 * h),
+                                       rtol=1e-5)
+
     def test_temp_adjust(self):
         ex = init_extype()
         temp_check = np.array([[61.8],
@@ -227,6 +246,19 @@ class ExchangerTypesTest(unittest.TestCase):
         self.assertAlmostEqual(ex.out_flow_1.mean_fluid.temperature, 61.8 + 273.15, delta=1)
         self.assertAlmostEqual(ex.out_flow_2.mean_fluid.temperature, 58.1 + 273.15, delta=1)
 
+    def test_backend(self):
+        screening = init_extype()
+        screening.backend = ConstantPropertyBackend(reference_temperature=333.15)
+        exact = init_extype()
+        exact.backend = PyfluidsBackend()
+        screening._adjust_temperatures(5)
+        exact._adjust_temperatures(5)
+        self.assertIs(get_backend(), default_backend)
+        np.testing.assert_allclose(screening.temperature_outputs[1], exact.temperature_outputs[1], atol=1)
+        self.assertIsNone(ExchangerEqualCells().backend)
+        with self.assertRaises(NotImplementedError):
+            exact.backend = 'pyfluids'
+
     def test_temp_adjustment_progress(self):
         ex = init_extype()
         ex._adjust_temperatures(5)
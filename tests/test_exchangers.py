@@ -1,4 +1,7 @@
 import unittest
+import warnings
+
+import numpy as np
 
 from exchanger.stream import *
 from exchanger.parts import *
@@ -48,5 +51,63 @@ class ExchangerTests(unittest.TestCase):
         self.assertAlmostEqual(ex.p[0], 0.87, 2)
 
 
+class SlowExchanger(ParallelFlow):
+    """P depends strongly on the output temperature, the plain iteration contracts by 0.9 per step."""
+
+    @property
+    def p(self):
+        temp_1_in = self.flow_1.in_fluid.temperature
+        temp_2_in = self.flow_2.in_fluid.temperature
+        p1 = 0.05 + 0.9 * (temp_1_in - self.flow_1.out_temperature) / (temp_1_in - temp_2_in)
+        return p1, self.r[0] * p1
+
+
+class ConvergenceTests(unittest.TestCase):
+    @staticmethod
+    def exchanger(ex_class=CounterCurrentFlow):
+        flow_1 = Flow(Fluid("Water", temperature=273.15 + 90), 0.33)
+        flow_2 = Flow(Fluid("Air"), 1)
+        return ex_class(flow_1, flow_2, Part(2000))
+
+    def test_converged(self):
+        reference = self.exchanger()._calc_output(30)
+        for acceleration in HeatExchanger.accelerations:
+            report = self.exchanger()._calc_output(acceleration=acceleration)
+            self.assertTrue(report.converged)
+            self.assertLess(report.iterations, 10)
+            self.assertLessEqual(report.residual, 1e-6)
+            np.testing.assert_allclose(report.temperatures, reference.temperatures, atol=1e-5)
+
+    def test_fixed_iterations(self):
+        ex = self.exchanger()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            report = ex._calc_output(2)
+        self.assertEqual(report.iterations, 2)
+        self.assertFalse(report.converged)
+        self.assertEqual(report.temperatures, (ex.flow_1.out_temperature, ex.flow_2.out_temperature))
+
+    def test_acceleration(self):
+        iterations = {}
+        for acceleration in HeatExchanger.accelerations:
+            ex = self.exchanger(SlowExchanger)
+            report = ex._calc_output(max_iter=500, acceleration=acceleration)
+            self.assertTrue(report.converged)
+            self.assertAlmostEqual(ex.p[0], 0.5, 5)
+            iterations[acceleration] = report.iterations
+        self.assertGreater(iterations['none'], 100)
+        self.assertLess(iterations['aitken'], 10)
+        self.assertLess(iterations['secant'], 10)
+
+    def test_not_converged(self):
+        ex = self.exchanger(SlowExchanger)
+        with self.assertWarns(UserWarning):
+            report = ex._calc_output(max_iter=3, acceleration='none')
+        self.assertFalse(report.converged)
+        self.assertEqual(report.iterations, 3)
+        with self.assertRaises(NotImplementedError):
+            ex._calc_output(acceleration='newton')
+
+
 if __name__ == '__main__':
     unittest.main()
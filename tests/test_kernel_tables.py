@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from exchanger import kernels
+from exchanger.kernel_tables import KernelTable, tabulate, get_table, remove_table, evaluate, table_name
+from exchanger.stream import Fluid, Flow
+from exchanger.parts import Part
+from exchanger.exchanger import CrossFlowUnmixed, CrossCounterFlow, MultiShell, TemaH12, p_values
+
+
+class TestKernelTable(unittest.TestCase):
+    def test_accuracy(self):
+        rng = np.random.default_rng(1)
+        ntu, r = np.exp(rng.uniform(np.log(1e-3), np.log(20), 2000)), np.exp(rng.uniform(np.log(1e-2), np.log(1e2), 2000))
+        for kernel, parameters in ((kernels.counter_current_flow, {}), (kernels.cross_flow_unmixed, {}),
+                                   (kernels.cross_counter_flow, {'passes': 3})):
+            table = KernelTable.from_kernel(kernel, tolerance=1e-6, **parameters)
+            self.assertLessEqual(table.error_bound, 1e-6)
+            np.testing.assert_allclose(table.evaluate(ntu, r), kernel(ntu, r, **parameters), atol=1e-6)
+        # the steep change at R = 1 needs a finer grid in R direction only
+        table = KernelTable.from_kernel(kernels.counter_current_flow, tolerance=1e-6)
+        self.assertGreater(table.shape[1], table.shape[0])
+        with self.assertWarns(UserWarning):
+            KernelTable.from_kernel(kernels.counter_current_flow, tolerance=1e-12, max_nodes=65)
+
+    def test_outside(self):
+        table = KernelTable.from_kernel(kernels.tema_h_one_two, (0.1, 5), (0.2, 3), 1e-5)
+        ntu, r = np.array([0, 0.05, 1, 10, 1]), np.array([0.5, 0.5, 1, 1, 4])
+        self.assertEqual(list(table.contains(ntu, r)), [False, False, True, False, False])
+        value = table.evaluate(ntu, r)
+        exact = kernels.tema_h_one_two(ntu, r)
+        self.assertEqual(list(value[[0, 1, 3, 4]]), list(exact[[0, 1, 3, 4]]))
+        self.assertAlmostEqual(value[2], exact[2], 5)
+        self.assertEqual(np.ndim(table.evaluate(1, 1)), 0)
+        self.assertEqual(table.evaluate(ntu[:, None], r).shape, (5, 5))
+        with self.assertRaises(ValueError):
+            KernelTable.from_kernel(kernels.tema_h_one_two, (0, 5))
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            table = KernelTable.from_kernel(kernels.multi_shell, tolerance=1e-5, kernel=kernels.tema_e_one_two,
+                                            shells=2, arrangement='split_1')
+            path = table.save(directory)
+            self.assertEqual(os.path.basename(path), 'multi_shell-arrangement=split_1-kernel=tema_e_one_two-shells=2.npy')
+            loaded = KernelTable.load(path)
+            self.assertEqual(loaded.parameters, table.parameters)
+            self.assertEqual(loaded.evaluate(2.3, 0.7), table.evaluate(2.3, 0.7))
+
+            header_path = os.path.splitext(path)[0] + '.json'
+            with open(header_path) as file:
+                header = json.load(file)
+            header['parameters']['shells'] = 3
+            with open(header_path, 'w') as file:
+                json.dump(header, file)
+            with self.assertRaisesRegex(ValueError, 'stale'):
+                KernelTable.load(path)
+
+            table.save(directory)
+            with open(path, 'r+b') as file:
+                file.seek(-8, os.SEEK_END)
+                file.write(b'\x00' * 8)
+            with self.assertRaisesRegex(ValueError, 'hash'):
+                KernelTable.load(path)
+
+
+class TestRegistry(unittest.TestCase):
+    def tearDown(self):
+        remove_table()
+
+    def test_tabulate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            table = tabulate(kernels.cross_counter_flow, tolerance=1e-5, directory=directory, passes=3)
+            self.assertIs(get_table(kernels.cross_counter_flow, passes=3), table)
+            self.assertIsNone(get_table(kernels.cross_counter_flow, passes=2))
+            path = os.path.join(directory, f"{table_name(kernels.cross_counter_flow, passes=3)}.npy")
+            modified = os.path.getmtime(path)
+            # the cached file is loaded, a stricter tolerance creates a new table
+            cached = tabulate(kernels.cross_counter_flow, tolerance=1e-5, directory=directory, passes=3)
+            self.assertEqual(os.path.getmtime(path), modified)
+            self.assertEqual(cached.shape, table.shape)
+            finer = tabulate(kernels.cross_counter_flow, tolerance=1e-7, directory=directory, passes=3)
+            self.assertLessEqual(finer.error_bound, 1e-7)
+            self.assertEqual(KernelTable.load(path).shape, finer.shape)
+
+    def test_exchangers(self):
+        flow_1 = Flow(Fluid("Water", temperature=273.15 + 15), 0.33)
+        flow_2 = Flow(Fluid("Air"), 1)
+        part = Part(560)
+        exchangers = [CrossFlowUnmixed(flow_1, flow_2, part), CrossCounterFlow(flow_1, flow_2, part, passes=3),
+                      MultiShell(flow_1, flow_2, part, TemaH12, 2, 'split_2')]
+        exact = p_values(exchangers)
+        tabulate(kernels.cross_flow_unmixed, tolerance=1e-7)
+        tabulate(kernels.multi_shell, tolerance=1e-7, kernel=kernels.tema_h_one_two, shells=2, arrangement='split_2')
+        values = p_values(exchangers)
+        np.testing.assert_allclose(values, exact, atol=1e-6)
+        self.assertNotEqual(values[0, 0], exact[0, 0])
+        self.assertEqual(values[0, 1], exact[0, 1])
+        self.assertNotEqual(values[0, 2], exact[0, 2])
+        self.assertEqual(exchangers[2].p[0], values[0, 2])
+
+        remove_table(kernels.cross_flow_unmixed)
+        self.assertEqual(evaluate(kernels.cross_flow_unmixed, 1., 0.5), kernels.cross_flow_unmixed(1., 0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,473 @@
+import unittest
+import warnings
+from decimal import Decimal, localcontext
+
+import numpy as np
+from scipy import special
+from scipy.linalg import expm
+
+from exchanger.kernels import parallel_flow, counter_current_flow, cross_flow_one_row, \
+    one_outer_three_inner_two_counter_flow, cross_flow_unmixed, cross_counter_flow, tema_e_one_two, tema_j_one_two, \
+    tema_g_one_two, tema_h_one_two, _split_flow, multi_shell, p_derivatives, derivative_kernels, \
+    cross_flow_unmixed_derivatives
+from exchanger.stream import Fluid, Flow
+from exchanger.parts import Part
+from exchanger.exchanger import HeatExchanger, ParallelFlow, CounterCurrentFlow, CrossFlowOneRow, \
+    OneOuterThreeInnerTwoCounterFlow, CrossFlowUnmixed, CrossCounterFlow, TemaE12, TemaJ12, TemaG12, TemaH12, \
+    MultiShell, p_values, p_derivative_values
+
+kernels = (parallel_flow, counter_current_flow, cross_flow_one_row, one_outer_three_inner_two_counter_flow,
+           cross_flow_unmixed, cross_counter_flow, tema_e_one_two, tema_j_one_two, tema_g_one_two, tema_h_one_two)
+
+
+def cross_flow_grid(ntu, r, n):
+    """Crossflow of two unmixed flows discretized in n x n parallel flow cells, swept along the anti-diagonals."""
+    t1 = np.ones((n, n + 1))  # flow 1 in row i before column j
+    t2 = np.zeros((n + 1, n))  # flow 2 in column j before row i
+    p = parallel_flow(ntu / n, r)
+    for d in range(2 * n - 1):
+        i = np.arange(max(0, d - n + 1), min(d, n - 1) + 1)
+        j = d - i
+        difference = t1[i, j] - t2[i, j]
+        t1[i, j + 1] = t1[i, j] - p * difference
+        t2[i + 1, j] = t2[i, j] + r * p * difference
+    return 1 - t1[:, -1].mean()
+
+
+def counter_current_reference(ntu, r):
+    """The counter current flow formula in 80 digit decimal arithmetic."""
+    with localcontext() as context:
+        context.prec = 80
+        ntu, r = Decimal(ntu), Decimal(r)
+        e = (ntu * (r - 1)).exp()
+        return float((1 - e) / (1 - r * e))
+
+
+def split_flow_shell(ntu, r, units):
+    """
+    TEMA G (one unit) or H (two units) shells with two tube passes from the differential equations along the shell.
+
+    The shell has 2 units sections between the shell inlets in the unit middles and the turns at the unit ends. Each
+    section holds the states (tube pass 1, tube pass 2, shell inlet half, shell return half), related at both ends by
+    matrix exponentials. The boundary and coupling conditions form a linear system for the states at the section
+    starts. Tube pass 1 enters at x = 0 beside the shell return halves and turns into pass 2 at x = 1.
+    """
+    sections = 2 * units
+    tube, shell = ntu * r / 2, units * ntu
+    size = 4 * sections
+    transfers = []
+    for k in range(sections):
+        # the shell inlet half flows towards x = 0 in even sections and towards x = 1 in odd sections
+        d = -1 if k % 2 == 0 else 1
+        derivatives = np.array([[-tube, 0, 0, tube],
+                                [0, tube, -tube, 0],
+                                [0, d * shell, -d * shell, 0],
+                                [-d * shell, 0, 0, d * shell]])
+        transfers.append(expm(derivatives / sections))
+
+    def start(k, i):
+        row = np.zeros(size)
+        row[4 * k + i] = 1
+        return row
+
+    def end(k, i):
+        row = np.zeros(size)
+        row[4 * k:4 * k + 4] = transfers[k][i]
+        return row
+
+    rows = [start(0, 0), end(sections - 1, 1) - end(sections - 1, 0)]
+    values = [0, 0]
+    for k in range(sections - 1):
+        rows += [end(k, 0) - start(k + 1, 0), end(k, 1) - start(k + 1, 1)]
+        values += [0, 0]
+    outlets = []
+    for k in range(sections):
+        inlet, turn = (end, start) if k % 2 == 0 else (start, end)
+        rows += [inlet(k, 2), turn(k, 3) - turn(k, 2)]
+        values += [1, 0]
+        outlets.append(inlet(k, 3))
+    states = np.linalg.solve(np.array(rows), np.array(values, dtype=float))
+    return 1 - np.mean(np.array(outlets) @ states)
+
+
+def cross_flow_one_row_reference(ntu, r):
+    """The one row crossflow formula in 80 digit decimal arithmetic."""
+    with localcontext() as context:
+        context.prec = 80
+        ntu, r = Decimal(ntu), Decimal(r)
+        return float(1 - (((-r * ntu).exp() - 1) / r).exp())
+
+
+def decimal_derivatives(formula, ntu, r):
+    """Central differences of a formula in 80 digit decimal arithmetic, exact to double precision."""
+    with localcontext() as context:
+        context.prec = 80
+        ntu, r, h = Decimal(ntu), Decimal(r), Decimal('1e-30')
+        return (float((formula(ntu + h, r) - formula(ntu - h, r)) / (2 * h)),
+                float((formula(ntu, r + h) - formula(ntu, r - h)) / (2 * h)))
+
+
+def central_differences(kernel, ntu, r, /, h=1e-5, **parameters):
+    """Central differences of a kernel with the absolute step h."""
+    return ((kernel(ntu + h, r, **parameters) - kernel(ntu - h, r, **parameters)) / (2 * h),
+            (kernel(ntu, r + h, **parameters) - kernel(ntu, r - h, **parameters)) / (2 * h))
+
+
+def one_outer_three_inner_formula(ntu, r):
+    """The formula of the VDI Waermeatlas for decimal arguments."""
+    epsilon = Decimal(1) / 3
+    p = ntu * (1 - r / 2 * (1 - 3 * epsilon))
+    q = epsilon * (1 - epsilon) * ntu ** 2 * r * (1 - r) / 2
+    root = (p ** 2 / 4 - q).sqrt()
+    s1, s2, s3 = -p / 2 + root, -p / 2 - root, r * ntu * (1 - epsilon) / 2
+    e1, e2, e3 = s1.exp(), s2.exp(), s3.exp()
+    numerator = s1 * (e1 + e3) * (e2 - 1) + s2 * (e2 + e3) * (1 - e1) + ntu * (1 - r) * (e2 - e1) * (1 + e3)
+    denominator = s1 * (e1 + e3) * (r * e2 - 1) + s2 * (e2 + e3) * (1 - r * e1) + \
+        ntu * (1 - r) * (e2 - e1) * (1 + r * e3)
+    return numerator / denominator
+
+
+def one_outer_three_inner_reference(ntu, r):
+    """The formula of the VDI Waermeatlas in 80 digit decimal arithmetic."""
+    with localcontext() as context:
+        context.prec = 80
+        return float(one_outer_three_inner_formula(Decimal(ntu), Decimal(r)))
+
+
+def tema_j_formula(ntu, r):
+    """The TEMA J formula of Shah and Sekulic with exp(-lambda NTU1) for decimal arguments."""
+    lam = (1 + r ** 2 / 4).sqrt()
+    e = (-lam * ntu).exp()
+    denominator = (lam - 1) * e + 1 + lam
+    c = (ntu * (1 - lam) / 2).exp() / denominator
+    return 1 / (1 + r / 2 - 2 * lam * c + lam * ((lam - 1) * e ** 2 + 1 + lam) / (denominator * (1 - e)))
+
+
+class TestKernels(unittest.TestCase):
+    def test_scalar(self):
+        self.assertAlmostEqual(parallel_flow(1, 1), (1 - np.exp(-2)) / 2)
+        self.assertAlmostEqual(counter_current_flow(1, 1), 0.5)
+        self.assertAlmostEqual(counter_current_flow(1, 0.5),
+                               (1 - np.exp(-0.5)) / (1 - 0.5 * np.exp(-0.5)))
+        self.assertAlmostEqual(cross_flow_one_row(1, 0.5), 1 - np.exp((np.exp(-0.5) - 1) / 0.5))
+        for kernel in kernels:
+            self.assertEqual(np.ndim(kernel(1., 0.5)), 0)
+            self.assertEqual(kernel(0., 0.5), 0)
+
+    def test_shapes(self):
+        ntu = np.linspace(0.1, 5, 12).reshape(3, 4)
+        for kernel in kernels:
+            value = kernel(ntu, 0.7)
+            self.assertEqual(value.shape, (3, 4))
+            self.assertEqual(kernel(ntu[:, :1], np.array([0.5, 1, 2, 4])).shape, (3, 4))
+            for index in np.ndindex(ntu.shape):
+                self.assertAlmostEqual(value[index], kernel(ntu[index], 0.7))
+
+    def test_equal_ratio(self):
+        ntu = np.array([0.5, 1, 3])
+        r = np.array([1, 1, 0.5])
+        for kernel in (counter_current_flow, one_outer_three_inner_two_counter_flow):
+            value = kernel(ntu, r)
+            self.assertTrue(np.all(np.isfinite(value)))
+            # the R = 1 branch is the limit of the general formula
+            np.testing.assert_allclose(value[:2], kernel(ntu[:2], 1 - 1e-7), rtol=1e-5)
+            self.assertAlmostEqual(value[2], kernel(3, 0.5))
+
+    def test_bounds(self):
+        ntu, r = np.meshgrid(np.linspace(0.01, 10, 50), np.linspace(0.05, 4, 40))
+        for kernel in kernels:
+            value = kernel(ntu, r)
+            self.assertTrue(np.all((0 < value) & (value < 1)))
+            self.assertTrue(np.all(r * value < 1 + 1e-12))
+
+    def test_classes(self):
+        flow_1 = Flow(Fluid("Water", temperature=273.15 + 15), 0.33)
+        flow_2 = Flow(Fluid("Air"), 1)
+        exchangers = [ex_class(flow_1, flow_2, Part(560)) for ex_class in
+                      (ParallelFlow, CounterCurrentFlow, CrossFlowOneRow, OneOuterThreeInnerTwoCounterFlow)]
+        values = p_values(exchangers)
+        self.assertEqual(values.shape, (2, 4))
+        for ex, kernel, (p1, p2) in zip(exchangers, kernels, values.T):
+            self.assertEqual(ex.p_kernel, kernel)
+            self.assertAlmostEqual(ex.p[0], kernel(ex.ntu[0], ex.r[0]))
+            self.assertAlmostEqual(ex.p[0], p1)
+            self.assertAlmostEqual(ex.p[1], p2)
+            self.assertAlmostEqual(ex.p[1], ex.r[0] * ex.p[0])
+
+        with self.assertRaises(NotImplementedError):
+            p_values([HeatExchanger(flow_1, flow_2, Part(560))])
+
+
+class TestStandardKernels(unittest.TestCase):
+    def test_cross_flow_unmixed(self):
+        for ntu, r in ((0.5, 0.5), (1, 1), (3, 0.8), (2, 2.5)):
+            # Richardson extrapolation of the first order discretization
+            reference = 2 * cross_flow_grid(ntu, r, 400) - cross_flow_grid(ntu, r, 200)
+            self.assertAlmostEqual(cross_flow_unmixed(ntu, r), reference, 4)
+        self.assertAlmostEqual(cross_flow_unmixed(1, 1), 0.476, 3)
+        self.assertAlmostEqual(cross_flow_unmixed(2, 0), 1 - np.exp(-2))
+        # both flows unmixed, the exchanger is symmetric
+        self.assertAlmostEqual(0.5 * cross_flow_unmixed(2, 0.5), cross_flow_unmixed(1, 2))
+        with self.assertWarns(UserWarning):
+            cross_flow_unmixed(20, 1, max_terms=5)
+
+    def test_cross_flow_large_ntu(self):
+        # all terms of the series summed up, the incomplete gamma functions by scipy
+        for ntu, r in ((300, 1), (2000, 1), (2000, 0.98), (1500, 1.05), (5000, 0.3)):
+            n = np.arange(int(4 * max(ntu, r * ntu)))
+            reference = np.sum(special.gammainc(n + 1, ntu) * special.gammainc(n + 1, r * ntu)) / (r * ntu)
+            self.assertAlmostEqual(cross_flow_unmixed(ntu, r), reference, delta=1e-10, msg=(ntu, r))
+        # P1 grows towards the limit min(1, 1 / R1) with NTU
+        ntu = np.array([10, 100, 1e3, 1e4, 1e6, 1e10, 1e300, np.inf])
+        for r in (0.5, 1, 2):
+            values = cross_flow_unmixed(ntu, r)
+            self.assertTrue(np.all(np.diff(values) >= 0), msg=r)
+            self.assertEqual(values[-1], min(1, 1 / r))
+        # 1 - P1 = 1 / sqrt(pi NTU1) for R = 1
+        self.assertAlmostEqual(1 - cross_flow_unmixed(1e8, 1), 1 / np.sqrt(np.pi * 1e8), 9)
+
+    def test_cross_counter_flow(self):
+        ntu = np.linspace(0.2, 6, 10)
+        np.testing.assert_allclose(cross_counter_flow(ntu, 0.6, passes=1), cross_flow_unmixed(ntu, 0.6))
+        np.testing.assert_allclose(cross_counter_flow(ntu, 1, passes=1), cross_flow_unmixed(ntu, 1))
+        passes = [cross_counter_flow(ntu, 0.6, passes=n) for n in (1, 2, 4, 50)]
+        for fewer, more in zip(passes, passes[1:]):
+            self.assertTrue(np.all(fewer < more))
+        np.testing.assert_allclose(passes[-1], counter_current_flow(ntu, 0.6), atol=2e-3)
+
+    def test_shells(self):
+        # exact solutions of the shell differential equations by matrix exponentials
+        for kernel, value in ((tema_e_one_two, 0.6342309661651371), (tema_j_one_two, 0.6311573034999024),
+                              (tema_g_one_two, 0.7036042827517903), (tema_h_one_two, 0.704325646220491)):
+            self.assertAlmostEqual(kernel(2, 0.7), value, 12)
+        ntu, r = np.meshgrid(np.linspace(0.05, 8, 30), np.linspace(0.1, 4, 25))
+        np.testing.assert_allclose(_split_flow(ntu, r, 1), tema_g_one_two(ntu, r), atol=1e-12)
+        # the split flow shells against their differential equations along the shell
+        for ntu, r in ((2, 0.7), (0.3, 0.2), (5, 3), (1, 1), (8, 0.1), (0.05, 4)):
+            self.assertAlmostEqual(tema_g_one_two(ntu, r), split_flow_shell(ntu, r, 1), 12)
+            self.assertAlmostEqual(tema_h_one_two(ntu, r), split_flow_shell(ntu, r, 2), 12)
+        self.assertAlmostEqual(tema_g_one_two(1.3, 2), tema_g_one_two(1.3, 2 + 1e-7), 6)
+        self.assertAlmostEqual(tema_e_one_two(0, 1), 0)
+        # no overflow of exp(lambda NTU) for large NTU
+        self.assertAlmostEqual(tema_j_one_two(1e4, 1), tema_j_one_two(1e3, 1))
+
+    def test_classes(self):
+        flow_1 = Flow(Fluid("Water", temperature=273.15 + 15), 0.33)
+        flow_2 = Flow(Fluid("Air"), 1)
+        exchangers = [ex_class(flow_1, flow_2, Part(560)) for ex_class in
+                      (CrossFlowUnmixed, TemaE12, TemaJ12, TemaG12, TemaH12, CrossCounterFlow)]
+        exchangers.append(CrossCounterFlow(flow_1, flow_2, Part(560), passes=3))
+        values = p_values(exchangers)
+        for ex, (p1, p2) in zip(exchangers, values.T):
+            self.assertAlmostEqual(ex.p[0], p1)
+            self.assertAlmostEqual(ex.p[1], p2)
+        self.assertAlmostEqual(values[0, -1], cross_counter_flow(exchangers[-1].ntu[0], exchangers[-1].r[0], 3))
+        self.assertNotAlmostEqual(values[0, -1], values[0, -2])
+        with self.assertRaises(NotImplementedError):
+            exchangers[-1].passes = 0
+
+
+class TestStability(unittest.TestCase):
+    def test_reference(self):
+        # R close to 1, tiny and large NTU, where the plain formulas cancel or overflow
+        for kernel, reference in ((counter_current_flow, counter_current_reference),
+                                  (cross_flow_one_row, cross_flow_one_row_reference),
+                                  (one_outer_three_inner_two_counter_flow, one_outer_three_inner_reference)):
+            for ntu in (1e-9, 1e-4, 0.3, 2, 20, 200, 600):
+                for r in (1e-8, 0.3, 1 - 1e-6, 1 - 1e-11, 1 + 1e-11, 1 + 1e-6, 1.7, 25):
+                    self.assertAlmostEqual(kernel(ntu, r) / reference(ntu, r), 1, 14, msg=(kernel, ntu, r))
+
+    def test_extremes(self):
+        ntu, r = np.meshgrid([0, 1e-300, 1e-12, 1, 50, 800, 1e4, 1e300, np.inf],
+                             [0, 1e-300, 1e-12, 1 - 1e-9, 1, 1 + 1e-9, 2, 5, 1e6])
+        for kernel in (parallel_flow, counter_current_flow, cross_flow_one_row, one_outer_three_inner_two_counter_flow,
+                       cross_flow_unmixed, cross_counter_flow, tema_e_one_two, tema_j_one_two, tema_g_one_two,
+                       tema_h_one_two):
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                value = kernel(ntu, r)
+            self.assertTrue(np.all(np.isfinite(value)), msg=kernel)
+            self.assertTrue(np.all((value >= 0) & (value <= 1 + 1e-15)), msg=kernel)
+            self.assertTrue(np.all(r * value <= 1 + 1e-9), msg=kernel)
+        # limits of infinite NTU
+        np.testing.assert_allclose(counter_current_flow(np.inf, [0.5, 1, 4]), [1, 1, 0.25])
+        np.testing.assert_allclose(cross_flow_one_row(np.inf, [0, 0.5]), [1, -np.expm1(-2)])
+        for kernel in (cross_flow_unmixed, cross_counter_flow):
+            np.testing.assert_allclose(kernel(np.inf, [0.5, 1, 4]), [1, 1, 0.25], err_msg=kernel.__name__)
+
+    def test_continuity(self):
+        # no branch at R = 1 and R = 2, the kernels are smooth there
+        ntu = np.array([0.1, 1, 5, 50])
+        for kernel, r in ((counter_current_flow, 1), (one_outer_three_inner_two_counter_flow, 1),
+                          (cross_counter_flow, 1), (tema_g_one_two, 2)):
+            for offset in (1e-12, 1e-8):
+                np.testing.assert_allclose(kernel(ntu, r - offset), kernel(ntu, r), rtol=10 * offset * ntu.max())
+                np.testing.assert_allclose(kernel(ntu, r + offset), kernel(ntu, r), rtol=10 * offset * ntu.max())
+
+
+class TestDerivatives(unittest.TestCase):
+    def test_reference(self):
+        def counter(ntu, r):
+            e = (ntu * (r - 1)).exp()
+            return (1 - e) / (1 - r * e)
+
+        def one_row(ntu, r):
+            return 1 - (((-r * ntu).exp() - 1) / r).exp()
+
+        for kernel, formula in ((counter_current_flow, counter), (cross_flow_one_row, one_row),
+                                (one_outer_three_inner_two_counter_flow, one_outer_three_inner_formula),
+                                (tema_j_one_two, tema_j_formula)):
+            for ntu in (1e-6, 0.3, 2, 20):
+                for r in (1e-6, 0.3, 1 - 1e-7, 1 + 1e-7, 1.7, 4):
+                    exact = decimal_derivatives(formula, ntu, r)
+                    derivatives = p_derivatives(kernel, ntu, r)
+                    for value, reference in zip(derivatives, exact):
+                        # relative to the derivatives of order 1, some of them vanish for small NTU
+                        self.assertAlmostEqual((value - reference) / max(abs(reference), 1e-3), 0, 10,
+                                               msg=(kernel, ntu, r))
+
+    def test_kernels(self):
+        ntu, r = np.meshgrid(np.array([0.05, 0.4, 1, 2.5, 6]), np.array([0.1, 0.5, 1, 1.5, 3]))
+        cases = [(kernel, {}) for kernel in kernels] + \
+                [(multi_shell, {'kernel': tema_e_one_two, 'shells': 3, 'arrangement': arrangement})
+                 for arrangement in MultiShell.arrangements] + \
+                [(multi_shell, {'kernel': cross_counter_flow, 'shells': 2, 'arrangement': 'split_1', 'passes': 3})]
+        for kernel, parameters in cases:
+            derivatives = p_derivatives(kernel, ntu, r, **parameters)
+            for value, reference in zip(derivatives, central_differences(kernel, ntu, r, **parameters)):
+                np.testing.assert_allclose(value, reference, rtol=1e-6, atol=1e-9, err_msg=kernel.__name__)
+        self.assertTrue(all(kernel in derivative_kernels for kernel in kernels))
+
+        # user-defined kernels are differentiated numerically
+        def kernel(ntu, r):
+            return tema_e_one_two(ntu, r) ** 2
+
+        for value, reference in zip(p_derivatives(kernel, ntu, r), central_differences(kernel, ntu, r)):
+            np.testing.assert_allclose(value, reference, rtol=1e-6, atol=1e-9)
+
+    def test_cross_flow_large_ntu(self):
+        # the windowed series and the asymptotic expansion above NTU = 1380, the kernel has a rounding noise of
+        # about 1e-13, steps relative to NTU keep the truncation error of the differences small
+        ntu, r = np.meshgrid(np.array([900, 2000, 5000, 1e6]), np.array([0.3, 0.98, 1, 1.05, 2]))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            dp_dntu, dp_dr = cross_flow_unmixed_derivatives(ntu, r)
+            h = 1e-6 * ntu
+            reference = (cross_flow_unmixed(ntu + h, r) - cross_flow_unmixed(ntu - h, r)) / (2 * h)
+            np.testing.assert_allclose(dp_dntu, reference, rtol=1e-6, atol=1e-10)
+            reference = (cross_flow_unmixed(ntu, r + 1e-5) - cross_flow_unmixed(ntu, r - 1e-5)) / 2e-5
+            np.testing.assert_allclose(dp_dr, reference, rtol=1e-6, atol=1e-7)
+            # the limit P1 = min(1, 1 / R1)
+            dp_dntu, dp_dr = cross_flow_unmixed_derivatives(np.inf, np.array([0, 0.5, 2, 4]))
+        np.testing.assert_array_equal(dp_dntu, 0)
+        np.testing.assert_array_equal(dp_dr, [0, 0, -0.25, -0.0625])
+
+    def test_split_flow(self):
+        # the split flow shells are continuous at R = 2 and R = 4 with sections of equal heat capacity flows
+        ntu, r = np.meshgrid(np.array([1e-3, 0.4, 2, 9, 60]), np.array([1e-6, 0.3, 1, 2, 4, 12]))
+        for kernel in (tema_g_one_two, tema_h_one_two):
+            for value, reference in zip(p_derivatives(kernel, ntu, r), central_differences(kernel, ntu, r, h=1e-6)):
+                np.testing.assert_allclose(value, reference, rtol=1e-7, atol=1e-9, err_msg=kernel.__name__)
+
+    def test_limits(self):
+        for kernel in kernels:
+            dp_dntu, dp_dr = p_derivatives(kernel, 0, [0.5, 1, 2])
+            np.testing.assert_allclose(dp_dntu, 1, rtol=1e-6, err_msg=kernel.__name__)
+            np.testing.assert_allclose(dp_dr, 0, atol=1e-9, err_msg=kernel.__name__)
+        # counter current flow at R = 1: P = NTU / (1 + NTU)
+        ntu = np.array([1e-3, 0.5, 4, 100])
+        dp_dntu, dp_dr = p_derivatives(counter_current_flow, ntu, 1)
+        np.testing.assert_allclose(dp_dntu, 1 / (1 + ntu) ** 2)
+        np.testing.assert_allclose(dp_dr, -ntu ** 2 / (2 * (1 + ntu) ** 2))
+        # smooth at R = 1 for series of units
+        for offset in (1e-12, 1e-6):
+            np.testing.assert_allclose(p_derivatives(cross_counter_flow, ntu, 1 + offset, passes=4),
+                                       p_derivatives(cross_counter_flow, ntu, 1, passes=4), rtol=1e-5)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            derivatives = np.array(p_derivatives(cross_counter_flow, [1e-3, 1, 30, 200], [[0], [0.5], [3], [40]]))
+        self.assertTrue(np.all(np.isfinite(derivatives)))
+        # finite without warnings at the limits of all kernels
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            for kernel in (parallel_flow, counter_current_flow, one_outer_three_inner_two_counter_flow,
+                           tema_j_one_two, tema_g_one_two, tema_h_one_two):
+                derivatives = np.array(p_derivatives(kernel, [0, 1e-300, 1, 1e5, 1e300, np.inf],
+                                                     [[0], [0.5], [1], [3], [1e5]]))
+                self.assertTrue(np.all(np.isfinite(derivatives)), msg=kernel.__name__)
+                np.testing.assert_allclose(derivatives[0, :, -2:], 0, atol=1e-12, err_msg=kernel.__name__)
+        self.assertEqual(np.ndim(p_derivatives(tema_e_one_two, 1, 0.5)[0]), 0)
+        self.assertEqual(np.ndim(p_derivatives(tema_g_one_two, 1, 0.5)[1]), 0)
+
+    def test_exchangers(self):
+        flow_1 = Flow(Fluid("Water", temperature=273.15 + 15), 0.33)
+        flow_2 = Flow(Fluid("Air"), 1)
+        part = Part(560)
+        exchangers = [CounterCurrentFlow(flow_1, flow_2, part), TemaH12(flow_1, flow_2, part),
+                      CrossCounterFlow(flow_1, flow_2, part, passes=3), MultiShell(flow_1, flow_2, part, TemaJ12)]
+        values = p_derivative_values(exchangers)
+        self.assertEqual(values.shape, (2, 4))
+        for ex, derivatives in zip(exchangers, values.T):
+            np.testing.assert_allclose(ex.p_derivatives, derivatives)
+            np.testing.assert_allclose(derivatives, central_differences(ex.p_kernel, ex.ntu[0], ex.r[0],
+                                                                        **ex.kernel_parameters), rtol=1e-6)
+        with self.assertRaises(NotImplementedError):
+            _ = HeatExchanger(flow_1, flow_2, part).p_derivatives
+        with self.assertRaises(NotImplementedError):
+            p_derivative_values([HeatExchanger(flow_1, flow_2, part)])
+
+
+class TestMultiShell(unittest.TestCase):
+    def test_single_shell(self):
+        ntu, r = np.meshgrid(np.linspace(0.1, 5, 8), np.linspace(0.2, 3, 7))
+        for arrangement in MultiShell.arrangements:
+            np.testing.assert_allclose(multi_shell(ntu, r, tema_e_one_two, 1, arrangement), tema_e_one_two(ntu, r))
+
+    def test_series(self):
+        # shells of pure counter or parallel flow in series are one longer exchanger of the same type
+        ntu, r = np.meshgrid(np.linspace(0.1, 5, 8), np.array([0.3, 1, 2.5]))
+        np.testing.assert_allclose(multi_shell(ntu, r, counter_current_flow, 4, 'counter'),
+                                   counter_current_flow(ntu, r))
+        np.testing.assert_allclose(multi_shell(ntu, r, parallel_flow, 3, 'parallel'), parallel_flow(ntu, r))
+        # the passes of a crossflow-counterflow exchanger are shells in counter arrangement
+        np.testing.assert_allclose(multi_shell(ntu, r, cross_flow_unmixed, 3), cross_counter_flow(ntu, r, 3))
+        self.assertTrue(np.all(multi_shell(ntu, r, tema_e_one_two, 3) > tema_e_one_two(ntu, r)))
+
+    def test_split(self):
+        ntu, r, shells = 2., 0.6, 3
+        # flow 1 split over the shells, flow 2 passes them in series
+        t_2 = 0.
+        for _ in range(shells):
+            t_2 += r / shells * tema_e_one_two(ntu, r / shells) * (1 - t_2)
+        self.assertAlmostEqual(multi_shell(ntu, r, tema_e_one_two, shells, 'split_1'), t_2 / r)
+        # flow 2 split over the shells, flow 1 passes them in series
+        t_1 = 1.
+        for _ in range(shells):
+            t_1 -= tema_e_one_two(ntu / shells, r * shells) * t_1
+        self.assertAlmostEqual(multi_shell(ntu, r, tema_e_one_two, shells, 'split_2'), 1 - t_1)
+        with self.assertRaises(NotImplementedError):
+            multi_shell(ntu, r, tema_e_one_two, shells, 'mixed')
+
+    def test_class(self):
+        flow_1 = Flow(Fluid("Water", temperature=273.15 + 15), 0.33)
+        flow_2 = Flow(Fluid("Air"), 1)
+        part = Part(560)
+        ex = MultiShell(flow_1, flow_2, part, shells=1)
+        self.assertAlmostEqual(ex.p[0], TemaE12(flow_1, flow_2, part).p[0])
+        exchangers = [MultiShell(flow_1, flow_2, part, base, 3, arrangement)
+                      for base in (CounterCurrentFlow, CrossCounterFlow(flow_1, flow_2, part, passes=3))
+                      for arrangement in MultiShell.arrangements]
+        values = p_values(exchangers)
+        for ex, (p1, p2) in zip(exchangers, values.T):
+            self.assertAlmostEqual(ex.p[0], p1)
+            self.assertAlmostEqual(ex.p[1], p2)
+        self.assertAlmostEqual(values[0, 0], CounterCurrentFlow(flow_1, flow_2, part).p[0])
+        self.assertAlmostEqual(values[0, 4], multi_shell(ex.ntu[0], ex.r[0], cross_counter_flow, 3, passes=3))
+
+        for attribute, value in (('base', HeatExchanger), ('base', Part), ('shells', 0), ('arrangement', 'mixed')):
+            with self.assertRaises(NotImplementedError):
+                setattr(ex, attribute, value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -169,6 +169,95 @@ class NetworkTests(unittest.TestCase):
                                                                                         [0.55943, 0.22541, 0.21516]]),
                                              decimal=5)
 
+    def test_cells_factorization(self):
+        flows = [Flow(Fluid("Water", temperature=t), 1) for t in (373, 405, 293)]
+        network = ExchangerNetwork(flows)
+        network.phi_matrix = np.array([[0.2, 0., 0., 0., 0.8, 0., 0., 0.],
+                                       [0., 0.4, 0., 0., 0., 0.6, 0., 0.],
+                                       [0., 0., 0.24, 0., 0., 0., 0.76, 0.],
+                                       [0., 0., 0., 0.36, 0., 0., 0., 0.64],
+                                       [0.6, 0., 0., 0., 0.4, 0., 0., 0.],
+                                       [0., 0.6, 0., 0., 0., 0.4, 0., 0.],
+                                       [0., 0., 0.76, 0., 0., 0., 0.24, 0.],
+                                       [0., 0., 0., 0.16, 0., 0., 0., 0.84]])
+        network.structure_matrix = np.array([[0., 1., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 1., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 1, 0., 0., 0.],
+                                             [0., 0., 0., 0., 1, 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0.75, 0.25, 0.]])
+        network.input_matrix = np.eye(8, 3)[[4, 0, 5, 1, 2, 6, 7, 3]]
+        network.output_matrix = np.eye(3, 8)
+        phi, s, inp = network.phi_matrix, network.structure_matrix, network.input_matrix
+        characteristic = np.linalg.inv(np.eye(8) - phi @ s) @ phi @ inp
+
+        factorization = network.cells_factorization()
+        np.testing.assert_array_equal(factorization.phi, phi)
+        np.testing.assert_allclose(network._cells_characteristic(factorization=factorization), characteristic,
+                                   atol=1e-14)
+        # other input temperatures are solved with the same factorization
+        temperatures = np.array([[0.3, 1.], [1., 0.], [0., 0.5]])
+        np.testing.assert_allclose(network._cells_characteristic(temperatures, factorization),
+                                   characteristic @ temperatures, atol=1e-14)
+        np.testing.assert_allclose(network.temperature_matrix[0], characteristic @ network.temperature_input_matrix,
+                                   atol=1e-14)
+
+        network.structure_matrix = np.eye(8)
+        network.phi_matrix = np.eye(8)
+        with self.assertRaises(np.linalg.LinAlgError):
+            network.temperature_matrix
+
+    def test_output_jacobian(self):
+        flows = [Flow(Fluid("Water", temperature=t), 1) for t in (373, 405, 293)]
+        network = ExchangerNetwork(flows)
+        phi = np.array([[0.2, 0., 0., 0., 0.8, 0., 0., 0.],
+                        [0., 0.4, 0., 0., 0., 0.6, 0., 0.],
+                        [0., 0., 0.24, 0., 0., 0., 0.76, 0.],
+                        [0., 0., 0., 0.36, 0., 0., 0., 0.64],
+                        [0.6, 0., 0., 0., 0.4, 0., 0., 0.],
+                        [0., 0.6, 0., 0., 0., 0.4, 0., 0.],
+                        [0., 0., 0.76, 0., 0., 0., 0.24, 0.],
+                        [0., 0., 0., 0.16, 0., 0., 0., 0.84]])
+        network.structure_matrix = np.array([[0., 1., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 1., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0., 0., 0.],
+                                             [0., 0., 0., 0., 1, 0., 0., 0.],
+                                             [0., 0., 0., 0., 1, 0., 0., 0.],
+                                             [0., 0., 0., 0., 0., 0.75, 0.25, 0.]])
+        network.input_matrix = np.array([[0, 0, 0],
+                                         [1, 0, 0],
+                                         [0, 0, 0],
+                                         [0, 1, 0],
+                                         [0, 0, 1],
+                                         [0, 0, 0],
+                                         [0, 0, 0],
+                                         [0, 0, 0]])
+        network.output_matrix = np.asarray([[1, 0, 0, 0, 0, 0, 0, 0],
+                                            [0, 0, 1, 0, 0, 0, 0, 0],
+                                            [0, 0, 0, 0, 0, 0, 0, 1]])
+        network.phi_matrix = phi
+        dimensionless, jacobian = network.output_jacobian()
+        self.assertEqual(jacobian.p1.shape, (3, 4))
+        self.assertIsNone(jacobian.ntu)
+        np.testing.assert_allclose(jacobian.p2, 112 * dimensionless.p2)
+
+        # the derivatives are linear in the P values, central differences are exact up to rounding
+        h = 1e-6
+        for i in range(4):
+            for derivative, (row, column) in ((jacobian.p1, (i, i + 4)), (jacobian.p2, (i + 4, i))):
+                outputs = []
+                for step in (h, -h):
+                    phi_step = phi.copy()
+                    phi_step[row, row] -= step
+                    phi_step[row, column] += step
+                    network.phi_matrix = phi_step
+                    outputs.append(network.temperature_outputs[1].ravel())
+                np.testing.assert_allclose(derivative[:, i], (outputs[0] - outputs[1]) / (2 * h), atol=1e-5)
+
     def test_print(self):
         ex_1, ex_2 = init_ex()
         ex_1.heat_transferability = 100
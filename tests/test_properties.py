@@ -0,0 +1,484 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyfluids as pyf
+
+from exchanger.properties import PropertyTable, StateCache, state_cache, evaluate, evaluate_batch, tabulate, \
+    get_table, remove_table, PolynomialCorrelation, correlate, get_correlation, remove_correlation, PropertyBackend, \
+    PyfluidsBackend, TabulatedBackend, CorrelationBackend, ConstantPropertyBackend, FluidProperties, get_backend, \
+    use_backend, default_backend, write_tables, load_tables, ValidityEnvelope, get_envelope, get_diagnostics, \
+    clear_diagnostics, CoolPropBackend, ThreadLocalPool, evaluate_parallel, mixture_title, humid_air_title, parse_title, \
+    ObjectPool, fluid_pool
+from exchanger.stream import Fluid, Flow
+
+
+class TestPropertyTable(unittest.TestCase):
+    def tearDown(self):
+        remove_table()
+
+    def test_table_init(self):
+        table = PropertyTable.from_pyfluids("Water", (1e5, 5e5), (280, 360), (8, 12))
+        self.assertEqual(table.phase, pyf.Phases.Liquid)
+        self.assertEqual(table.pressure_range, (1e5, 5e5))
+        self.assertEqual(table.temperature_range, (280, 360))
+        for name in PropertyTable.properties:
+            self.assertLess(table.error_bound[name], 1e-4, msg=f'error bound of {name} too large')
+
+        with self.assertRaises(ValueError, msg='table crossing the boiling point was created'):
+            PropertyTable.from_pyfluids("Water", (1e5, 2e5), (300, 420), (5, 10))
+        with self.assertRaises(ValueError, msg='table with less than 4 nodes was created'):
+            PropertyTable.from_pyfluids("Water", (1e5, 2e5), (300, 320), (3, 10))
+        with self.assertRaises(NotImplementedError):
+            PropertyTable.from_pyfluids("Test", (1e5, 2e5), (300, 320))
+
+    def test_table_evaluate(self):
+        table = PropertyTable.from_pyfluids("Water", (1e5, 5e5), (280, 360), (8, 12))
+        fluid = pyf.Fluid(pyf.FluidsList.Water)
+        fluid.update(pyf.Input.pressure(2.2e5), pyf.Input.temperature(317.3))
+        self.assertAlmostEqual(table.evaluate('density', 2.2e5, 317.3), fluid.density, 2)
+        self.assertAlmostEqual(table.evaluate('specific_heat', 2.2e5, 317.3), fluid.specific_heat, 1)
+        self.assertAlmostEqual(table.evaluate('enthalpy', 2.2e5, 317.3), fluid.enthalpy, 0)
+
+        temperatures = np.array([[290, 300], [310, 320]])
+        densities = table.evaluate('density', 2e5, temperatures)
+        self.assertEqual(densities.shape, (2, 2))
+        np.testing.assert_array_equal(table.contains(2e5, np.array([270, 300, 370])), [False, True, False])
+
+    def test_fluid_tabulated(self):
+        reference = Fluid("Water", pressure=2e5, temperature=330)
+        table = tabulate("Water", (1e5, 5e5), (280, 360), (8, 12))
+        self.assertIs(get_table("Water"), table)
+
+        fluid = Fluid("Water", pressure=2e5, temperature=300)
+        info = state_cache.info()
+        fluid.temperature = 330
+        self.assertEqual(state_cache.info(), info, msg='state inside the table not answered by interpolation')
+        self.assertEqual(fluid.temperature, 330)
+        self.assertAlmostEqual(fluid.density, reference.density, 2)
+        self.assertAlmostEqual(fluid.specific_heat, reference.specific_heat, 1)
+        self.assertEqual(fluid.phase, pyf.Phases.Liquid)
+        self.assertEqual(fluid.fluid.temperature, 330, msg='pyfluids object not updated on access')
+
+        fluid.temperature = 400
+        self.assertEqual(fluid.phase, pyf.Phases.Gas, msg='state outside the table answered by interpolation')
+
+        remove_table("Water")
+        self.assertIsNone(get_table("Water"))
+
+    def test_table_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertWarns(UserWarning):
+                paths = write_tables(directory, ["Water", "Air", "Ethanol"], (1e5, 5e5), (280, 360), (6, 8))
+            self.assertEqual(len(paths), 2, msg='fluid crossing a phase boundary not skipped')
+            table = PropertyTable.load(paths[0])
+            self.assertFalse(table._values['density'].flags.writeable, msg='table values not memory-mapped read-only')
+            self.assertFalse(table._coefficients['density'].flags.writeable, msg='spline coefficients fitted on load')
+            self.assertEqual(table.phase, pyf.Phases.Liquid)
+            reference = PropertyTable.from_pyfluids("Water", (1e5, 5e5), (280, 360), (6, 8))
+            self.assertEqual(table.evaluate('density', 2e5, 317.3), reference.evaluate('density', 2e5, 317.3))
+            pressures, temperatures = np.array([[1.3e5], [4e5]]), np.array([281, 317.3, 359])
+            np.testing.assert_allclose(table.evaluate('enthalpy', pressures, temperatures),
+                                       [[reference.evaluate('enthalpy', p, t) for t in temperatures]
+                                        for p in pressures.ravel()], rtol=1e-14)
+            self.assertEqual(table.error_bound, reference.error_bound)
+
+            loaded = load_tables(directory)
+            self.assertEqual(sorted(loaded), ["Air", "Water"])
+            self.assertIs(get_table("Air"), loaded["Air"])
+
+            header_path = os.path.join(directory, "Water.json")
+            with open(header_path) as file:
+                header = json.load(file)
+            header['eos_versions']['CoolProp'] = '0.0.0'
+            with open(header_path, 'w') as file:
+                json.dump(header, file)
+            with self.assertRaisesRegex(ValueError, 'stale'):
+                PropertyTable.load(paths[0])
+            with self.assertWarns(UserWarning):
+                self.assertEqual(list(load_tables(directory, register=False)), ["Air"])
+
+            reference.save(directory)
+            with open(paths[0], 'r+b') as file:
+                file.seek(-8, os.SEEK_END)
+                file.write(b'\x00' * 8)
+            with self.assertRaisesRegex(ValueError, 'hash'):
+                PropertyTable.load(paths[0], verify=True)
+            self.assertIsNotNone(PropertyTable.load(paths[0]))
+            with open(paths[0], 'r+b') as file:
+                file.truncate(os.path.getsize(paths[0]) - 8)
+            with self.assertRaisesRegex(ValueError, 'size'):
+                PropertyTable.load(paths[0])
+
+    def test_flow_tabulated(self):
+        flow = Flow(Fluid("Water", temperature=290), 0.5)
+        flow.out_temperature = 320
+        heat_flux = flow.heat_flux
+        tabulate("Water", (9e4, 2e5), (280, 360), (8, 12))
+        flow = Flow(Fluid("Water", temperature=290), 0.5)
+        flow.out_temperature = 320
+        self.assertAlmostEqual(flow.heat_flux, heat_flux, delta=abs(heat_flux) * 1e-5)
+
+
+class TestPolynomialCorrelation(unittest.TestCase):
+    def tearDown(self):
+        remove_correlation()
+        remove_table()
+
+    def test_correlation_init(self):
+        correlation = PolynomialCorrelation.from_pyfluids("Water", (280, 360), (1e5, 5e5))
+        self.assertEqual(correlation.phase, pyf.Phases.Liquid)
+        for name in PolynomialCorrelation.properties:
+            self.assertLess(correlation.error_bound[name], 1e-3, msg=f'error bound of {name} too large')
+        with self.assertRaises(ValueError, msg='correlation crossing the boiling point was fitted'):
+            PolynomialCorrelation.from_pyfluids("Water", (300, 400), (1e5, 2e5))
+
+    def test_correlation_fallback(self):
+        exact = evaluate("Water", 2e5, 330)
+        gas = evaluate("Water", 1e5, 400)
+        correlation = correlate("Water", (280, 360), (1e5, 5e5))
+        self.assertIs(get_correlation("Water"), correlation)
+
+        state = evaluate("Water", 2e5, 330)
+        self.assertEqual(state, correlation.state(2e5, 330))
+        self.assertAlmostEqual(state.density, exact.density, delta=exact.density * 1e-4)
+        self.assertAlmostEqual(state.specific_heat, exact.specific_heat, delta=exact.specific_heat * 1e-3)
+        self.assertEqual(evaluate("Water", 1e5, 400), gas, msg='state outside the validity range not evaluated exactly')
+
+        states = evaluate_batch("Water", np.array([2e5, 1e5]), np.array([330, 400]))
+        self.assertEqual(states.density[0], state.density)
+        self.assertEqual(states.density[1], gas.density)
+
+        fluid = Fluid("Water", pressure=2e5, temperature=330)
+        self.assertEqual(fluid.specific_heat, state.specific_heat)
+        remove_correlation("Water")
+        self.assertIsNone(get_correlation("Water"))
+
+
+class TestStateCache(unittest.TestCase):
+    def test_cache_lookup(self):
+        cache = StateCache(maxsize=2, tolerance=1e-3)
+        state = cache.lookup("Water", 1e5, 300)
+        self.assertEqual(cache.info(), (0, 1, 0, 2, 1))
+        self.assertIs(cache.lookup("Water", 1e5, 300 + 1e-5), state, msg='quantized state not answered by cache')
+        self.assertEqual(cache.info().hits, 1)
+        self.assertIsNot(cache.lookup("Water", 1e5, 301), state)
+        cache.lookup("Air", 1e5, 300)
+        self.assertEqual(cache.info(), (1, 3, 1, 2, 2))
+
+        with self.assertRaises(ValueError) as first:
+            cache.lookup("Water", 1e5, 200)
+        with self.assertRaises(ValueError, msg='cached invalid state does not raise again') as second:
+            cache.lookup("Water", 1e5, 200)
+        self.assertEqual(cache.info().hits, 2)
+        # a new exception with the cached message is raised on every hit
+        self.assertIsNot(second.exception, first.exception)
+        self.assertEqual(str(second.exception), str(first.exception))
+        with self.assertRaisesRegex(NotImplementedError, 'Fluid not implemented'):
+            cache.lookup("Test", 1e5, 300)
+
+        cache.maxsize = 1
+        self.assertEqual(len(cache), 1)
+        cache.tolerance = 1e-6
+        self.assertEqual(len(cache), 0)
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 0, 1, 0))
+        with self.assertRaises(ValueError):
+            cache.maxsize = 0
+
+    def test_fluid_cached(self):
+        Fluid("Water", temperature=312.34)
+        misses = state_cache.info().misses
+        fluid = Fluid("Water", temperature=312.34)
+        flow = Flow(fluid, 1)
+        _ = flow.heat_capacity_flow
+        self.assertEqual(state_cache.info().misses, misses, msg='repeated states are evaluated again')
+        self.assertEqual(evaluate("Water", 101325, 312.34).density, fluid.density)
+
+
+class TestValidityEnvelope(unittest.TestCase):
+    def setUp(self):
+        clear_diagnostics()
+
+    def tearDown(self):
+        clear_diagnostics()
+
+    def test_envelope(self):
+        envelope = get_envelope("Water")
+        self.assertIs(get_envelope("Water"), envelope)
+        self.assertEqual(envelope.critical_point, (22064000.0, 647.096))
+        pressures = np.array([101325, 101325, 100, 0, 1e5, 1.1e9])
+        temperatures = np.array([373.124295, 300, 200, 300, 3000, 280])
+        np.testing.assert_array_equal(envelope.violations(pressures, temperatures), [5, 0, 6, 1, 0, 0])
+        self.assertEqual(envelope.reason(100, 200), 'state below the triple point')
+        # the nominal limits of pyfluids are left to the backend, which evaluates these states
+        self.assertIsNone(envelope.reason(1.1e9, 280))
+        self.assertGreater(evaluate("Water", 1.1e9, 280).density, 1000)
+        self.assertIsNone(envelope.reason(1e5, 200), msg='liquid water below the triple temperature is possible')
+        self.assertEqual(ValidityEnvelope("Test", max_temperature=400).reason(1e5, 500),
+                         'temperature above maximum temperature')
+        self.assertIsNone(envelope.reason(1e5, 372.7559), msg='state next to the saturation curve rejected')
+        self.assertFalse(get_envelope("Air").contains(6e5, 100), msg='two-phase state of pseudo-pure fluid accepted')
+        self.assertTrue(ValidityEnvelope.from_pyfluids("MEG").contains(1e5, 1e4))
+        with self.assertRaises(NotImplementedError):
+            get_envelope("Test")
+
+    def test_envelope_before_evaluation(self):
+        misses = state_cache.info().misses
+        states = evaluate_batch("Water", 100, np.array([200, 201, 202, 300.4321]))
+        self.assertEqual(state_cache.info().misses, misses + 1, msg='invalid states passed to the backend')
+        self.assertTrue(np.isnan(states.density[:3]).all())
+        self.assertEqual(states.phase[0], pyf.Phases.Unknown)
+        with self.assertRaisesRegex(ValueError, 'on the saturation curve'):
+            evaluate("Water", 101325, 373.124295)
+
+    def test_diagnostics(self):
+        fluid = Fluid("Water", temperature=300)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            fluid.temperature = 250
+            fluid.pressure = 2e9
+        self.assertEqual(output.getvalue(), '', msg='rejected state printed')
+        self.assertEqual((fluid.pressure, fluid.temperature), (101325, 300))
+        diagnostics = get_diagnostics("Water")
+        self.assertEqual(len(diagnostics), 2)
+        self.assertEqual(diagnostics[0].temperature, 250)
+        self.assertRegex(diagnostics[0].reason, 'temperature not supported')
+        self.assertEqual(diagnostics[1].pressure, 2e9)
+        self.assertEqual(get_diagnostics("Air"), [])
+        clear_diagnostics()
+        self.assertEqual(get_diagnostics(), [])
+
+
+class TestBatch(unittest.TestCase):
+    def tearDown(self):
+        remove_table()
+
+    def test_evaluate_batch(self):
+        temperatures = np.array([[290, 330], [200, 400]])
+        states = evaluate_batch("Water", 1e5, temperatures)
+        self.assertEqual(states.density.shape, (2, 2))
+        self.assertEqual(states.phase.shape, (2, 2))
+        self.assertEqual(states.density[0, 1], evaluate("Water", 1e5, 330).density)
+        self.assertTrue(np.isnan(states.density[1, 0]), msg='unsupported state not returned as NaN')
+        self.assertEqual(states.phase[1, 0], pyf.Phases.Unknown)
+        self.assertEqual(states.phase[1, 1], pyf.Phases.Gas)
+
+        tabulate("Water", (9e4, 2e5), (280, 360), (8, 12))
+        tabulated = evaluate_batch("Water", 1e5, temperatures)
+        np.testing.assert_allclose(tabulated.specific_heat[0], states.specific_heat[0], rtol=1e-5)
+        self.assertEqual(tabulated.specific_heat[1, 1], states.specific_heat[1, 1])
+
+        state = evaluate_batch("Water", 1e5, 300)
+        self.assertEqual(state.density.shape, ())
+
+    def test_composite_titles(self):
+        title = mixture_title(["Oxygen", pyf.FluidsList.Nitrogen], [0.4, 0.6])
+        self.assertEqual(parse_title(title), ('Mixture', (('Nitrogen', 0.6), ('Oxygen', 0.4))))
+        self.assertEqual(parse_title("Water"), ('Fluid', ()))
+        for invalid in ("Mixture(Nitrogen=0.6, Oxygen)", "HumidAir(fraction=0.1)", "Mixture(Water=1.5)", "Test(a=1)"):
+            with self.assertRaises(NotImplementedError, msg=invalid):
+                parse_title(invalid)
+
+        dry, humid = humid_air_title(0.0), humid_air_title(0.02)
+        self.assertNotEqual(evaluate(dry, 1e5, 300), evaluate(humid, 1e5, 300), msg='humidity not part of cache key')
+        temperatures = np.linspace(280, 340, 50)
+        exact = evaluate_batch(humid, 1e5, temperatures)
+        misses = state_cache.info().misses
+        table = tabulate(humid, (9e4, 2e5), (270, 350), (6, 10))
+        self.assertEqual(table.phase, pyf.Phases.Gas)
+        tabulated = evaluate_batch(humid, 1e5, temperatures)
+        np.testing.assert_allclose(tabulated.enthalpy, exact.enthalpy, rtol=1e-4)
+        self.assertEqual(state_cache.info().misses, misses, msg='tabulated humid air evaluated by pyfluids')
+
+
+class TestObjectPool(unittest.TestCase):
+    def test_pool(self):
+        pool = ObjectPool(maxsize=1)
+        water = pool.acquire("Water")
+        self.assertIsInstance(water, pyf.Fluid)
+        pool.release("Water", water)
+        self.assertIs(pool.acquire("Water"), water, msg='released object not reused')
+        self.assertIsNot(pool.acquire("Water"), water)
+        pool.release("Water", water)
+        pool.release("Water", pool.acquire("Air"))
+        self.assertEqual(pool.info(), (3, 1, 3, 1, 1))
+        self.assertEqual(pool.reuse_rate, 0.25)
+        with self.assertRaises(NotImplementedError):
+            pool.acquire("Test")
+        pool.clear()
+        self.assertEqual(pool.info(), (0, 0, 0, 0, 0))
+        self.assertTrue(np.isnan(pool.reuse_rate))
+
+    def test_fluid_pooled(self):
+        fluid_pool.clear()
+        fluid = Fluid("Water", temperature=300)
+        pyfluids_object = fluid.fluid
+        del fluid
+        self.assertEqual(fluid_pool.info().size, 0, msg='object kept by the caller released')
+        fluid = Fluid("Water", temperature=350)
+        self.assertIsNot(fluid.fluid, pyfluids_object)
+        self.assertEqual(pyfluids_object.temperature, 300, msg='object kept by the caller modified')
+        # a handed out object is never released, even if the caller dropped it
+        del pyfluids_object, fluid
+        self.assertEqual(fluid_pool.info().size, 0, msg='handed out object released')
+
+        fluid = Fluid("Water", temperature=300)
+        fluid.fluid = None
+        pyfluids_id = id(fluid._fluid)
+        del fluid
+        self.assertEqual(fluid_pool.info().size, 1, msg='object of deleted fluid not released')
+        fluid = Fluid("Water", temperature=340)
+        self.assertIsNone(fluid._fluid)
+        fluid.fluid = None
+        self.assertEqual(id(fluid._fluid), pyfluids_id)
+        self.assertEqual(fluid._fluid.temperature, 340, msg='reused object not updated')
+        self.assertEqual(fluid_pool.info().reused, 1)
+
+        own = pyf.Fluid(pyf.FluidsList.Water)
+        own.update(pyf.Input.pressure(1e5), pyf.Input.temperature(300))
+        fluid.fluid = own
+        self.assertEqual(fluid_pool.info().size, 1, msg='replaced pooled object not released')
+        del fluid
+        self.assertEqual(fluid_pool.info().size, 1, msg='object set by user released to the pool')
+
+
+class TestBackend(unittest.TestCase):
+    def tearDown(self):
+        remove_table()
+        remove_correlation()
+
+    def test_backend_flags(self):
+        self.assertIs(get_backend(), default_backend)
+        self.assertTrue(PyfluidsBackend().supports_threads)
+        self.assertFalse(PropertyBackend().supports_threads)
+        self.assertTrue(ConstantPropertyBackend().supports_batch)
+        self.assertTrue(TabulatedBackend(fallback=ConstantPropertyBackend()).supports_threads)
+        self.assertFalse(TabulatedBackend().supports_batch)
+        with self.assertRaises(NotImplementedError):
+            TabulatedBackend(fallback='pyfluids')
+
+    def test_use_backend(self):
+        tabulate("Water", (1e5, 5e5), (280, 360), (8, 12))
+        exact = PyfluidsBackend().evaluate("Water", 2e5, 330)
+        self.assertNotEqual(evaluate("Water", 2e5, 330), exact, msg='default backend ignores the registered table')
+        with use_backend(PyfluidsBackend()) as backend:
+            self.assertIs(get_backend(), backend)
+            self.assertEqual(evaluate("Water", 2e5, 330), exact)
+            with use_backend():
+                self.assertIs(get_backend(), backend)
+        self.assertIs(get_backend(), default_backend)
+        with self.assertRaises(NotImplementedError):
+            with use_backend('pyfluids'):
+                pass
+
+    def test_constant_backend(self):
+        reference = evaluate("Water", 101325, 293.15)
+        backend = ConstantPropertyBackend()
+        state = backend.evaluate("Water", 3e5, 313.15)
+        self.assertEqual(state.density, reference.density)
+        self.assertAlmostEqual(state.enthalpy, reference.enthalpy + 20 * reference.specific_heat)
+        with use_backend(backend):
+            states = evaluate_batch("Water", 1e5, np.array([290, 300]))
+        np.testing.assert_array_equal(states.specific_heat, [reference.specific_heat] * 2)
+
+        fluid = Fluid("Water", temperature=330)
+        with use_backend(backend):
+            self.assertEqual(fluid.density, reference.density, msg='state not evaluated again with other backend')
+        self.assertNotEqual(fluid.density, reference.density)
+
+    def test_user_backend(self):
+        class IdealGas(PropertyBackend):
+            name = 'ideal gas'
+
+            def evaluate(self, title, pressure, temperature):
+                return FluidProperties(pressure / (287 * temperature), 1005, 1005 * temperature, pyf.Phases.Gas)
+
+        with use_backend(IdealGas()):
+            states = evaluate_batch("Air", 1e5, np.array([300, 400]))
+            self.assertAlmostEqual(Fluid("Air", pressure=1e5, temperature=300).density, 1e5 / (287 * 300))
+        np.testing.assert_allclose(states.density, 1e5 / (287 * np.array([300, 400])))
+
+    def test_coolprop_backend(self):
+        backend = CoolPropBackend()
+        exact = PyfluidsBackend()
+        self.assertEqual(backend.evaluate("Water", 2e5, 330), exact.evaluate("Water", 2e5, 330))
+        self.assertEqual(backend.evaluate("Air", 1e5, 300), exact.evaluate("Air", 1e5, 300))
+        with self.assertRaises(ValueError):
+            backend.evaluate("Water", 1e5, 200)
+
+        temperatures = np.array([[290, 330], [200, 400]])
+        states = backend.evaluate_batch("Water", np.full((2, 2), 1e5), temperatures)
+        np.testing.assert_array_equal(states.density, evaluate_batch("Water", 1e5, temperatures).density)
+        self.assertEqual(states.phase[1, 0], pyf.Phases.Unknown)
+        self.assertEqual(states.phase[1, 1], pyf.Phases.Gas)
+
+        with use_backend(backend):
+            fluid = Fluid("Water", temperature=330)
+            self.assertEqual(fluid.enthalpy, exact.evaluate("Water", 101325, 330).enthalpy)
+        with self.assertRaisesRegex(NotImplementedError, 'not supported'):
+            backend.evaluate("MEG", 1e5, 300)
+        with self.assertRaisesRegex(NotImplementedError, 'Fluid not implemented'):
+            backend.evaluate("Test", 1e5, 300)
+
+    def test_chain(self):
+        correlation = correlate("Water", (280, 320))
+        tabulate("Water", (9e4, 2e5), (280, 360), (8, 12))
+        backend = CorrelationBackend(fallback=TabulatedBackend(fallback=ConstantPropertyBackend()))
+        states = evaluate_batch("Water", 1e5, np.array([300, 340]))
+        with use_backend(backend):
+            self.assertEqual(evaluate("Water", 1e5, 300), correlation.state(1e5, 300))
+            np.testing.assert_array_equal(evaluate_batch("Water", 1e5, np.array([300, 340])).density, states.density)
+            constant = backend.fallback.fallback.reference_state("Water")
+            self.assertEqual(evaluate("Water", 1e5, 400).density, constant.density)
+
+
+class TestParallel(unittest.TestCase):
+    def test_thread_local_pool(self):
+        pool = ThreadLocalPool(lambda title: object())
+        main = pool.get("Water")
+        self.assertIs(pool.get("Water"), main)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other = executor.submit(pool.get, "Water").result()
+        self.assertIsNot(other, main, msg='object shared between threads')
+
+    def test_backend_thread_local(self):
+        backends = []
+        with use_backend(ConstantPropertyBackend()):
+            thread = threading.Thread(target=lambda: backends.append(get_backend()))
+            thread.start()
+            thread.join()
+        self.assertEqual(backends, [default_backend])
+
+    def test_evaluate_parallel(self):
+        temperatures = np.linspace(280, 420, 3000).reshape(30, 100)
+        temperatures[0, 0] = 200
+        states = evaluate_parallel("Water", 1e5, temperatures, workers=4, chunk_size=256)
+        reference = evaluate_batch("Water", 1e5, temperatures)
+        self.assertEqual(states.density.shape, (30, 100))
+        np.testing.assert_array_equal(states.density, reference.density)
+        np.testing.assert_array_equal(states.phase, reference.phase)
+
+        with use_backend(CoolPropBackend()):
+            states = evaluate_parallel("Water", 2e5, temperatures, workers=4, chunk_size=256)
+        np.testing.assert_array_equal(states.enthalpy, evaluate_batch("Water", 2e5, temperatures).enthalpy)
+
+    def test_cache_threads(self):
+        cache = StateCache(maxsize=100)
+        temperatures = np.linspace(280, 360, 400)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda t: cache.lookup("Water", 1e5, t).density, temperatures))
+        self.assertEqual(results, [evaluate("Water", 1e5, t).density for t in temperatures])
+        hits, misses, evictions, maxsize, currsize = cache.info()
+        self.assertEqual(hits + misses, 400)
+        self.assertEqual(currsize, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from exchanger.kernels import counter_current_flow, parallel_flow, tema_e_one_two, cross_counter_flow
+from exchanger.stream import Fluid, Flow, FlowBatch
+from exchanger.exchanger import ParallelFlow, CounterCurrentFlow, TemaE12, CrossCounterFlow, HeatExchanger
+from exchanger.sizing import required_ntu, size_exchanger, size_batch, SizingResult
+
+
+class TestRequiredNtu(unittest.TestCase):
+    def test_counter_current_flow(self):
+        ntu, r = np.meshgrid(np.linspace(0.05, 5, 20), np.array([0.2, 0.9, 1, 1.1, 3]))
+        p = counter_current_flow(ntu, r)
+        np.testing.assert_allclose(required_ntu(counter_current_flow, p, r), ntu, rtol=1e-8)
+        # closed form inverse of the counter current flow
+        r_general = r[r != 1]
+        p_general = p[r != 1]
+        exact = np.log((1 - r_general * p_general) / (1 - p_general)) / (1 - r_general)
+        np.testing.assert_allclose(required_ntu(counter_current_flow, p_general, r_general), exact, rtol=1e-8)
+
+    def test_kernels(self):
+        ntu, r = np.array([0.3, 1.5, 4]), np.array([0.5, 1, 2])
+        for kernel, parameters in ((tema_e_one_two, {}), (cross_counter_flow, {'passes': 3})):
+            p = kernel(ntu, r, **parameters)
+            np.testing.assert_allclose(required_ntu(kernel, p, r, **parameters), ntu, rtol=1e-8)
+        self.assertEqual(np.ndim(required_ntu(tema_e_one_two, 0.4, 1)), 0)
+        self.assertEqual(required_ntu(tema_e_one_two, 0, 1), 0)
+
+    def test_unreachable(self):
+        # parallel flow can not exceed P1 = 1 / (1 + R1)
+        with self.assertWarns(UserWarning):
+            ntu = required_ntu(parallel_flow, [0.4, 0.6], 1)
+        self.assertAlmostEqual(parallel_flow(ntu[0], 1), 0.4)
+        self.assertTrue(np.isnan(ntu[1]))
+
+
+class TestSizing(unittest.TestCase):
+    @staticmethod
+    def flows():
+        return Flow(Fluid("Water", temperature=273.15 + 90), 0.33), Flow(Fluid("Air"), 1)
+
+    def test_size_exchanger(self):
+        for ex_class in (CounterCurrentFlow, TemaE12, CrossCounterFlow):
+            ex = ex_class(*self.flows())
+            result = size_exchanger(ex, out_temperature_1=273.15 + 60)
+            self.assertIsInstance(result, SizingResult)
+            self.assertAlmostEqual(ex.heat_transferability, result.heat_transferability)
+            self.assertAlmostEqual(ex.flow_1.out_temperature, 273.15 + 60)
+            # the sized exchanger reaches the target
+            report = ex._calc_output()
+            self.assertTrue(report.converged)
+            self.assertAlmostEqual(report.temperatures[0], 273.15 + 60, 4)
+
+        ex = CounterCurrentFlow(*self.flows())
+        size_exchanger(ex, out_temperature_2=ex.flow_2.in_fluid.temperature + 20)
+        self.assertAlmostEqual(ex._calc_output().temperatures[1], ex.flow_2.in_fluid.temperature + 20, 4)
+
+    def test_area(self):
+        ex = CounterCurrentFlow(*self.flows())
+        result = size_exchanger(ex, out_temperature_1=273.15 + 60, heat_transfer_coefficient=50)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertAlmostEqual(ex.part.heat_transfer_area, result.heat_transferability / 50)
+            self.assertAlmostEqual(ex.heat_transferability, result.heat_transferability)
+
+    def test_errors(self):
+        ex = CounterCurrentFlow(*self.flows())
+        with self.assertRaises(NotImplementedError):
+            size_exchanger(ex)
+        with self.assertRaises(NotImplementedError):
+            size_exchanger(ex, 300, 300)
+        with self.assertRaises(NotImplementedError):
+            size_exchanger(HeatExchanger(*self.flows()), 300)
+
+        ex = CounterCurrentFlow(Flow(Fluid("Water", temperature=300), 0.33), Flow(Fluid("Air", temperature=300), 1))
+        out_1, out_2 = ex.flow_1.out_temperature, ex.flow_2.out_temperature
+        with self.assertRaisesRegex(ValueError, 'equal input temperatures'):
+            size_exchanger(ex, out_temperature_1=290)
+        self.assertEqual((ex.flow_1.out_temperature, ex.flow_2.out_temperature), (out_1, out_2))
+        flows_1 = FlowBatch(["Water"] * 2, [300, 363.15], mass_flows=0.33)
+        flows_2 = FlowBatch(["Air"] * 2, [300, 293.15], mass_flows=1)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            result = size_batch(CounterCurrentFlow, flows_1, flows_2, out_temperatures_1=[290, 333.15])
+        self.assertEqual([warning.category for warning in caught], [UserWarning], msg='division by zero not avoided')
+        self.assertTrue(np.isnan(result.heat_transferability[0]))
+        self.assertTrue(np.isfinite(result.heat_transferability[1]))
+        self.assertEqual(flows_1.out_temperatures[0], 300)
+
+    def test_unreachable(self):
+        # parallel flow can not cool the water down to the air inlet temperature
+        ex = ParallelFlow(*self.flows())
+        ex.heat_transferability = 100
+        out_1, out_2 = ex.flow_1.out_temperature, ex.flow_2.out_temperature
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with self.assertRaises(ValueError):
+                size_exchanger(ex, out_temperature_1=303.15)
+        self.assertEqual(ex.heat_transferability, 100)
+        self.assertEqual((ex.flow_1.out_temperature, ex.flow_2.out_temperature), (out_1, out_2))
+
+        flows_1 = FlowBatch(["Water"] * 2, 273.15 + 90, mass_flows=0.33)
+        flows_2 = FlowBatch(["Air"] * 2, 293.15, mass_flows=1)
+        with self.assertWarns(UserWarning):
+            result = size_batch(ParallelFlow, flows_1, flows_2, out_temperatures_1=[273.15 + 80, 303.15])
+        self.assertTrue(np.isnan(result.heat_transferability[1]))
+        self.assertAlmostEqual(flows_1.out_temperatures[0], 273.15 + 80)
+        np.testing.assert_array_equal([flows_1.out_temperatures[1], flows_2.out_temperatures[1]],
+                                      [273.15 + 90, 293.15])
+
+    def test_size_batch(self):
+        targets = 273.15 + np.array([70, 75, 80, 85])
+        n = len(targets)
+        flows_1 = FlowBatch(["Water"] * n, 273.15 + 90, mass_flows=0.33)
+        flows_2 = FlowBatch(["Air"] * n, 293.15, mass_flows=1)
+        result = size_batch(TemaE12, flows_1, flows_2, out_temperatures_1=targets)
+        self.assertEqual(result.heat_transferability.shape, (n,))
+        np.testing.assert_allclose(flows_1.out_temperatures, targets)
+        for target, transferability in zip(targets, result.heat_transferability):
+            ex = TemaE12(*self.flows())
+            self.assertAlmostEqual(size_exchanger(ex, target).heat_transferability, transferability, 2)
+        self.assertTrue(np.all(np.diff(result.heat_transferability) < 0))
+
+        result = size_batch(CrossCounterFlow(*self.flows(), passes=3), flows_1, flows_2, out_temperatures_1=targets)
+        np.testing.assert_allclose(cross_counter_flow(result.ntu, result.r, 3), result.p)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
+import numpy as np
 import pyfluids as pyf
-from exchanger.stream import Fluid, Flow
+from exchanger.stream import Fluid, FluidState, Flow, FlowBatch
+from exchanger.properties import state_cache
 
 
 class TestFluid(unittest.TestCase):
@@ -32,13 +34,61 @@ class TestFluid(unittest.TestCase):
         self.assertEqual(fluid.instance, pyf.Fluid)
         self.assertIsInstance(fluid.fluid, pyf.Fluid)
 
-        with self.assertRaisesRegex(AttributeError, 'instance \'Mixture\' not implemented'):
+        with self.assertRaisesRegex(NotImplementedError, 'is not a Mixture title'):
             fluid = Fluid("Water", instance='Mixture')
-        with self.assertRaisesRegex(AttributeError, 'instance \'HumidAir\' not implemented'):
+        with self.assertRaisesRegex(NotImplementedError, 'is not a HumidAir title'):
             fluid = Fluid("Water", instance='HumidAir')
         with self.assertRaisesRegex(AttributeError, 'instance \'Test\' not implemented'):
             fluid = Fluid("Water", instance='Test')
 
+    def test_fluid_mixture(self):
+        fluid = Fluid(instance='Mixture', fluids=[pyf.FluidsList.Oxygen, "Nitrogen"], fractions=[0.4, 0.6],
+                      temperature=300)
+        self.assertEqual(fluid.title, "Mixture(Nitrogen=0.6, Oxygen=0.4)")
+        self.assertEqual(fluid.instance, pyf.Mixture)
+        reference = pyf.Mixture([pyf.FluidsList.Nitrogen, pyf.FluidsList.Oxygen], [0.6, 0.4])
+        reference.update(pyf.Input.pressure(101325), pyf.Input.temperature(300))
+        self.assertEqual(fluid.density, reference.density)
+        self.assertIsInstance(fluid.fluid, pyf.Mixture)
+        self.assertEqual(fluid.fluid.temperature, 300)
+
+        same = Fluid("Mixture(Nitrogen=0.6, Oxygen=0.4)", temperature=300)
+        self.assertEqual(same.state, fluid.state, msg='equal compositions have different states')
+        self.assertEqual(same.instance, pyf.Mixture)
+        with self.assertRaisesRegex(NotImplementedError, 'mixture components'):
+            Fluid(instance='Mixture', fluids=["Nitrogen", "Test"], fractions=[0.6, 0.4])
+        with self.assertRaises(TypeError):
+            Fluid(instance='Mixture', fluids=["Nitrogen", "Oxygen"])
+
+    def test_fluid_humid_air(self):
+        fluid = Fluid(instance='HumidAir', humidity=0.01, temperature=300)
+        self.assertEqual(fluid.title, "HumidAir(humidity=0.01)")
+        reference = pyf.HumidAir()
+        reference.update(pyf.InputHumidAir.pressure(101325), pyf.InputHumidAir.temperature(300),
+                         pyf.InputHumidAir.humidity(0.01))
+        self.assertEqual(fluid.specific_heat, reference.specific_heat)
+        self.assertEqual(fluid.enthalpy, reference.enthalpy)
+        self.assertEqual(fluid.phase, pyf.Phases.Gas)
+        self.assertAlmostEqual(fluid.fluid.humidity, 0.01)
+
+        fluid.temperature = 320
+        self.assertAlmostEqual(fluid.fluid.humidity, 0.01, msg='humidity not constant on heating')
+        fluid.temperature = 700
+        self.assertEqual(fluid.temperature, 320, msg='temperature outside humid air range accepted')
+
+        relative = Fluid(instance='HumidAir', relative_humidity=0.5, temperature=300)
+        self.assertAlmostEqual(relative.fluid.relative_humidity, 0.5)
+        with self.assertRaises(TypeError):
+            Fluid(instance='HumidAir')
+
+        flow = Flow(fluid, 2)
+        flow.out_temperature = 340
+        self.assertEqual(flow.mean_fluid.title, fluid.title)
+        self.assertAlmostEqual(flow.heat_flux, flow.mass_flow * (flow.in_fluid.enthalpy - flow.out_fluid.enthalpy))
+        temperatures = np.array([280, 300, 320])
+        states = fluid.properties_batch(temperatures)
+        self.assertEqual(states.enthalpy[1], Fluid(fluid.title, temperature=300).enthalpy)
+
     def test_fluid_pressure(self):
         fluid = Fluid("Water")
         self.assertEqual(fluid.pressure, 101325, msg='initial pressure value not 101325 Pa')
@@ -96,6 +146,67 @@ class TestFluid(unittest.TestCase):
         self.assertEqual(fluid.pressure, 150e3, msg='fluid cloning not working, pressure is still same object')
         self.assertEqual(new_fluid.pressure, 100e3, msg='fluid cloning not working, pressure is still same object')
 
+    def test_fluid_properties_batch(self):
+        fluid = Fluid("Water", pressure=2e5)
+        temperatures = np.linspace(280, 360, 5)
+        states = fluid.properties_batch(temperatures)
+        self.assertEqual(states.density.shape, (5,))
+        self.assertEqual(states.specific_heat[1], Fluid("Water", pressure=2e5, temperature=300).specific_heat)
+        self.assertTrue(all(phase == pyf.Phases.Liquid for phase in states.phase))
+
+    def test_fluid_set_temperatures(self):
+        fluids = [Fluid("Water"), Fluid("Air"), Fluid("Water", pressure=2e5)]
+        Fluid.set_temperatures(fluids, [300, 320, 200])
+        self.assertEqual(fluids[0].temperature, 300)
+        self.assertEqual(fluids[0].density, Fluid("Water", temperature=300).density)
+        self.assertEqual(fluids[1].temperature, 320)
+        self.assertEqual(fluids[2].temperature, 293.15, msg='unsupported temperature was set')
+
+    def test_fluid_state(self):
+        state = FluidState("Water", 101325, 300)
+        with self.assertRaisesRegex(AttributeError, 'FluidState is immutable'):
+            state.temperature = 310
+        self.assertEqual(state, FluidState("Water", 101325, 300))
+        self.assertEqual(state.properties.density, Fluid("Water", temperature=300).density)
+
+        fluid = Fluid("Water", temperature=300)
+        new_fluid = fluid.clone()
+        self.assertIs(new_fluid.state, fluid.state, msg='cloned fluid does not share the state')
+        self.assertIsNone(new_fluid._fluid, msg='pyfluids object created by cloning')
+        new_fluid.temperature = 310
+        self.assertIsNot(new_fluid.state, fluid.state, msg='state not copied on write')
+        self.assertEqual(fluid.temperature, 300)
+        self.assertEqual(new_fluid.fluid.temperature, 310)
+        self.assertIsInstance(new_fluid.fluid, pyf.Fluid)
+
+    def test_fluid_object_sync(self):
+        fluid = Fluid("Water", temperature=300)
+        pyfluids_object = fluid.fluid
+        pyfluids_object.update(pyf.Input.temperature(330), pyf.Input.pressure(101325))
+        self.assertEqual(fluid.temperature, 330, msg='change of the pyfluids object not taken over')
+        self.assertEqual(fluid.density, pyfluids_object.density)
+        clone = fluid.clone()
+        self.assertEqual(clone.temperature, 330)
+        fluid.temperature = 310
+        self.assertEqual(pyfluids_object.temperature, 310, msg='pyfluids object not updated by the setter')
+        self.assertEqual(clone.temperature, 330)
+
+    def test_single_update_init(self):
+        misses = state_cache.info().misses
+        fluid = Fluid("Water", pressure=2.345e5, temperature=301.234)
+        self.assertEqual(state_cache.info().misses, misses + 1, msg='fluid construction evaluated more than one state')
+        self.assertIsNone(fluid._fluid, msg='pyfluids object created by construction')
+        self.assertEqual((fluid.pressure, fluid.temperature), (2.345e5, 301.234))
+        self.assertEqual(fluid.fluid.temperature, 301.234)
+
+        fluid = Fluid("Water", pressure=2e5, temperature=200)
+        self.assertEqual((fluid.pressure, fluid.temperature), (2e5, 293.15), msg='unsupported state not reset')
+        with self.assertRaisesRegex(NotImplementedError, 'Fluid not implemented'):
+            Fluid("Test")
+
+        flow = Flow(Fluid("Water", temperature=305.678), 1)
+        self.assertIs(flow.mean_fluid.state, flow.in_fluid.state, msg='equal in and out state evaluated again')
+
     def test_fluid_str(self):
         expected_output = r'^Fluid: title = \w+, id = \d+\n\tp = \d+(\.\d+)? Pa\n\tt = -?\d+(\.\d+)? °C'
 
@@ -156,6 +267,23 @@ class TestFlow(unittest.TestCase):
         self.assertNotEqual(flow.in_fluid.temperature - flow.out_temperature, 0, msg='temperature delta is 0')
         self.assertAlmostEqual(flow.heat_flux, -11.2e3, delta=0.1e3, msg='heat flow was not calculated correct')
 
+    def test_flow_mean_fluid_cache(self):
+        flow = Flow(Fluid("Water", temperature=300), 1)
+        mean_fluid = flow.mean_fluid
+        self.assertIs(flow.mean_fluid, mean_fluid, msg='mean fluid not cached')
+        flow.in_fluid.temperature = 300
+        self.assertIs(flow.mean_fluid, mean_fluid, msg='mean fluid recalculated without state change')
+
+        flow.out_temperature = 320
+        self.assertIsNot(flow.mean_fluid, mean_fluid, msg='mean fluid not recalculated on temperature change')
+        self.assertEqual(flow.mean_fluid.temperature, 310)
+        self.assertEqual(flow.mean_specific_heat, Fluid("Water", temperature=310).specific_heat)
+
+        mean_fluid = flow.mean_fluid
+        flow.pressure_loss = 1000
+        self.assertIsNot(flow.mean_fluid, mean_fluid, msg='mean fluid not recalculated on pressure change')
+        self.assertEqual(flow.mean_fluid.pressure, 101325 - 500)
+
     def test_flow_clone(self):
         fluid = Fluid("Water")
         flow = Flow(fluid, 1)
@@ -182,6 +310,38 @@ class TestFlow(unittest.TestCase):
         self.assertEqual(flow.mass_flow, new_flow.mass_flow, msg='mass flow was not cloned correct')
 
 
+class TestFlowBatch(unittest.TestCase):
+    def setUp(self):
+        self.flows = [Flow(Fluid("Water", temperature=300), 1),
+                      Flow(Fluid("Air", temperature=280), 2),
+                      Flow(Fluid("Water", pressure=2e5, temperature=350), 0.5)]
+        self.flows[0].out_temperature = 320
+
+    def test_batch_init(self):
+        batch = FlowBatch(["Water", "Air", "Water"], [300, 280, 350], mass_flows=1)
+        self.assertEqual(batch.titles, ["Water", "Air"])
+        np.testing.assert_array_equal(batch.title_ids, [0, 1, 0])
+        np.testing.assert_array_equal(batch.out_temperatures, batch.in_temperatures)
+        np.testing.assert_allclose(batch.mass_flow, 1)
+        with self.assertRaises(NotImplementedError):
+            FlowBatch(["Water"], [300])
+        with self.assertRaises(NotImplementedError):
+            FlowBatch(["Water"], [300], mass_flows=1, volume_flows=1)
+
+    def test_batch_flows(self):
+        batch = FlowBatch.from_flows(self.flows)
+        self.assertEqual(len(batch), 3)
+        np.testing.assert_allclose(batch.mass_flow, [flow.mass_flow for flow in self.flows])
+        np.testing.assert_allclose(batch.heat_capacity_flow, [flow.heat_capacity_flow for flow in self.flows])
+        np.testing.assert_allclose(batch.heat_flux, [flow.heat_flux for flow in self.flows])
+        np.testing.assert_array_equal(batch.phase_change, [False, False, False])
+
+        flows = batch.to_flows()
+        self.assertEqual(flows[2].in_fluid.pressure, 2e5)
+        self.assertEqual(flows[0].out_temperature, 320)
+        self.assertAlmostEqual(flows[0].heat_flux, self.flows[0].heat_flux)
+
+
 def test_flow_print(self):
         expected_output = r'^Flow: id = \d+\n\tmass flow = \d+(\.\d+)? kg\/s\n' \
                           r'\theat capacity flow: W_dot = \d+(\.\d+)? W\/K\n' \